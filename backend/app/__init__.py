@@ -1,7 +1,9 @@
 from flask import Flask
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 from .routes.espn_proxy import espn_proxy
 from .routes.predictions import predictions
+from .core.config import settings
 from dotenv import load_dotenv
 import os
 
@@ -11,6 +13,9 @@ load_dotenv()
 def create_app():
     app = Flask(__name__)
     CORS(app)  # Enable CORS for all routes
+    if settings.FLASK_TRUSTED_PROXIES:
+        # remote_addr becomes the client address the trusted proxies forwarded, not the proxy's own
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=settings.FLASK_TRUSTED_PROXIES)
     
     # Register blueprints
     app.register_blueprint(espn_proxy, url_prefix='/api')
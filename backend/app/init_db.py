@@ -1,6 +1,12 @@
 from sqlalchemy.orm import Session
 from .database import engine, Base, get_db
 from .models.user import User
+from .models.entity_mapping import EntityMapping
+from .models.llm_cache import LLMCacheEntry
+from .models.llm_job import LLMJob
+from .models.performance_rollup import UserDailyRollup, SportHourlyRollup
+from .models.analytics_version import AnalyticsVersion
+from .models.match_result import MatchResult
 from .services.auth_service import auth_service
 from .core.config import settings
 import logging
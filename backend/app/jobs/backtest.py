@@ -0,0 +1,36 @@
+"""
+Replay settled predictions of a prop type through stored player model versions
+and staking rules, and print the reports as JSON. Each --config is a JSON
+object of overrides to backtesting.DEFAULT_CONFIG; configurations run in
+parallel across BACKTEST_WORKERS processes.
+
+Run from the backend directory:
+    python -m app.jobs.backtest Points --config '{"staking": "kelly", "min_edge": 0.02}' \
+        --config '{"refit_folds": 5}' --since 2024-01-01
+"""
+import argparse
+import json
+import logging
+from datetime import datetime
+from ..database import SessionLocal
+from ..services.backtesting import run_backtests
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def run(prop_type: str, configs, since=None, until=None, sample_rate=None):
+    db = SessionLocal()
+    try:
+        return run_backtests(db, prop_type, configs or [{}], since=since, until=until, sample_rate=sample_rate)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest player models over settled predictions")
+    parser.add_argument("prop_type")
+    parser.add_argument("--config", action="append", type=json.loads, default=[], help="JSON config overrides")
+    parser.add_argument("--since", type=datetime.fromisoformat)
+    parser.add_argument("--until", type=datetime.fromisoformat)
+    parser.add_argument("--sample-rate", type=float)
+    args = parser.parse_args()
+    print(json.dumps(run(args.prop_type, args.config, args.since, args.until, args.sample_rate), indent=2, default=str))
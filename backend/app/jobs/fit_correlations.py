@@ -0,0 +1,30 @@
+"""
+Learn same-game correlations between prop types from settled predictions and
+publish them to the model store, where the parlay pricer picks them up.
+
+Run from the backend directory (e.g. nightly from cron, after settlement):
+    python -m app.jobs.fit_correlations
+"""
+import logging
+from ..database import SessionLocal
+from ..services.model_registry import model_registry
+from ..services.parlay_service import fit_correlations, RELATIONS
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def run():
+    db = SessionLocal()
+    try:
+        correlations = fit_correlations(db)
+    finally:
+        db.close()
+    version = model_registry.publish("correlation", "props", correlations, {
+        "prop_types": correlations.prop_types,
+        "pairs": {relation: int(correlations.pairs[r].sum()) for r, relation in enumerate(RELATIONS)}
+    })
+    logger.info(f"Published prop correlations v{version} for {len(correlations.prop_types)} prop types")
+    return version
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,168 @@
+"""
+Batch job that matches ESPN and TheSportsDB teams, players and events and
+persists the mapping table used by EntityResolver.
+
+Run from the backend directory:
+    python -m app.jobs.match_entities
+"""
+from typing import Dict, List, Any, Tuple
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import httpx
+from ..database import SessionLocal
+from ..services.entity_resolution_service import entity_resolver, match_entities
+from ..services.search_service import SearchIndex
+from ..services.sports_data_service import sports_data_service
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ESPN_API_BASE = 'https://site.api.espn.com/apis/site/v2/sports'
+
+# League name -> (ESPN sport, ESPN league, TheSportsDB league ID)
+LEAGUES = {
+    'Premier League': ('soccer', 'eng.1', '4328'),
+    'La Liga': ('soccer', 'esp.1', '4335'),
+    'Bundesliga': ('soccer', 'ger.1', '4331'),
+    'Serie A': ('soccer', 'ita.1', '4332'),
+    'NBA': ('basketball', 'nba', '4387'),
+    'NFL': ('football', 'nfl', '4391'),
+    'MLB': ('baseball', 'mlb', '4424'),
+    'NHL': ('hockey', 'nhl', '4380'),
+}
+
+async def fetch_espn(client: httpx.AsyncClient, path: str, params: Dict[str, Any] = None) -> Dict:
+    try:
+        response = await client.get(f"{ESPN_API_BASE}/{path}", params=params)
+        response.raise_for_status()
+        return response.json()
+    except Exception as e:
+        logger.error(f"Error fetching ESPN {path}: {str(e)}")
+        return {}
+
+def espn_teams(data: Dict) -> List[Dict[str, Any]]:
+    teams = []
+    for sport in data.get("sports", []):
+        for league in sport.get("leagues", []):
+            for entry in league.get("teams", []):
+                team = entry.get("team", entry)
+                teams.append({
+                    "id": team["id"],
+                    "name": team.get("displayName") or team.get("name", ""),
+                    "aliases": [a for a in (team.get("shortDisplayName"), team.get("abbreviation")) if a]
+                })
+    return teams
+
+def espn_athletes(data: Dict) -> List[Dict[str, Any]]:
+    athletes = data.get("athletes") or data.get("team", {}).get("athletes") or data.get("roster") or []
+    flattened = []
+    for athlete in athletes:
+        # Some sports group the roster by position
+        flattened.extend(athlete.get("items", [athlete]))
+    return [{
+        "id": athlete["id"],
+        "name": athlete.get("displayName") or athlete.get("fullName", ""),
+        "aliases": [athlete["shortName"]] if athlete.get("shortName") else []
+    } for athlete in flattened if athlete.get("id")]
+
+def espn_events(data: Dict) -> List[Dict[str, Any]]:
+    events = []
+    for event in data.get("events", []):
+        competitors = event.get("competitions", [{}])[0].get("competitors", [])
+        sides = {c.get("homeAway"): c.get("team", {}).get("id") for c in competitors}
+        if sides.get("home") and sides.get("away"):
+            events.append({
+                "id": event["id"],
+                "name": event.get("name", ""),
+                "date": event.get("date", "")[:10],
+                "home": sides["home"],
+                "away": sides["away"]
+            })
+    return events
+
+async def match_league(client: httpx.AsyncClient, league_name: str) -> List[Dict[str, Any]]:
+    sport, espn_league, sportsdb_league = LEAGUES[league_name]
+    espn_side = espn_teams(await fetch_espn(client, f"{sport}/{espn_league}/teams"))
+    sportsdb_side = [{
+        "id": team["id"],
+        "name": team["name"],
+        "aliases": [a.strip() for a in (team.get("alternate") or "").split(",") if a.strip()]
+    } for team in await sports_data_service.get_league_teams(sportsdb_league)]
+
+    team_mappings = match_entities("team", espn_side, sportsdb_side, league=league_name)
+    mappings = list(team_mappings)
+    logger.info(f"{league_name}: matched {len(team_mappings)}/{len(espn_side)} teams")
+
+    # Players are only matched within a matched team
+    for team in team_mappings:
+        if sport == 'soccer':
+            roster = await fetch_espn(client, f"{sport}/{espn_league}/teams/{team['espn_id']}/roster")
+        else:
+            roster = await fetch_espn(client, f"{sport}/{espn_league}/teams/{team['espn_id']}", {"enable": "roster"})
+        players = await sports_data_service.get_team_players(team["sportsdb_id"])
+        mappings.extend(match_entities(
+            "player",
+            espn_athletes(roster),
+            [{"id": p["id"], "name": p["name"]} for p in players],
+            league=league_name
+        ))
+
+    sportsdb_names = {team["id"]: team["name"] for team in sportsdb_side}
+    mappings.extend(await match_league_events(client, league_name, team_mappings, sportsdb_names))
+    return mappings
+
+async def match_league_events(
+    client: httpx.AsyncClient,
+    league_name: str,
+    team_mappings: List[Dict[str, Any]],
+    sportsdb_names: Dict[str, str]
+) -> List[Dict[str, Any]]:
+    """Events match when their date and both mapped teams agree"""
+    sport, espn_league, _ = LEAGUES[league_name]
+    team_ids = {m["espn_id"]: m["sportsdb_id"] for m in team_mappings}
+    team_names = {m["sportsdb_id"]: SearchIndex.normalize(sportsdb_names[m["sportsdb_id"]]) for m in team_mappings}
+
+    today = datetime.utcnow()
+    dates = f"{(today - timedelta(days=7)).strftime('%Y%m%d')}-{(today + timedelta(days=7)).strftime('%Y%m%d')}"
+    scoreboard = await fetch_espn(client, f"{sport}/{espn_league}/scoreboard", {"dates": dates, "limit": 500})
+
+    sportsdb_events: Dict[Tuple[str, str, str], str] = {}
+    for sportsdb_id in team_ids.values():
+        for match in (await sports_data_service.get_team_last_matches(sportsdb_id) +
+                      await sports_data_service.get_team_next_matches(sportsdb_id)):
+            key = (match["date"], SearchIndex.normalize(match["home_team"]), SearchIndex.normalize(match["away_team"]))
+            sportsdb_events[key] = match["id"]
+
+    mappings = []
+    for event in espn_events(scoreboard):
+        home, away = team_ids.get(event["home"]), team_ids.get(event["away"])
+        if not home or not away:
+            continue
+        sportsdb_id = sportsdb_events.get((event["date"], team_names[home], team_names[away]))
+        if sportsdb_id:
+            mappings.append({
+                "type": "event",
+                "espn_id": str(event["id"]),
+                "sportsdb_id": sportsdb_id,
+                "name": event["name"],
+                "league": league_name,
+                "match_score": 1.0
+            })
+    return mappings
+
+async def run():
+    mappings = []
+    async with httpx.AsyncClient(timeout=20) as client:
+        for league_name in LEAGUES:
+            mappings.extend(await match_league(client, league_name))
+
+    db = SessionLocal()
+    try:
+        saved = entity_resolver.save(db, mappings)
+        logger.info(f"Saved {saved} entity mappings: {entity_resolver.stats()}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,75 @@
+"""
+Add the packed feature-vector columns to an existing predictions table and
+backfill them from the JSON features, which are rewritten in named form.
+New predictions are stored packed when they are created.
+
+Run from the backend directory:
+    python -m app.jobs.pack_features
+"""
+import logging
+from sqlalchemy import text
+from ..database import SessionLocal, engine
+from ..models.predictions import Prediction
+from ..services.feature_vectors import (
+    FEATURE_SCHEMA_VERSION, PLAYER_FEATURES, pack_features, display_features, vector_from_json
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+def add_columns():
+    with engine.begin() as connection:
+        connection.execute(text(
+            "ALTER TABLE predictions "
+            "ADD COLUMN IF NOT EXISTS feature_vector BYTEA, "
+            "ADD COLUMN IF NOT EXISTS feature_schema_version INTEGER"
+        ))
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_predictions_feature_schema_version "
+            "ON predictions (feature_schema_version)"
+        ))
+
+def run(batch_size: int = BATCH_SIZE):
+    add_columns()
+    db = SessionLocal()
+    counts = {"packed": 0, "skipped": 0}
+    last_id = 0
+    try:
+        while True:
+            rows = db.query(Prediction.id, Prediction.features).filter(
+                Prediction.id > last_id,
+                Prediction.feature_vector.is_(None),
+                Prediction.features.isnot(None)
+            ).order_by(Prediction.id).limit(batch_size).all()
+            if not rows:
+                break
+            updates = []
+            for prediction_id, features in rows:
+                vector = vector_from_json(features)
+                if vector is None or len(vector) != len(PLAYER_FEATURES):
+                    counts["skipped"] += 1
+                    continue
+                updates.append({
+                    "id": prediction_id,
+                    "features": display_features(vector),
+                    "feature_vector": pack_features(vector),
+                    "feature_schema_version": FEATURE_SCHEMA_VERSION
+                })
+            if updates:
+                db.bulk_update_mappings(Prediction, updates)
+                db.commit()
+            counts["packed"] += len(updates)
+            last_id = rows[-1][0]
+        logger.info(f"Packed feature vectors: {counts}")
+        return counts
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error packing feature vectors: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,127 @@
+"""
+Off-peak job that pre-generates match previews and top-player analyses for
+fixtures in the next PREGENERATE_HORIZON_HOURS, so match-day requests are
+served from the LLM cache. Anything not covered is still generated on demand.
+
+Run from the backend directory (e.g. nightly from cron):
+    python -m app.jobs.pregenerate_analyses
+"""
+from typing import Dict, List, Any
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import httpx
+from sqlalchemy import func
+from ..core.config import settings
+from ..database import SessionLocal
+from ..models.predictions import Prediction
+from ..services.openai_service import OpenAIService
+from .match_entities import LEAGUES, fetch_espn, espn_athletes
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+async def upcoming_fixtures(client: httpx.AsyncClient, hours: int) -> List[Dict[str, Any]]:
+    """Fixtures from the ESPN scoreboards that kick off within `hours`"""
+    now = datetime.utcnow()
+    horizon = now + timedelta(hours=hours)
+    dates = f"{now.strftime('%Y%m%d')}-{horizon.strftime('%Y%m%d')}"
+    fixtures = []
+    for league_name, (sport, espn_league, _) in LEAGUES.items():
+        scoreboard = await fetch_espn(client, f"{sport}/{espn_league}/scoreboard", {"dates": dates, "limit": 500})
+        for event in scoreboard.get("events", []):
+            kickoff = datetime.fromisoformat(event["date"].replace("Z", "+00:00")).replace(tzinfo=None)
+            if not now <= kickoff <= horizon:
+                continue
+            competitors = event.get("competitions", [{}])[0].get("competitors", [])
+            teams = {c.get("homeAway"): c.get("team", {}) for c in competitors}
+            if "home" not in teams or "away" not in teams:
+                continue
+            fixtures.append({
+                "id": event["id"],
+                "league": league_name,
+                "sport": sport,
+                "espn_league": espn_league,
+                "kickoff": kickoff,
+                "home": teams["home"],
+                "away": teams["away"]
+            })
+    return fixtures
+
+def popular_players(team: str, limit: int) -> List[str]:
+    """Players on a team that users have predicted most often"""
+    db = SessionLocal()
+    try:
+        rows = db.query(Prediction.player_name, func.count(Prediction.id)).filter(
+            Prediction.team == team
+        ).group_by(Prediction.player_name).order_by(func.count(Prediction.id).desc()).limit(limit).all()
+        return [name for name, _ in rows]
+    except Exception as e:
+        logger.error(f"Error loading popular players for {team}: {str(e)}")
+        return []
+    finally:
+        db.close()
+
+async def top_players(client: httpx.AsyncClient, fixture: Dict[str, Any], team: Dict[str, Any], limit: int) -> List[str]:
+    players = popular_players(team.get("displayName", ""), limit)
+    if len(players) < limit:
+        if fixture["sport"] == 'soccer':
+            roster = await fetch_espn(client, f"soccer/{fixture['espn_league']}/teams/{team['id']}/roster")
+        else:
+            roster = await fetch_espn(
+                client,
+                f"{fixture['sport']}/{fixture['espn_league']}/teams/{team['id']}",
+                {"enable": "roster"}
+            )
+        for athlete in espn_athletes(roster):
+            if athlete["name"] not in players:
+                players.append(athlete["name"])
+            if len(players) >= limit:
+                break
+    return players
+
+async def run(hours: int = None, players_per_team: int = None, concurrency: int = None):
+    hours = hours or settings.PREGENERATE_HORIZON_HOURS
+    players_per_team = players_per_team if players_per_team is not None else settings.PREGENERATE_PLAYERS_PER_TEAM
+    semaphore = asyncio.Semaphore(concurrency or settings.PREGENERATE_CONCURRENCY)
+    openai_service = OpenAIService()
+    counts = {"generated": 0, "failed": 0}
+
+    async def generate(call):
+        async with semaphore:
+            result = await call
+        if isinstance(result, dict) and result.get("error"):
+            counts["failed"] += 1
+        else:
+            counts["generated"] += 1
+
+    async with httpx.AsyncClient(timeout=20) as client:
+        fixtures = await upcoming_fixtures(client, hours)
+        logger.info(f"Pre-generating analyses for {len(fixtures)} fixtures in the next {hours}h")
+
+        calls = []
+        for fixture in fixtures:
+            home, away = fixture["home"].get("displayName", ""), fixture["away"].get("displayName", "")
+            # Same arguments as the on-demand endpoints so the cache keys line up
+            calls.append(openai_service.get_prediction(
+                sport=fixture["sport"],
+                team1=home,
+                team2=away,
+                match_type="regular season",
+                kickoff=fixture["kickoff"]
+            ))
+            for team in (fixture["home"], fixture["away"]):
+                for player_name in await top_players(client, fixture, team, players_per_team):
+                    calls.append(openai_service.get_player_analysis(
+                        player_name=player_name,
+                        team=team.get("displayName", ""),
+                        sport=fixture["sport"],
+                        kickoff=fixture["kickoff"]
+                    ))
+
+    await asyncio.gather(*(generate(call) for call in calls))
+    logger.info(f"Pre-generation finished: {counts}")
+    return counts
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,30 @@
+"""
+Recompute team ratings from the full match_results history, one vectorized
+pass per round of matches, and checkpoint them to the model store. Use after
+importing historical results or correcting late or wrong ones.
+
+Run from the backend directory:
+    python -m app.jobs.rebuild_ratings [--sport soccer]
+"""
+import argparse
+import logging
+from ..database import SessionLocal
+from ..models.match_result import MatchResult
+from ..services.rating_service import rating_service
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def run(sport: str = None):
+    db = SessionLocal()
+    try:
+        sports = [sport] if sport else [row[0] for row in db.query(MatchResult.sport).distinct()]
+        for name in sports:
+            rating_service.rebuild(db, name)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild team ratings from match history")
+    parser.add_argument("--sport", help="only this sport (default: every sport with results)")
+    run(parser.parse_args().sport)
@@ -0,0 +1,32 @@
+"""
+Recompute the performance rollup tables from the predictions table.
+
+The rollups are maintained incrementally as predictions are created and
+settled; run this after bulk imports, manual edits or a schema change.
+Run from the backend directory:
+    python -m app.jobs.rebuild_rollups
+"""
+import logging
+from ..database import SessionLocal
+from ..services.analytics_cache_service import analytics_cache
+from ..services.rollup_service import performance_rollups
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def run():
+    db = SessionLocal()
+    try:
+        counts = performance_rollups.rebuild(db)
+        analytics_cache.bump_all(db)
+        db.commit()
+        return counts
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error rebuilding performance rollups: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    run()
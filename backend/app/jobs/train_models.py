@@ -0,0 +1,28 @@
+"""
+Retrain the per-prop_type player models whose settled-prediction count has
+grown past MODEL_RETRAIN_MIN_NEW_ROWS, in parallel across TRAINING_WORKERS
+processes, and publish them to the model store. Running API processes pick
+up the new versions the next time they refresh.
+
+Run from the backend directory (e.g. nightly from cron):
+    python -m app.jobs.train_models [--force]
+"""
+import argparse
+import logging
+from ..services.training_pipeline import training_pipeline
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def run(force: bool = False):
+    try:
+        results = training_pipeline.run(force=force)
+        logger.info(f"Training finished: {results}")
+        return results
+    finally:
+        training_pipeline.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retrain stale player models")
+    parser.add_argument("--force", action="store_true", help="retrain every prop type with enough data")
+    run(parser.parse_args().force)
@@ -4,14 +4,20 @@ from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict
 import uvicorn
+import asyncio
 from datetime import datetime, timedelta
 from .services.prediction_service import PredictionService
 from .services.auth_service import auth_service
+from .services.weather_service import weather_service
+from .services.entity_resolution_service import entity_resolver
+from .services.model_registry import model_registry
+from .services.training_pipeline import training_pipeline
+from .services.parlay_service import parlay_pricer
 from .core.config import settings
 from .database import get_db, engine, Base
 from .models.user import User
 from .schemas.auth import UserCreate, UserResponse, Token, UserUpdate
-from .routers import users, predictions, analytics, sports
+from .routers import users, predictions, analytics, sports, metrics, pricing, parlays, ratings, models as model_routes
 from . import models
 from .routes import prediction
 
@@ -42,8 +48,30 @@ app.include_router(users.router)
 app.include_router(predictions.router)
 app.include_router(analytics.router)
 app.include_router(sports.router)
+app.include_router(metrics.router)
+app.include_router(model_routes.router)
+app.include_router(pricing.router)
+app.include_router(parlays.router)
+app.include_router(ratings.router)
 app.include_router(prediction.router, prefix="/api/v1")
 
+@app.on_event("startup")
+async def startup():
+    entity_resolver.ensure_loaded()
+    model_registry.load_all()
+    app.state.model_watcher = asyncio.create_task(model_registry.watch())
+    app.state.entity_watcher = asyncio.create_task(entity_resolver.watch())
+    app.state.training_watcher = asyncio.create_task(training_pipeline.watch())
+
+@app.on_event("shutdown")
+async def shutdown():
+    app.state.model_watcher.cancel()
+    app.state.entity_watcher.cancel()
+    app.state.training_watcher.cancel()
+    training_pipeline.shutdown()
+    parlay_pricer.shutdown()
+    await weather_service.close()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to ProphetPlay API"}
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class AnalyticsVersion(Base):
+    """Data version for one sport or user, bumped whenever its predictions change"""
+    __tablename__ = "analytics_versions"
+
+    scope = Column(String, primary_key=True)  # "sport" or "user"
+    subject = Column(String, primary_key=True)  # prop_type or user ID
+    version = Column(Integer, default=0)
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
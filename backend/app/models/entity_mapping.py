@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+class EntityMapping(Base):
+    __tablename__ = "entity_mappings"
+    __table_args__ = (
+        UniqueConstraint("entity_type", "espn_id", name="uq_entity_mappings_espn"),
+        UniqueConstraint("entity_type", "sportsdb_id", name="uq_entity_mappings_sportsdb"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    entity_type = Column(String, index=True)  # "team", "player" or "event"
+    espn_id = Column(String, index=True)
+    sportsdb_id = Column(String, index=True)
+    name = Column(String)
+    league = Column(String, nullable=True)
+    match_score = Column(Float)  # 1.0 for exact normalized name matches
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
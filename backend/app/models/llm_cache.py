@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, Text, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class LLMCacheEntry(Base):
+    __tablename__ = "llm_cache"
+
+    key = Column(String, primary_key=True)  # sha256 of the canonical request
+    model = Column(String)
+    response = Column(Text)
+    expires_at = Column(DateTime(timezone=True), index=True)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
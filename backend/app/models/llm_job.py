@@ -0,0 +1,20 @@
+from sqlalchemy import Column, String, Text, DateTime, Boolean, JSON
+from sqlalchemy.sql import func
+from app.database import Base
+
+class LLMJob(Base):
+    __tablename__ = "llm_jobs"
+
+    id = Column(String, primary_key=True)  # uuid4 hex
+    user_key = Column(String, index=True)
+    status = Column(String, index=True)  # queued, running, completed, failed or cancelled
+    result = Column(Text)  # output so far while running, the full completion when done
+    error = Column(Text, nullable=True)
+    details = Column(JSON)  # request fields echoed back with the result
+    owner = Column(String)  # host:pid of the worker process running the job
+    cancel_requested = Column(Boolean, default=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True, index=True)
+
+    # Timestamps
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
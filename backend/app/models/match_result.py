@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+class MatchResult(Base):
+    """A finished game, the input to the team rating engine"""
+    __tablename__ = "match_results"
+    __table_args__ = (
+        UniqueConstraint("sport", "home_team", "away_team", "played_at", name="uq_match_results_game"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    sport = Column(String, index=True)
+    home_team = Column(String)
+    away_team = Column(String)
+    home_score = Column(Float)
+    away_score = Column(Float)
+    played_at = Column(DateTime(timezone=True), index=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,53 @@
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+class UserDailyRollup(Base):
+    """Per-user prediction counters for one sport (prop_type) on one UTC day"""
+    __tablename__ = "user_daily_rollups"
+    __table_args__ = (
+        UniqueConstraint("user_id", "sport", "day", name="uq_user_daily_rollups"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    sport = Column(String, index=True)
+    day = Column(Date, index=True)  # UTC day the predictions were created
+
+    predictions = Column(Integer, default=0)  # created
+    settled = Column(Integer, default=0)
+    correct = Column(Integer, default=0)
+    priced = Column(Integer, default=0)  # settled predictions with odds for the backed side
+    odds_sum = Column(Float, default=0.0)  # decimal odds of the backed side, over priced predictions
+    returns = Column(Float, default=0.0)  # decimal odds of the backed side, over correct predictions
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class SportHourlyRollup(Base):
+    """Prediction counters for one sport (prop_type) in one UTC hour"""
+    __tablename__ = "sport_hourly_rollups"
+    __table_args__ = (
+        UniqueConstraint("sport", "day", "hour", name="uq_sport_hourly_rollups"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    sport = Column(String, index=True)
+    day = Column(Date, index=True)
+    hour = Column(Integer)  # 0-23, UTC
+
+    predictions = Column(Integer, default=0)
+    settled = Column(Integer, default=0)
+    correct = Column(Integer, default=0)
+    priced = Column(Integer, default=0)
+    odds_sum = Column(Float, default=0.0)
+    returns = Column(Float, default=0.0)
+    max_winning_odds = Column(Float, nullable=True)
+
+    # Outcome against the line, and whether the backed side matched it
+    over = Column(Integer, default=0)
+    under = Column(Integer, default=0)
+    push = Column(Integer, default=0)
+    favorite = Column(Integer, default=0)
+    value_bets = Column(Integer, default=0)  # confidence above the implied probability of the odds
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
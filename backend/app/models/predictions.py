@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, JSON, ForeignKey, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -29,7 +29,9 @@ class Prediction(Base):
     prediction_correct = Column(Boolean, nullable=True)
     
     # Additional data
-    features = Column(JSON)  # Store player stats, matchup data, etc.
+    features = Column(JSON)  # Named features for display
+    feature_vector = Column(LargeBinary, nullable=True)  # Packed float32 model input, see services/feature_vectors.py
+    feature_schema_version = Column(Integer, nullable=True, index=True)
     recent_performance = Column(JSON)  # Store last 5 games performance
     
     # Timestamps
@@ -5,6 +5,7 @@ from datetime import datetime, timedelta
 from ..database import get_db
 from ..models.user import User
 from ..services.analytics_service import AnalyticsService
+from ..services.analytics_cache_service import analytics_cache
 from ..services.auth_service import auth_service
 
 router = APIRouter(
@@ -26,10 +27,13 @@ async def get_model_performance(
     Get performance metrics for a specific model
     """
     analytics_service = get_analytics_service(db)
-    return analytics_service.calculate_model_performance(
-        db=db,
-        sport=sport,
-        time_period=timedelta(days=time_period) if time_period else None
+    return analytics_cache.get_or_compute(
+        db, "model", "sport", sport, time_period,
+        lambda: analytics_service.calculate_model_performance(
+            db=db,
+            sport=sport,
+            time_period=timedelta(days=time_period) if time_period else None
+        )
     )
 
 @router.get("/user/{user_id}")
@@ -50,10 +54,13 @@ async def get_user_performance(
         )
     
     analytics_service = get_analytics_service(db)
-    return analytics_service.get_user_performance(
-        db=db,
-        user_id=user_id,
-        time_period=timedelta(days=time_period) if time_period else None
+    return analytics_cache.get_or_compute(
+        db, "user", "user", user_id, time_period,
+        lambda: analytics_service.get_user_performance(
+            db=db,
+            user_id=user_id,
+            time_period=timedelta(days=time_period) if time_period else None
+        )
     )
 
 @router.get("/sport/{sport}/insights")
@@ -67,8 +74,11 @@ async def get_sport_insights(
     Get detailed insights for a specific sport
     """
     analytics_service = get_analytics_service(db)
-    return analytics_service.get_sport_insights(
-        db=db,
-        sport=sport,
-        time_period=timedelta(days=time_period) if time_period else None
+    return analytics_cache.get_or_compute(
+        db, "insights", "sport", sport, time_period,
+        lambda: analytics_service.get_sport_insights(
+            db=db,
+            sport=sport,
+            time_period=timedelta(days=time_period) if time_period else None
+        )
     ) 
\ No newline at end of file
@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+from typing import Dict, Any
+from ..services.analytics_cache_service import analytics_cache
+from ..services.inference_batcher import inference_batcher
+from ..services.llm_cache_service import llm_cache
+from ..services.llm_metrics import llm_metrics
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"]
+)
+
+@router.get("/llm")
+async def get_llm_metrics() -> Dict[str, Any]:
+    """Token counts and latency per LLM operation, plus response cache stats"""
+    return {
+        "operations": llm_metrics.snapshot(),
+        "cache": llm_cache.stats()
+    }
+
+@router.get("/analytics-cache")
+async def get_analytics_cache_metrics() -> Dict[str, Any]:
+    """Hit rate of the versioned analytics result cache"""
+    return analytics_cache.stats()
+
+@router.get("/inference")
+async def get_inference_metrics() -> Dict[str, Any]:
+    """Batch sizes and queue latency of the model inference micro-batcher"""
+    return inference_batcher.stats()
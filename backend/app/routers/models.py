@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from typing import Dict, List, Any
+from ..database import get_db
+from ..models.user import User
+from ..schemas.predictions import BacktestRequest
+from ..services.auth_service import auth_service
+from ..services.backtesting import run_backtests
+from ..services.model_registry import model_registry
+
+router = APIRouter(
+    prefix="/models",
+    tags=["models"]
+)
+
+@router.get("/")
+async def list_models() -> List[Dict[str, Any]]:
+    """Models served by this process with their versions and approximate memory use"""
+    return model_registry.list()
+
+@router.post("/{kind}/{name}/refresh")
+async def refresh_model(
+    kind: str,
+    name: str,
+    current_user: User = Depends(auth_service.get_current_active_user)
+) -> Dict[str, Any]:
+    """Swap in the newest on-disk version of a model"""
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to reload models"
+        )
+    version = model_registry.refresh(kind, name)
+    if version is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No {kind} model for {name}")
+    return {"kind": kind, "name": name, "version": version}
+
+@router.post("/player/{prop_type}/backtest")
+async def backtest_model(
+    prop_type: str,
+    request: BacktestRequest,
+    current_user: User = Depends(auth_service.get_current_active_user),
+    db: Session = Depends(get_db)
+) -> List[Dict[str, Any]]:
+    """Replay settled predictions through stored model versions and staking rules"""
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to run backtests"
+        )
+    return await run_in_threadpool(
+        run_backtests, db, prop_type, request.configs or [{}],
+        since=request.since, until=request.until, sample_rate=request.sample_rate
+    )
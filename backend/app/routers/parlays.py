@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import List
+from ..core.config import settings
+from ..database import get_db
+from ..models.user import User
+from ..schemas.predictions import ParlayQuoteRequest, ParlayQuote
+from ..services.auth_service import auth_service
+from ..services.parlay_service import parlay_pricer
+from ..services.prediction_service import PredictionService
+
+router = APIRouter(
+    prefix="/parlays",
+    tags=["parlays"]
+)
+
+@router.post("/quote", response_model=List[ParlayQuote], operation_id="quote_parlays")
+async def quote_parlays(
+    request: ParlayQuoteRequest,
+    current_user: User = Depends(auth_service.get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Price a batch of parlays, with correlation between legs in the same game
+    """
+    if len(request.parlays) > settings.PARLAY_MAX_QUOTES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.PARLAY_MAX_QUOTES} parlays per request"
+        )
+    distinct_legs = set()
+    for parlay in request.parlays:
+        if not parlay.legs or len(parlay.legs) > settings.PARLAY_MAX_LEGS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"A parlay needs between 1 and {settings.PARLAY_MAX_LEGS} legs"
+            )
+        # No correlation is learned between a player's prop and itself, so
+        # repeated, opposite or alternate lines of one prop would be priced as independent
+        props = set()
+        for leg in parlay.legs:
+            prop = (leg.player_name, leg.team, leg.opponent, leg.game_date.date(), leg.prop_type)
+            if prop in props:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"A parlay can have only one leg on {leg.player_name}'s {leg.prop_type} in a game"
+                )
+            props.add(prop)
+            distinct_legs.add((leg.player_name, leg.team, leg.opponent, leg.prop_type, leg.line))
+    if len(distinct_legs) > settings.PARLAY_MAX_DISTINCT_LEGS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.PARLAY_MAX_DISTINCT_LEGS} distinct legs per request"
+        )
+    if not request.parlays:
+        return []
+
+    prediction_service = PredictionService(db)
+    return await prediction_service.quote_parlays([parlay.model_dump() for parlay in request.parlays])
+
+@router.get("/correlations")
+async def get_correlations(
+    current_user: User = Depends(auth_service.get_current_active_user)
+):
+    """Learned same-game correlations between prop types, by relation between the legs"""
+    correlations = parlay_pricer.correlations()
+    if correlations is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No correlations fitted yet")
+    return correlations.summary()
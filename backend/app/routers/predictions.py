@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator
 from datetime import datetime
+import json
+import logging
 from ..database import get_db
 from ..models.user import User
 from ..models.predictions import Prediction
@@ -10,6 +13,8 @@ from ..services.auth_service import auth_service
 from ..schemas.predictions import (
     PredictionCreate,
     PredictionResponse,
+    SlateCreate,
+    LadderResponse,
     PredictionUpdate,
     PredictionStats
 )
@@ -25,6 +30,24 @@ def get_prediction_service(db: Session = Depends(get_db)) -> PredictionService:
     return PredictionService(db)
 
 openai_service = OpenAIService()
+logger = logging.getLogger(__name__)
+
+async def _sse(request: Request, tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    Forward tokens as server-sent events, stopping the upstream stream if the client goes away.
+    """
+    try:
+        async for token in tokens:
+            if await request.is_disconnected():
+                break
+            yield f"data: {json.dumps({'token': token})}\n\n"
+        else:
+            yield "event: done\ndata: {}\n\n"
+    except Exception as e:
+        logger.error(f"Error streaming analysis: {str(e)}")
+        yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+    finally:
+        await tokens.aclose()
 
 @router.get("/{sport}", response_model=List[PredictionResponse], operation_id="get_predictions_by_sport")
 async def get_predictions(
@@ -62,6 +85,64 @@ async def create_prediction(
         user_id=current_user.id
     )
 
+def _slate_props(slate: SlateCreate) -> List[Dict[str, Any]]:
+    """Slate props with the slate's team and opponent filled in"""
+    props = []
+    for prop in slate.props:
+        team = prop.team or slate.team
+        opponent = prop.opponent or slate.opponent
+        if not team or not opponent:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Team and opponent are required for {prop.player_name} {prop.prop_type}"
+            )
+        props.append({
+            "player_name": prop.player_name,
+            "team": team,
+            "opponent": opponent,
+            "prop_type": prop.prop_type,
+            "prop_value": prop.prop_value,
+            "lines": prop.lines
+        })
+    return props
+
+@router.post("/slate", response_model=List[PredictionResponse], operation_id="create_slate_predictions")
+async def create_slate_predictions(
+    slate: SlateCreate,
+    current_user: User = Depends(auth_service.get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Price every prop on a game or list of players in one batch
+    """
+    props = _slate_props(slate)
+    if not props:
+        return []
+
+    prediction_service = get_prediction_service(db)
+    return await prediction_service.generate_slate_predictions(
+        game_date=slate.game_date,
+        props=props,
+        user_id=current_user.id
+    )
+
+@router.post("/ladder", response_model=List[LadderResponse], operation_id="price_alt_line_ladder")
+async def price_ladder(
+    slate: SlateCreate,
+    current_user: User = Depends(auth_service.get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Over/under probabilities and fair odds for each prop's main and alternate
+    lines, without storing predictions
+    """
+    props = _slate_props(slate)
+    if not props:
+        return []
+
+    prediction_service = get_prediction_service(db)
+    return await prediction_service.price_ladder(props)
+
 @router.put("/{prediction_id}", response_model=PredictionResponse, operation_id="update_prediction_result")
 async def update_prediction(
     prediction_id: int,
@@ -94,7 +175,8 @@ async def get_match_prediction(
     sport: str,
     team1: str,
     team2: str,
-    match_type: str = "regular season"
+    match_type: str = "regular season",
+    kickoff: Optional[datetime] = None
 ) -> Dict[str, Any]:
     """
     Get a prediction for a match between two teams.
@@ -104,7 +186,9 @@ async def get_match_prediction(
             sport=sport,
             team1=team1,
             team2=team2,
-            match_type=match_type
+            match_type=match_type,
+            kickoff=kickoff,
+            deadline=settings.LLM_DEADLINE_MATCH_SECONDS
         )
         return prediction
     except Exception as e:
@@ -117,7 +201,8 @@ async def get_match_prediction(
 async def get_player_prediction(
     sport: str,
     player_name: str,
-    team: str
+    team: str,
+    kickoff: Optional[datetime] = None
 ) -> Dict[str, Any]:
     """
     Get a prediction for a player's performance.
@@ -126,11 +211,53 @@ async def get_player_prediction(
         analysis = await openai_service.get_player_analysis(
             player_name=player_name,
             team=team,
-            sport=sport
+            sport=sport,
+            kickoff=kickoff,
+            deadline=settings.LLM_DEADLINE_PLAYER_SECONDS
         )
         return analysis
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to generate player analysis: {str(e)}"
-        ) 
\ No newline at end of file
+        ) 
+
+@router.get("/match/{sport}/{team1}/{team2}/stream")
+async def stream_match_prediction(
+    request: Request,
+    sport: str,
+    team1: str,
+    team2: str,
+    match_type: str = "regular season",
+    kickoff: Optional[datetime] = None
+):
+    """
+    Stream a match prediction as server-sent events.
+    """
+    tokens = openai_service.stream_prediction(
+        sport=sport,
+        team1=team1,
+        team2=team2,
+        match_type=match_type,
+        kickoff=kickoff
+    )
+    return StreamingResponse(_sse(request, tokens), media_type="text/event-stream")
+
+@router.get("/player/{sport}/{player_name}/stream")
+async def stream_player_prediction(
+    request: Request,
+    sport: str,
+    player_name: str,
+    team: str,
+    kickoff: Optional[datetime] = None
+):
+    """
+    Stream a player analysis as server-sent events.
+    """
+    tokens = openai_service.stream_player_analysis(
+        player_name=player_name,
+        team=team,
+        sport=sport,
+        kickoff=kickoff
+    )
+    return StreamingResponse(_sse(request, tokens), media_type="text/event-stream")
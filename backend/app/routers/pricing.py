@@ -0,0 +1,50 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict, List, Any
+import numpy as np
+from ..core.config import settings
+from ..models.user import User
+from ..schemas.pricing import PricingBatch, PricingBatchResponse
+from ..services.auth_service import auth_service
+from ..services.odds import price_two_way
+
+router = APIRouter(
+    prefix="/pricing",
+    tags=["pricing"]
+)
+
+def _column(values: np.ndarray) -> List[Any]:
+    """JSON-ready list with NaN (unconvertible prices) as null"""
+    if values.dtype == object:
+        return values.tolist()
+    values = np.round(values, 6).astype(object)
+    values[np.isnan(values.astype(float))] = None
+    return values.tolist()
+
+@router.post("/batch", response_model=PricingBatchResponse)
+async def price_batch(
+    batch: PricingBatch,
+    current_user: User = Depends(auth_service.get_current_active_user)
+) -> Dict[str, Any]:
+    """
+    Implied and no-vig probabilities, margin, fair prices and expected value
+    for a batch of over/under lines
+    """
+    lines = len(batch.over)
+    if len(batch.under) != lines or (batch.over_probability is not None and len(batch.over_probability) != lines):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="over, under and over_probability must be the same length")
+    if lines > settings.PRICING_BATCH_MAX_LINES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.PRICING_BATCH_MAX_LINES} lines per batch"
+        )
+    try:
+        priced = price_two_way(
+            batch.over,
+            batch.under,
+            fmt=batch.format,
+            over_probability=batch.over_probability,
+            method=batch.vig_method
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid price: {str(e)}")
+    return {name: _column(values) for name, values in priced.items()}
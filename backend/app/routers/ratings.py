@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import Dict, List, Any, Optional
+from ..database import get_db
+from ..models.user import User
+from ..schemas.predictions import MatchResultCreate
+from ..services.auth_service import auth_service
+from ..services.rating_service import rating_service
+
+router = APIRouter(
+    prefix="/ratings",
+    tags=["ratings"]
+)
+
+@router.get("/{sport}")
+async def get_ratings(sport: str, limit: Optional[int] = 50, db: Session = Depends(get_db)) -> List[Dict[str, Any]]:
+    """Teams by rating, highest first"""
+    return rating_service.get(db, sport).table(limit)
+
+@router.get("/{sport}/{team}")
+async def get_team_rating(sport: str, team: str, db: Session = Depends(get_db)) -> Dict[str, Any]:
+    """A team's rating, rating deviation and games played"""
+    rating = rating_service.get(db, sport).lookup(team)
+    if rating is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No {sport} rating for {team}")
+    return rating
+
+@router.post("/{sport}/results")
+async def record_results(
+    sport: str,
+    results: List[MatchResultCreate],
+    current_user: User = Depends(auth_service.get_current_active_user),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """Store finished matches and update the ratings"""
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to record results"
+        )
+    ratings = rating_service.record_results(db, sport, [result.model_dump() for result in results])
+    return {"sport": sport, "recorded": len(results), "matches": ratings.matches, "teams": len(ratings.teams)}
+
+@router.post("/{sport}/rebuild")
+async def rebuild_ratings(
+    sport: str,
+    current_user: User = Depends(auth_service.get_current_active_user),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """Recompute ratings from the full match history"""
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to rebuild ratings"
+        )
+    ratings = rating_service.rebuild(db, sport)
+    return {"sport": sport, "matches": ratings.matches, "teams": len(ratings.teams)}
@@ -1,6 +1,8 @@
 from fastapi import APIRouter, HTTPException
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from ..services.sports_data_service import SportsDataService
+from ..services.search_service import search_index
+from ..services.entity_resolution_service import entity_resolver
 
 router = APIRouter(
     prefix="/sports",
@@ -9,6 +11,33 @@ router = APIRouter(
 
 sports_data_service = SportsDataService()
 
+@router.get("/search")
+async def search(q: str, type: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+    """Fuzzy search over indexed teams and players"""
+    return search_index.search(q, kind=type, limit=limit)
+
+@router.get("/autocomplete")
+async def autocomplete(q: str, type: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+    """Prefix autocomplete over indexed teams and players"""
+    return search_index.autocomplete(q, kind=type, limit=limit)
+
+@router.get("/resolve/{entity_type}")
+async def resolve_entity(
+    entity_type: str,
+    espn_id: Optional[str] = None,
+    sportsdb_id: Optional[str] = None
+) -> Dict[str, Any]:
+    """Translate an ESPN or TheSportsDB team, player or event ID to the other provider"""
+    if espn_id:
+        mapping = entity_resolver.get_by_espn(entity_type, espn_id)
+    elif sportsdb_id:
+        mapping = entity_resolver.get_by_sportsdb(entity_type, sportsdb_id)
+    else:
+        raise HTTPException(status_code=400, detail="espn_id or sportsdb_id is required")
+    if not mapping:
+        raise HTTPException(status_code=404, detail="No mapping found")
+    return mapping
+
 @router.get("/team/{team_name}")
 async def get_team_stats(team_name: str) -> Dict[str, Any]:
     """Get team statistics"""
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 import requests
 import logging
 from datetime import datetime, timedelta
+from ..services.entity_resolution_service import entity_resolver
 
 espn_proxy = Blueprint('espn_proxy', __name__)
 
@@ -302,6 +303,13 @@ def get_team_roster(sport, league, team_id):
             elif 'athletes' in data:
                 roster_data['athletes'] = data['athletes']
         
+        # Attach TheSportsDB IDs so clients don't have to join providers by name
+        roster_data['sportsdb_team_id'] = entity_resolver.to_sportsdb('team', team_id)
+        for athlete in roster_data['athletes']:
+            for item in athlete.get('items', [athlete]) if isinstance(athlete, dict) else []:
+                if item.get('id'):
+                    item['sportsdb_id'] = entity_resolver.to_sportsdb('player', item['id'])
+        
         logger.info(f"Found {len(roster_data['athletes'])} players in roster")
         return jsonify(roster_data), 200
 
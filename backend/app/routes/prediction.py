@@ -1,15 +1,17 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
+from sqlalchemy.orm import Session
 from typing import Dict, List, Optional
 import random
+from ..database import get_db
+from ..services.rating_service import rating_service
 
 router = APIRouter()
 
 class GameData(BaseModel):
+    sport: str = "soccer"
     home_team: str
     away_team: str
-    home_team_rating: float
-    away_team_rating: float
     home_team_form: float
     away_team_form: float
     home_team_rest_days: float
@@ -22,14 +24,19 @@ class PredictionResponse(BaseModel):
     explanation: str
 
 @router.post("/predict", response_model=PredictionResponse)
-async def predict_game(game_data: GameData):
+async def predict_game(game_data: GameData, db: Session = Depends(get_db)):
     try:
+        # Team strength from the server's ratings, as the home side's expected score
+        ratings = rating_service.game_ratings(db, game_data.sport, game_data.home_team, game_data.away_team)
+        home_rating = ratings["home_win_expectancy"]
+        away_rating = 1 - home_rating
+
         # Simple prediction logic based on team ratings and form
-        home_strength = (game_data.home_team_rating * 0.4 + 
+        home_strength = (home_rating * 0.4 + 
                         game_data.home_team_form * 0.4 + 
                         game_data.home_team_rest_days * 0.2)
         
-        away_strength = (game_data.away_team_rating * 0.4 + 
+        away_strength = (away_rating * 0.4 + 
                         game_data.away_team_form * 0.4 + 
                         game_data.away_team_rest_days * 0.2)
         
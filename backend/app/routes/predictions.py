@@ -1,21 +1,20 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 import random
-from openai import AzureOpenAI
+import json
 from azure.core.credentials import AzureKeyCredential
 import os
 from datetime import datetime
 from flask_cors import CORS
 from ..core.config import settings
+from ..services.llm_client import create_async_client
+from ..services.llm_job_service import LLMJobQueue, QueueFullError, UserLimitError
+from ..services.llm_metrics import llm_metrics
 
 predictions = Blueprint('predictions', __name__)
 CORS(predictions)  # Enable CORS for all routes in this blueprint
 
-# Initialize Azure OpenAI client
-client = AzureOpenAI(
-    api_version="2024-12-01-preview",
-    azure_endpoint="https://ai-w2159934766238ai224090976649.openai.azure.com/",
-    api_key=settings.AZURE_OPENAI_KEY
-)
+# LLM calls run on a bounded async worker pool so they don't hold WSGI workers
+llm_jobs = LLMJobQueue(lambda: create_async_client(api_version="2024-12-01-preview"))
 
 @predictions.route('/predict/match', methods=['POST'])
 def predict_match():
@@ -48,6 +47,98 @@ def predict_match():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+PLAYER_FIELDS = ['player_name', 'team', 'category', 'prediction_type', 'target_value']
+
+def _player_completion_request(data):
+    """
+    Build the chat messages and parameters for a player prediction request.
+    """
+    prompt = f"""
+        Analyze the following player prediction request:
+        Player: {data['player_name']}
+        Team: {data['team']}
+        Category: {data['category']}
+        Prediction Type: {data['prediction_type']}
+        Target Value: {data['target_value']}
+
+        Please provide a detailed analysis of the player's likelihood to achieve this target,
+        considering their recent form, historical performance, and relevant statistics.
+        """
+    messages = [
+        {"role": "system", "content": "You are an expert sports analyst specializing in player performance predictions."},
+        {"role": "user", "content": prompt}
+    ]
+    params = {"temperature": 0.7, "max_tokens": 800}
+    return messages, params
+
+def _user_key():
+    # The Flask API has no authentication, so cap jobs per client address.
+    # Behind a proxy ProxyFix (see create_app) resolves it from the trusted
+    # X-Forwarded-For hop; other headers and body fields are caller-chosen
+    return str(request.remote_addr)
+
+def _submit_player_job(data):
+    """
+    Queue the LLM analysis for a player prediction request.
+    Returns (job, None) or (None, error response) when the pool is saturated.
+    """
+    messages, params = _player_completion_request(data)
+    metadata = {field: data.get(field) for field in PLAYER_FIELDS}
+    metadata['operation'] = 'flask_player_analysis'
+    try:
+        return llm_jobs.submit(_user_key(), "gpt-4", messages, params, metadata=metadata), None
+    except QueueFullError as e:
+        return None, (jsonify({'error': str(e)}), 429, {'Retry-After': '5'})
+    except UserLimitError as e:
+        return None, (jsonify({'error': str(e)}), 429, {'Retry-After': '2'})
+
+def _player_job_response(job):
+    if job['status'] == 'completed':
+        request_data = job['metadata']
+        # Generate a confidence score (this would be replaced with actual ML model in production)
+        confidence = round(random.uniform(0.6, 0.9), 2)
+        return jsonify({
+            'player': request_data['player_name'],
+            'team': request_data['team'],
+            'category': request_data['category'],
+            'prediction_type': request_data['prediction_type'],
+            'target_value': request_data['target_value'],
+            'confidence': confidence,
+            'analysis': job['result']
+        }), 200
+    if job['status'] in ('failed', 'cancelled'):
+        return jsonify({'job_id': job['job_id'], 'status': job['status'], 'error': job['error']}), 500
+    return jsonify({'job_id': job['job_id'], 'status': job['status']}), 202
+
+def _sse_tokens(job_id, cancel_on_disconnect):
+    """
+    Tail a job's tokens as server-sent events. If the client disconnects the
+    WSGI server closes this generator, which optionally cancels the job.
+    """
+    finished = False
+    try:
+        for token in llm_jobs.iter_tokens(job_id):
+            if token is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"data: {json.dumps({'token': token})}\n\n"
+        finished = True
+        job = llm_jobs.get(job_id)
+        if job and job['status'] == 'completed':
+            yield "event: done\ndata: {}\n\n"
+        else:
+            yield f"event: error\ndata: {json.dumps({'error': job['error'] if job else 'Job not found'})}\n\n"
+    finally:
+        if not finished and cancel_on_disconnect:
+            llm_jobs.cancel(job_id)
+
+def _sse_response(job_id, cancel_on_disconnect=False):
+    return Response(
+        stream_with_context(_sse_tokens(job_id, cancel_on_disconnect)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @predictions.route('/predict/player', methods=['POST', 'OPTIONS'])
 def predict_player():
     if request.method == 'OPTIONS':
@@ -64,46 +155,63 @@ def predict_player():
         if not all([player_name, team, category, prediction_type, target_value]):
             return jsonify({'error': 'Missing required fields'}), 400
 
-        # Construct the prompt for player prediction
-        prompt = f"""
-        Analyze the following player prediction request:
-        Player: {player_name}
-        Team: {team}
-        Category: {category}
-        Prediction Type: {prediction_type}
-        Target Value: {target_value}
+        job, error = _submit_player_job(data)
+        if error:
+            return error
 
-        Please provide a detailed analysis of the player's likelihood to achieve this target,
-        considering their recent form, historical performance, and relevant statistics.
-        """
+        # Answer inline when the analysis is quick (or cached); otherwise hand back the job ID
+        job = llm_jobs.wait(job['job_id'], timeout=settings.LLM_JOB_SYNC_WAIT_SECONDS)
+        return _player_job_response(job)
 
-        # Get prediction analysis from OpenAI using Azure OpenAI
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": "You are an expert sports analyst specializing in player performance predictions."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=800
-        )
+    except Exception as e:
+        print(f"Error in predict_player: {str(e)}")  # Add debug logging
+        return jsonify({'error': str(e)}), 500
 
-        # Extract the analysis
-        analysis = response.choices[0].message.content
+@predictions.route('/predict/player/stream', methods=['POST', 'OPTIONS'])
+def predict_player_stream():
+    if request.method == 'OPTIONS':
+        return '', 200
 
-        # Generate a confidence score (this would be replaced with actual ML model in production)
-        confidence = round(random.uniform(0.6, 0.9), 2)
+    data = request.get_json() or {}
+    if not all(data.get(field) for field in PLAYER_FIELDS):
+        return jsonify({'error': 'Missing required fields'}), 400
 
-        return jsonify({
-            'player': player_name,
-            'team': team,
-            'category': category,
-            'prediction_type': prediction_type,
-            'target_value': target_value,
-            'confidence': confidence,
-            'analysis': analysis
-        }), 200
+    job, error = _submit_player_job(data)
+    if error:
+        return error
+    return _sse_response(job['job_id'], cancel_on_disconnect=True)
 
-    except Exception as e:
-        print(f"Error in predict_player: {str(e)}")  # Add debug logging
-        return jsonify({'error': str(e)}), 500 
\ No newline at end of file
+@predictions.route('/predict/player/jobs', methods=['POST', 'OPTIONS'])
+def submit_player_job():
+    if request.method == 'OPTIONS':
+        return '', 200
+
+    data = request.get_json() or {}
+    if not all(data.get(field) for field in PLAYER_FIELDS):
+        return jsonify({'error': 'Missing required fields'}), 400
+
+    job, error = _submit_player_job(data)
+    if error:
+        return error
+    return jsonify({'job_id': job['job_id'], 'status': job['status']}), 202
+
+@predictions.route('/predict/player/jobs/<job_id>', methods=['GET'])
+def get_player_job(job_id):
+    job = llm_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return _player_job_response(job)
+
+@predictions.route('/predict/player/jobs/<job_id>/stream', methods=['GET'])
+def stream_player_job(job_id):
+    if not llm_jobs.get(job_id):
+        return jsonify({'error': 'Job not found'}), 404
+    return _sse_response(job_id)
+
+@predictions.route('/predict/jobs/stats', methods=['GET'])
+def get_job_stats():
+    return jsonify(llm_jobs.stats()), 200
+
+@predictions.route('/metrics/llm', methods=['GET'])
+def get_llm_metrics():
+    return jsonify(llm_metrics.snapshot()), 200
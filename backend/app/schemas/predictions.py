@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Literal
 
 class PredictionBase(BaseModel):
     player_name: str
@@ -13,6 +13,71 @@ class PredictionBase(BaseModel):
 class PredictionCreate(PredictionBase):
     pass
 
+class SlateProp(BaseModel):
+    player_name: str
+    prop_type: str
+    prop_value: float
+    team: Optional[str] = None  # defaults to the slate's team
+    opponent: Optional[str] = None  # defaults to the slate's opponent
+    lines: Optional[List[float]] = None  # alternate lines priced alongside prop_value
+
+class SlateCreate(BaseModel):
+    game_date: datetime
+    team: Optional[str] = None
+    opponent: Optional[str] = None
+    props: List[SlateProp]
+
+class LadderLine(BaseModel):
+    line: float
+    over_probability: float
+    under_probability: float
+    odds: Dict[str, float]
+
+class LadderResponse(BaseModel):
+    player_name: str
+    team: str
+    opponent: str
+    prop_type: str
+    prediction: float
+    confidence: float
+    ladder: List[LadderLine]  # prop_value first, then the alternate lines
+
+class ParlayLeg(BaseModel):
+    player_name: str
+    team: str
+    opponent: str
+    game_date: datetime
+    prop_type: str
+    line: float
+    side: Literal["over", "under"]
+
+class Parlay(BaseModel):
+    legs: List[ParlayLeg]
+    odds: Optional[float] = None  # offered American price, for expected value
+
+class ParlayQuoteRequest(BaseModel):
+    parlays: List[Parlay]
+
+class ParlayQuote(BaseModel):
+    probability: float  # every leg wins, with same-game correlation
+    independent_probability: float  # product of the legs' win probabilities
+    fair_odds: Optional[float]  # American
+    expected_value: Optional[float] = None  # per unit staked at the offered odds
+    leg_probabilities: List[float]
+
+class BacktestRequest(BaseModel):
+    configs: List[Dict[str, Any]] = [{}]  # overrides of backtesting.DEFAULT_CONFIG, one run each
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    sample_rate: Optional[float] = None
+
+class MatchResultCreate(BaseModel):
+    home_team: str
+    away_team: str
+    home_score: float
+    away_score: float
+    played_at: datetime
+
 class PredictionUpdate(BaseModel):
     actual_result: float
 
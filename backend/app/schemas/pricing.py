@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import List, Optional, Union, Literal
+
+class PricingBatch(BaseModel):
+    """Over/under lines as parallel columns, so large batches stay cheap to parse"""
+    format: Literal["american", "decimal", "fractional"] = "american"
+    over: List[Union[float, str]]
+    under: List[Union[float, str]]
+    over_probability: Optional[List[float]] = None  # our probability of the over, for expected value
+    vig_method: Literal["multiplicative", "power"] = "multiplicative"
+
+class PricingBatchResponse(BaseModel):
+    """One entry per input line in every column; null where a price could not be converted"""
+    over_implied: List[Optional[float]]
+    under_implied: List[Optional[float]]
+    overround: List[Optional[float]]
+    fair_over_probability: List[Optional[float]]
+    fair_under_probability: List[Optional[float]]
+    fair_over: List[Optional[Union[float, str]]]
+    fair_under: List[Optional[Union[float, str]]]
+    ev_over: Optional[List[Optional[float]]] = None
+    ev_under: Optional[List[Optional[float]]] = None
@@ -0,0 +1,92 @@
+from typing import Dict, Optional, Any, Callable, Tuple
+from collections import OrderedDict
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+import logging
+import threading
+import time
+from ..core.config import settings
+from ..models.analytics_version import AnalyticsVersion
+
+logger = logging.getLogger(__name__)
+
+class AnalyticsCache:
+    """
+    In-memory cache of analytics results keyed by (endpoint, subject, time period, data version).
+
+    Each sport and each user has a version counter in the analytics_versions
+    table, bumped in the same transaction as any write to its predictions.
+    A lookup reads the current version first, so a cached result is only
+    reused while the data behind it is unchanged, in this process or any
+    other. The TTL bounds how far a rolling time window can drift.
+    """
+    def __init__(self, max_entries: int = None, ttl: int = None):
+        self.max_entries = max_entries or settings.ANALYTICS_CACHE_MAX_ENTRIES
+        self.ttl = ttl or settings.ANALYTICS_CACHE_TTL_SECONDS
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple, Tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def bump(self, db: Session, sport: Optional[str] = None, user_id: Optional[int] = None):
+        """Invalidate results for a sport and/or user; commits with the caller's transaction"""
+        for scope, subject in (("sport", sport), ("user", user_id)):
+            if subject is None:
+                continue
+            stmt = pg_insert(AnalyticsVersion.__table__).values(scope=scope, subject=str(subject), version=1)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=["scope", "subject"],
+                set_={"version": AnalyticsVersion.__table__.c.version + 1, "updated_at": func.now()}
+            ))
+
+    def bump_all(self, db: Session):
+        db.query(AnalyticsVersion).update(
+            {AnalyticsVersion.version: AnalyticsVersion.version + 1}, synchronize_session=False
+        )
+
+    def version(self, db: Session, scope: str, subject: Any) -> int:
+        version = db.query(AnalyticsVersion.version).filter(
+            AnalyticsVersion.scope == scope,
+            AnalyticsVersion.subject == str(subject)
+        ).scalar()
+        return version or 0
+
+    def get_or_compute(
+        self,
+        db: Session,
+        endpoint: str,
+        scope: str,
+        subject: Any,
+        time_period: Optional[int],
+        compute: Callable[[], Any]
+    ) -> Any:
+        key = (endpoint, str(subject), time_period, self.version(db, scope, subject))
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        result = compute()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+analytics_cache = AnalyticsCache()
@@ -2,11 +2,19 @@ from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import func
-import pandas as pd
 import numpy as np
 from ..models.user import User
 from ..models.predictions import Prediction
+from .feature_vectors import PLAYER_FEATURES
+from .odds import two_way_prices
+from .forest_inference import FlatForest, flat_forest
+from .inference_batcher import inference_batcher
+from .over_under_simulator import over_under_simulator
+from .model_registry import model_registry
+from .training_pipeline import training_pipeline
+from .rollup_service import performance_rollups, UNIT_STAKE, PICKED_SIDE, OUTCOME, PICKED_ODDS
 import logging
+import warnings
 from sklearn.ensemble import RandomForestRegressor
 
 logger = logging.getLogger(__name__)
@@ -14,7 +22,9 @@ logger = logging.getLogger(__name__)
 class AnalyticsService:
     def __init__(self, db: Session):
         self.db = db
-        self.models = {}
+
+    def _since(self, time_period: Optional[timedelta] = None) -> Optional[datetime]:
+        return datetime.utcnow() - time_period if time_period else None
 
     def calculate_model_performance(
         self,
@@ -23,14 +33,9 @@ class AnalyticsService:
         time_period: Optional[timedelta] = None
     ) -> Dict:
         """Calculate model performance metrics for a specific sport"""
-        query = db.query(Prediction).filter(Prediction.sport == sport)
-        
-        if time_period:
-            cutoff_date = datetime.utcnow() - time_period
-            query = query.filter(Prediction.created_at >= cutoff_date)
-        
-        predictions = query.all()
-        if not predictions:
+        totals = performance_rollups.sport_totals(db, sport, self._since(time_period))
+
+        if not totals.settled:
             return {
                 "sport": sport,
                 "accuracy": 0.0,
@@ -38,24 +43,17 @@ class AnalyticsService:
                 "roi": 0.0
             }
 
-        df = pd.DataFrame([p.to_dict() for p in predictions])
-        
-        # Calculate accuracy
-        accuracy = np.mean(df['was_correct'])
-        
-        # Calculate ROI
-        total_bets = len(df)
-        winning_bets = df[df['was_correct']].shape[0]
-        total_returns = df[df['was_correct']]['odds'].sum()
+        total_bets = int(totals.settled)
+        total_returns = float(totals.returns)
         roi = (total_returns - total_bets) / total_bets * 100
 
         return {
             "sport": sport,
-            "accuracy": float(accuracy),
+            "accuracy": float(totals.correct / total_bets),
             "total_predictions": total_bets,
-            "winning_predictions": winning_bets,
+            "winning_predictions": int(totals.correct),
             "roi": float(roi),
-            "average_odds": float(df['odds'].mean()),
+            "average_odds": float(totals.odds_sum / totals.priced) if totals.priced else 0.0,
             "profit_loss": float(total_returns - total_bets)
         }
 
@@ -66,19 +64,14 @@ class AnalyticsService:
         time_period: Optional[timedelta] = None
     ) -> Dict:
         """Get performance metrics for a specific user"""
-        query = db.query(User).filter(User.id == user_id)
-        user = query.first()
-        
+        user = db.query(User.id).filter(User.id == user_id).first()
+
         if not user:
             return None
 
-        bet_query = db.query(Prediction).filter(Prediction.user_id == user_id)
-        if time_period:
-            cutoff_date = datetime.utcnow() - time_period
-            bet_query = bet_query.filter(Prediction.created_at >= cutoff_date)
+        sports = [s for s in performance_rollups.user_sports(db, user_id, self._since(time_period)) if s.settled]
 
-        bets = bet_query.all()
-        if not bets:
+        if not sports:
             return {
                 "user_id": user_id,
                 "total_bets": 0,
@@ -88,17 +81,18 @@ class AnalyticsService:
                 "roi": 0.0
             }
 
-        df = pd.DataFrame([b.to_dict() for b in bets])
-        
-        total_bets = len(df)
-        winning_bets = df[df['was_correct']].shape[0]
+        total_bets = int(sum(s.settled for s in sports))
+        winning_bets = int(sum(s.correct for s in sports))
         win_rate = winning_bets / total_bets
-        
-        total_stake = df['stake'].sum()
-        total_returns = df[df['was_correct']]['stake'].sum() * df[df['was_correct']]['odds']
+
+        total_stake = total_bets * UNIT_STAKE
+        total_returns = sum(float(s.returns) for s in sports) * UNIT_STAKE
         profit_loss = total_returns - total_stake
         roi = (profit_loss / total_stake) * 100 if total_stake > 0 else 0
 
+        favorite = max(sports, key=lambda s: s.settled)
+        best = max(sports, key=lambda s: s.correct / s.settled)
+
         return {
             "user_id": user_id,
             "total_bets": total_bets,
@@ -106,9 +100,13 @@ class AnalyticsService:
             "win_rate": float(win_rate),
             "profit_loss": float(profit_loss),
             "roi": float(roi),
-            "favorite_sport": self._get_favorite_sport(df),
-            "best_sport": self._get_best_performing_sport(df),
-            "average_stake": float(df['stake'].mean()),
+            "favorite_sport": favorite.sport,
+            "best_sport": {
+                "sport": best.sport,
+                "win_rate": float(best.correct / best.settled),
+                "total_bets": int(best.settled)
+            },
+            "average_stake": UNIT_STAKE,
             "total_stake": float(total_stake),
             "total_returns": float(total_returns)
         }
@@ -120,104 +118,49 @@ class AnalyticsService:
         time_period: Optional[timedelta] = None
     ) -> Dict:
         """Get detailed insights for a specific sport"""
-        query = db.query(Prediction).filter(Prediction.sport == sport)
-        
-        if time_period:
-            cutoff_date = datetime.utcnow() - time_period
-            query = query.filter(Prediction.created_at >= cutoff_date)
+        since = self._since(time_period)
+        totals = performance_rollups.sport_totals(db, sport, since)
 
-        predictions = query.all()
-        if not predictions:
+        if not totals.settled:
             return {
                 "sport": sport,
                 "total_games": 0,
                 "insights": []
             }
 
-        df = pd.DataFrame([p.to_dict() for p in predictions])
-        
-        # Analyze home vs away performance
-        home_wins = df[df['result'] == 'home'].shape[0]
-        away_wins = df[df['result'] == 'away'].shape[0]
-        draws = df[df['result'] == 'draw'].shape[0]
-        
-        # Analyze betting patterns
-        favorite_accuracy = df[df['predicted_winner'] == df['result']].shape[0] / len(df)
-        underdog_wins = df[
-            (df['predicted_winner'] != df['result']) & 
-            (df['odds'] > df['odds'].median())
-        ].shape[0]
+        # Median and mode don't roll up, so these two come from the raw rows
+        filters = [Prediction.prop_type == sport, Prediction.prediction_correct.isnot(None)]
+        if since:
+            filters.append(Prediction.created_at >= since)
+        median_odds = db.query(
+            func.percentile_cont(0.5).within_group(PICKED_ODDS)
+        ).filter(*filters).scalar_subquery()
+        row = db.query(
+            func.count(Prediction.id).filter(PICKED_SIDE != OUTCOME, PICKED_ODDS > median_odds).label("underdog"),
+            func.mode().within_group(Prediction.actual_result).label("most_common_score")
+        ).filter(*filters).one()
 
+        # For props the home/away/draw buckets are over/under/push against the line
+        total = int(totals.settled)
+        best_hour = performance_rollups.best_hour(db, sport, since)
         return {
             "sport": sport,
-            "total_games": len(df),
-            "home_win_rate": float(home_wins / len(df)),
-            "away_win_rate": float(away_wins / len(df)),
-            "draw_rate": float(draws / len(df)) if 'draw' in df['result'].unique() else 0.0,
-            "favorite_win_rate": float(favorite_accuracy),
-            "underdog_wins": underdog_wins,
-            "average_odds": float(df['odds'].mean()),
-            "highest_odds_win": float(df[df['was_correct']]['odds'].max()),
-            "most_common_score": self._get_most_common_score(df),
-            "best_betting_time": self._get_best_betting_time(df),
-            "value_bets_ratio": self._calculate_value_bets_ratio(df)
-        }
-
-    def _get_favorite_sport(self, df: pd.DataFrame) -> str:
-        """Get user's most bet on sport"""
-        return df['sport'].mode().iloc[0] if not df.empty else None
-
-    def _get_best_performing_sport(self, df: pd.DataFrame) -> Dict:
-        """Get user's best performing sport"""
-        if df.empty:
-            return None
-            
-        sport_performance = df.groupby('sport').agg({
-            'was_correct': 'mean',
-            'stake': 'sum',
-            'id': 'count'
-        }).reset_index()
-        
-        best_sport = sport_performance.sort_values('was_correct', ascending=False).iloc[0]
-        
-        return {
-            "sport": best_sport['sport'],
-            "win_rate": float(best_sport['was_correct']),
-            "total_bets": int(best_sport['id'])
+            "total_games": total,
+            "home_win_rate": float(totals.over / total),
+            "away_win_rate": float(totals.under / total),
+            "draw_rate": float(totals.push / total),
+            "favorite_win_rate": float(totals.favorite / total),
+            "underdog_wins": row.underdog,
+            "average_odds": float(totals.odds_sum / totals.priced) if totals.priced else 0.0,
+            "highest_odds_win": float(totals.max_winning_odds) if totals.max_winning_odds is not None else None,
+            "most_common_score": row.most_common_score,
+            "best_betting_time": {
+                "hour": int(best_hour.hour),
+                "win_rate": float(best_hour.win_rate)
+            } if best_hour else None,
+            "value_bets_ratio": float(totals.value_bets / total)
         }
 
-    def _get_most_common_score(self, df: pd.DataFrame) -> Dict:
-        """Get the most common score for the sport"""
-        if 'score' not in df.columns or df.empty:
-            return None
-            
-        return df['score'].mode().iloc[0]
-
-    def _get_best_betting_time(self, df: pd.DataFrame) -> Dict:
-        """Analyze best time for placing bets"""
-        if df.empty:
-            return None
-            
-        df['hour'] = df['created_at'].dt.hour
-        hourly_performance = df.groupby('hour')['was_correct'].mean()
-        best_hour = hourly_performance.idxmax()
-        
-        return {
-            "hour": int(best_hour),
-            "win_rate": float(hourly_performance[best_hour])
-        }
-
-    def _calculate_value_bets_ratio(self, df: pd.DataFrame) -> float:
-        """Calculate the ratio of bets that provided value"""
-        if df.empty:
-            return 0.0
-            
-        # Value bet: When our predicted probability > implied probability from odds
-        df['implied_probability'] = 1 / df['odds']
-        value_bets = df[df['confidence'] > df['implied_probability']]
-        
-        return float(len(value_bets) / len(df))
-
     async def predict_player_performance(
         self,
         player_name: str,
@@ -232,32 +175,148 @@ class AnalyticsService:
         # Prepare features
         features = self._prepare_features(recent_performance, matchup_data)
         
-        # Get or train model for this prop type
+        # Get the model for this prop type
         model = await self._get_model(prop_type)
         
-        # Make prediction
-        prediction = model.predict([features])[0]
-        
-        # Calculate confidence based on model's prediction variance
-        confidence = self._calculate_confidence(model, features)
+        tree_values = None
+        if model is None:
+            # No model trained yet: fall back to the recent average with no confidence
+            prediction = features[0] if np.isfinite(features[0]) else prop_value
+            confidence = 0.0
+        else:
+            # Every tree's prediction, batched with concurrent requests for the same model
+            forest = flat_forest(model)
+            prediction, variance, values = await inference_batcher.predict_trees(forest, features)
+            tree_values = values[None, :]
+            
+            # Calculate confidence based on model's prediction variance
+            confidence = self._calculate_confidence(forest, variance)
         
-        # Calculate implied odds
-        odds = self._calculate_odds(prediction, prop_value, confidence)
+        # Simulate the outcome to price the line
+        probabilities = over_under_simulator.price(
+            np.array([prediction]),
+            self._outcome_noise(prop_type, np.array([features[1]])),
+            np.array([[prop_value]]),
+            tree_values
+        )
+        odds = self._calculate_odds(probabilities["over"][0, 0], probabilities["under"][0, 0])
         
         return {
             "prediction": float(prediction),
             "confidence": float(confidence),
             "odds": odds,
+            "over_probability": float(probabilities["over"][0, 0]),
             "features": features
         }
 
+    async def predict_slate(self, props: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Predict many props at once. Each prop has recent_performance,
+        matchup_data, prop_type and prop_value; results come back in the same
+        order and shape as predict_player_performance. Features are built as
+        one matrix and each prop_type group is scored in a single batched pass.
+
+        A prop may also carry `lines`, alternate lines to price from the same
+        simulated outcomes; its result then includes a `ladder`.
+        """
+        X = self._prepare_feature_matrix(
+            [p["recent_performance"] for p in props],
+            [p["matchup_data"] for p in props]
+        )
+        prop_values = np.array([p["prop_value"] for p in props], dtype=np.float64)
+        predictions = np.where(np.isfinite(X[:, 0]), X[:, 0], prop_values)
+        confidences = np.zeros(len(props))
+
+        # Main line first, then each prop's alternates, NaN-padded to a rectangle
+        width = 1 + max((len(p.get("lines") or []) for p in props), default=0)
+        lines = np.full((len(props), width), np.nan)
+        lines[:, 0] = prop_values
+        for i, prop in enumerate(props):
+            alternates = prop.get("lines") or []
+            lines[i, 1:1 + len(alternates)] = alternates
+        over_probability = np.empty(lines.shape)
+        under_probability = np.empty(lines.shape)
+
+        groups: Dict[str, List[int]] = {}
+        for i, prop in enumerate(props):
+            groups.setdefault(prop["prop_type"], []).append(i)
+        for prop_type, rows in groups.items():
+            model = await self._get_model(prop_type)
+            tree_values = None
+            if model is not None:
+                forest = flat_forest(model)
+                tree_values = forest.tree_values(X[rows])
+                variances = np.var(tree_values, axis=1)
+                predictions[rows] = forest.mean(tree_values)
+                if forest.baseline_variance > 0:
+                    confidences[rows] = np.clip(1 - variances / forest.baseline_variance, 0, 1)
+                else:
+                    confidences[rows] = (variances == 0).astype(float)
+            probabilities = over_under_simulator.price(
+                predictions[rows], self._outcome_noise(prop_type, X[rows, 1]), lines[rows], tree_values
+            )
+            over_probability[rows] = probabilities["over"]
+            under_probability[rows] = probabilities["under"]
+
+        over, under = self._calculate_odds_batch(over_probability, under_probability)
+        results = []
+        for i, prop in enumerate(props):
+            result = {
+                "prediction": float(predictions[i]),
+                "confidence": float(confidences[i]),
+                "odds": {"over": float(over[i, 0]), "under": float(under[i, 0])},
+                "over_probability": float(over_probability[i, 0]),
+                "under_probability": float(under_probability[i, 0]),
+                "features": X[i].tolist()
+            }
+            if prop.get("lines"):
+                result["ladder"] = [
+                    {
+                        "line": float(lines[i, j]),
+                        "over_probability": float(over_probability[i, j]),
+                        "under_probability": float(under_probability[i, j]),
+                        "odds": {"over": float(over[i, j]), "under": float(under[i, j])}
+                    }
+                    for j in range(1, 1 + len(prop["lines"]))
+                ]
+            results.append(result)
+        return results
+
+    def _prepare_feature_matrix(
+        self,
+        recent_performances: List[Dict[str, Any]],
+        matchups: List[Dict[str, Any]]
+    ) -> np.ndarray:
+        """
+        Vectorized _prepare_features for many rows; recent games are padded with
+        NaN so the per-row statistics are computed in one call each.
+        """
+        games = [r.get("last5Games", []) for r in recent_performances]
+        width = max((len(g) for g in games), default=0) or 1
+        recent = np.full((len(games), width), np.nan)
+        for i, g in enumerate(games):
+            recent[i, :len(g)] = g
+
+        X = np.empty((len(games), len(PLAYER_FEATURES)))
+        with warnings.catch_warnings():
+            # Players with no recent games get NaN statistics, as in _prepare_features
+            warnings.simplefilter("ignore", RuntimeWarning)
+            X[:, 0] = np.nanmean(recent, axis=1)
+            X[:, 1] = np.nanstd(recent, axis=1)
+            X[:, 2] = np.nanmin(recent, axis=1)
+            X[:, 3] = np.nanmax(recent, axis=1)
+        X[:, 4] = np.where(np.isnan(recent[:, 0]), 0, recent[:, 0])
+        for column, key in enumerate(("opponent_defense_rating", "home_away_factor", "rest_days", "back_to_back"), 5):
+            X[:, column] = [m.get(key, 0) for m in matchups]
+        return X
+
     def _prepare_features(
         self,
         recent_performance: Dict[str, Any],
         matchup_data: Dict[str, Any]
     ) -> List[float]:
         """
-        Prepare features for the prediction model.
+        Prepare features for the prediction model, in feature_vectors.PLAYER_FEATURES order.
         """
         features = []
         
@@ -281,98 +340,64 @@ class AnalyticsService:
         
         return features
 
-    async def _get_model(self, prop_type: str) -> RandomForestRegressor:
+    async def _get_model(self, prop_type: str) -> Optional[RandomForestRegressor]:
         """
-        Get or train a model for the specific prop type.
+        Get the served model for the prop type from memory. When there is none
+        yet, the background pipeline loads or trains it if the prop type has
+        enough settled predictions; None is returned meanwhile.
         """
-        if prop_type not in self.models:
-            # Train new model using historical data
-            historical_data = await self._get_historical_data(prop_type)
-            model = self._train_model(historical_data)
-            self.models[prop_type] = model
-        
-        return self.models[prop_type]
+        return training_pipeline.player_model(prop_type)
 
-    async def _get_historical_data(self, prop_type: str) -> pd.DataFrame:
+    def _calculate_confidence(
+        self,
+        forest: FlatForest,
+        variance: float
+    ) -> float:
         """
-        Get historical data for training the model.
+        Calculate prediction confidence from the variance across trees, relative
+        to the trees' spread at the all-zeros input.
         """
-        # Query predictions with actual results
-        predictions = self.db.query(Prediction).filter(
-            Prediction.prop_type == prop_type,
-            Prediction.actual_result.isnot(None)
-        ).all()
+        if forest.baseline_variance <= 0:
+            return 1.0 if variance == 0 else 0.0
+        confidence = 1 - (variance / forest.baseline_variance)
         
-        # Convert to DataFrame
-        data = []
-        for pred in predictions:
-            features = pred.features
-            features["actual_result"] = pred.actual_result
-            data.append(features)
-        
-        return pd.DataFrame(data)
+        return max(0, min(1, confidence))
 
-    def _train_model(self, data: pd.DataFrame) -> RandomForestRegressor:
+    def _outcome_noise(self, prop_type: str, recent_std: np.ndarray) -> np.ndarray:
         """
-        Train a RandomForest model on the historical data.
+        Spread of the actual result around the model's prediction: the model's
+        out-of-bag residual deviation, else each player's recent game-to-game
+        deviation.
         """
-        X = data.drop("actual_result", axis=1)
-        y = data["actual_result"]
-        
-        model = RandomForestRegressor(
-            n_estimators=100,
-            max_depth=10,
-            random_state=42
-        )
-        model.fit(X, y)
-        
-        return model
+        residual = model_registry.metadata("player", prop_type).get("residual_std")
+        if residual is not None:
+            return np.full(len(recent_std), float(residual))
+        return np.nan_to_num(np.asarray(recent_std, dtype=np.float64), nan=0.0)
 
-    def _calculate_confidence(
+    def _calculate_odds(
         self,
-        model: RandomForestRegressor,
-        features: List[float]
-    ) -> float:
+        over_probability: float,
+        under_probability: float
+    ) -> Dict[str, float]:
         """
-        Calculate prediction confidence based on model's prediction variance.
+        Calculate fair American odds for over/under from simulated probabilities.
         """
-        # Get predictions from all trees
-        predictions = []
-        for tree in model.estimators_:
-            predictions.append(tree.predict([features])[0])
-        
-        # Calculate confidence based on variance
-        variance = np.var(predictions)
-        max_variance = np.var(model.predict([[0] * len(features)]))
-        confidence = 1 - (variance / max_variance)
-        
-        return max(0, min(1, confidence))
+        over, under = self._calculate_odds_batch(np.array([over_probability]), np.array([under_probability]))
+        return {"over": float(over[0]), "under": float(under[0])}
 
-    def _calculate_odds(
+    def _calculate_odds_batch(
         self,
-        prediction: float,
-        prop_value: float,
-        confidence: float
-    ) -> Dict[str, float]:
+        over_probability: np.ndarray,
+        under_probability: np.ndarray
+    ):
         """
-        Calculate implied odds for over/under based on prediction and confidence.
+        American over/under prices for arrays of simulated probabilities. Pushes
+        are refunded, so each side is priced on the no-push probability; it is
+        kept within 1-99%, beyond which the simulation cannot resolve a price.
         """
-        # Base probability on prediction vs prop value
-        if prediction > prop_value:
-            over_prob = 0.5 + (confidence * 0.4)  # Max 90% probability
-            under_prob = 1 - over_prob
-        else:
-            under_prob = 0.5 + (confidence * 0.4)  # Max 90% probability
-            over_prob = 1 - under_prob
-        
-        # Convert to American odds
-        def to_american_odds(prob: float) -> float:
-            if prob >= 0.5:
-                return -100 * prob / (1 - prob)
-            else:
-                return 100 * (1 - prob) / prob
-        
-        return {
-            "over": round(to_american_odds(over_prob), 2),
-            "under": round(to_american_odds(under_prob), 2)
-        } 
\ No newline at end of file
+        decided = over_probability + under_probability
+        with np.errstate(divide="ignore", invalid="ignore"):
+            over_prob = np.where(decided > 0, over_probability / decided, 0.5)
+        over_prob = np.where(np.isnan(over_probability), np.nan, np.clip(over_prob, 0.01, 0.99))
+        over, under = two_way_prices(over_prob)
+        return np.round(over, 2), np.round(under, 2)
@@ -0,0 +1,365 @@
+from typing import Dict, List, Optional, Any, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import logging
+import multiprocessing
+import os
+import tempfile
+import numpy as np
+from scipy.special import ndtr
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..models.predictions import Prediction
+from .feature_vectors import FEATURE_DTYPE, PLAYER_FEATURES, feature_columns, vector_from_json
+from .forest_inference import flat_forest
+from .model_registry import model_registry
+from .odds import american_to_decimal
+from .training_data import DEFAULT_CHUNK_SIZE, LEGACY_FEATURES, training_filters
+from .training_pipeline import fit_player_model, residual_std
+
+logger = logging.getLogger(__name__)
+
+# Staking rules, each a one-line sequential update that vectorizes as a cumsum/cumprod:
+#   flat      `unit` on every bet
+#   fraction  a fixed `fraction` of the current bankroll
+#   kelly     `kelly_fraction` of the Kelly stake for the bet's edge, capped at `max_fraction`
+DEFAULT_CONFIG = {
+    "model_version": None,  # stored player model version, replayed on games after its training cutoff; None for the newest
+    "refit_folds": 0,  # > 0: ignore the artifact and refit on an expanding window before each fold
+    "staking": "flat",
+    "unit": 1.0,
+    "fraction": 0.01,
+    "kelly_fraction": 0.25,
+    "max_fraction": 0.05,
+    "bankroll": 100.0,
+    "min_edge": None,  # only bet when p * decimal_odds - 1 is at least this; None bets every row
+    "default_odds": -110.0,  # American price assumed for rows without stored odds
+    "calibration_bins": 10
+}
+
+ARRAYS = ("X", "prop_value", "actual", "over_odds", "under_odds", "game_date")
+
+def load_backtest_data(
+    db: Session,
+    prop_type: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    sample_rate: Optional[float] = None,
+    seed: int = 0,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Dict[str, np.ndarray]:
+    """
+    Settled predictions of a prop type in chronological (game_date, id) order,
+    streamed into column arrays the same way as load_training_data.
+    """
+    filters = training_filters(prop_type, since, until, sample_rate, seed) + [
+        Prediction.prop_value.isnot(None),
+        Prediction.game_date.isnot(None)
+    ]
+    total = db.query(func.count(Prediction.id)).filter(*filters).scalar() or 0
+    data = {
+        "X": np.empty((total, len(PLAYER_FEATURES)), dtype=np.float32),
+        "prop_value": np.empty(total),
+        "actual": np.empty(total),
+        "over_odds": np.empty(total),
+        "under_odds": np.empty(total),
+        "game_date": np.empty(total, dtype="datetime64[s]")
+    }
+    rows = db.query(
+        Prediction.feature_vector,
+        LEGACY_FEATURES,
+        Prediction.prop_value,
+        Prediction.actual_result,
+        Prediction.odds["over"].as_float(),
+        Prediction.odds["under"].as_float(),
+        Prediction.game_date
+    ).filter(*filters).order_by(
+        Prediction.game_date, Prediction.id
+    ).execution_options(stream_results=True).yield_per(chunk_size)
+
+    filled = skipped = 0
+    for packed, features, prop_value, actual, over, under, game_date in rows:
+        if filled >= total:
+            break
+        if packed is not None:
+            vector = np.frombuffer(packed, dtype=FEATURE_DTYPE)
+        else:
+            vector = vector_from_json(features, feature_columns(features) if isinstance(features, dict) else None)
+        if vector is None or len(vector) != len(PLAYER_FEATURES):
+            skipped += 1
+            continue
+        data["X"][filled] = vector
+        data["prop_value"][filled] = prop_value
+        data["actual"][filled] = actual
+        data["over_odds"][filled] = over if over is not None else np.nan
+        data["under_odds"][filled] = under if under is not None else np.nan
+        data["game_date"][filled] = np.datetime64(game_date.replace(tzinfo=None), "s")
+        filled += 1
+
+    if skipped:
+        logger.warning(f"Skipped {skipped} {prop_type} backtest rows with mismatched feature width")
+    return {name: values[:filled] for name, values in data.items()}
+
+def save_arrays(data: Dict[str, np.ndarray], directory: str):
+    for name in ARRAYS:
+        np.save(os.path.join(directory, f"{name}.npy"), data[name])
+
+def load_arrays(directory: str) -> Dict[str, np.ndarray]:
+    """Memory-mapped, so every worker process shares the page cache instead of a copy"""
+    return {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r") for name in ARRAYS}
+
+def over_under_probability(
+    tree_values: np.ndarray,
+    lines: np.ndarray,
+    noise: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    P(over) and P(under) when the outcome is a random tree's prediction plus
+    N(0, noise^2), the distribution OverUnderSimulator samples. The backtest
+    evaluates it in closed form, so millions of rows cost no random draws.
+    """
+    diff = tree_values - lines[:, None]
+    scale = noise[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = diff / scale
+    noisy = scale > 0
+    over = np.where(noisy, ndtr(z), diff > 0).mean(axis=1)
+    under = np.where(noisy, ndtr(-z), diff < 0).mean(axis=1)
+    return over, under
+
+def score_rows(
+    model: Any,
+    metadata: Dict[str, Any],
+    X: np.ndarray,
+    lines: np.ndarray,
+    chunk_rows: int = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Model prediction, P(over) and P(under) for every row, in bounded-memory chunks"""
+    chunk_rows = chunk_rows or settings.BACKTEST_CHUNK_ROWS
+    forest = flat_forest(model)
+    residual = metadata.get("residual_std")
+    predictions = np.empty(len(X))
+    over = np.empty(len(X))
+    under = np.empty(len(X))
+    for start in range(0, len(X), chunk_rows):
+        rows = slice(start, start + chunk_rows)
+        tree_values = forest.tree_values(X[rows])
+        noise = np.full(len(tree_values), float(residual)) if residual is not None else np.nan_to_num(
+            np.asarray(X[rows, 1], dtype=np.float64), nan=0.0
+        )
+        predictions[rows] = forest.mean(tree_values)
+        over[rows], under[rows] = over_under_probability(tree_values, lines[rows], noise)
+    return predictions, over, under
+
+def _drawdown(bankroll: np.ndarray, start: float) -> float:
+    path = np.concatenate([[start], bankroll])
+    peaks = np.maximum.accumulate(path)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdowns = np.where(peaks > 0, 1 - path / peaks, 0.0)
+    return float(drawdowns.max())
+
+def _calibration(probability: np.ndarray, won: np.ndarray, bins: int) -> List[Dict[str, Any]]:
+    edges = np.linspace(0, 1, bins + 1)
+    index = np.clip(np.digitize(probability, edges) - 1, 0, bins - 1)
+    counts = np.bincount(index, minlength=bins)
+    predicted = np.bincount(index, weights=probability, minlength=bins)
+    observed = np.bincount(index, weights=won, minlength=bins)
+    return [
+        {
+            "bin": f"{edges[i]:.2f}-{edges[i + 1]:.2f}",
+            "count": int(counts[i]),
+            "predicted": float(predicted[i] / counts[i]),
+            "observed": float(observed[i] / counts[i])
+        }
+        for i in range(bins) if counts[i]
+    ]
+
+def evaluate(
+    data: Dict[str, np.ndarray],
+    predictions: np.ndarray,
+    over_probability: np.ndarray,
+    under_probability: np.ndarray,
+    config: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Replay scored rows in order under a staking rule. Each prediction backs the
+    over when it is above the line, as in production; pushes are refunded.
+    """
+    lines = np.asarray(data["prop_value"])
+    actual = np.asarray(data["actual"])
+    backs_over = predictions > lines
+    outcome = np.sign(actual - lines)  # 1 over, -1 under, 0 push
+    result = np.where(outcome == 0, 0, np.where(backs_over == (outcome > 0), 1, -1))  # 1 won, -1 lost, 0 push
+
+    decided = over_probability + under_probability
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p_over = np.where(decided > 0, over_probability / decided, 0.5)
+    probability = np.where(backs_over, p_over, 1 - p_over)
+    american = np.where(backs_over, data["over_odds"], data["under_odds"])
+    decimal = american_to_decimal(np.where(np.isnan(american), config["default_odds"], american))
+    decimal = np.where(np.isnan(decimal), float(american_to_decimal(config["default_odds"])), decimal)
+    edge = probability * decimal - 1
+
+    bet = np.ones(len(lines), dtype=bool) if config["min_edge"] is None else edge >= config["min_edge"]
+    result, decimal, probability, edge = result[bet], decimal[bet], probability[bet], edge[bet]
+    returns = np.where(result > 0, decimal - 1, np.where(result < 0, -1.0, 0.0))  # per unit staked
+    start = float(config["bankroll"])
+
+    if config["staking"] == "flat":
+        stakes = np.full(len(returns), float(config["unit"]))
+        bankroll = start + np.cumsum(stakes * returns)
+    elif config["staking"] in ("fraction", "kelly"):
+        if config["staking"] == "fraction":
+            fractions = np.full(len(returns), float(config["fraction"]))
+        else:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                kelly = np.where(decimal > 1, edge / (decimal - 1), 0.0)
+            fractions = np.clip(config["kelly_fraction"] * kelly, 0, config["max_fraction"])
+        bankroll = start * np.cumprod(1 + fractions * returns)
+        stakes = fractions * np.concatenate([[start], bankroll[:-1]])
+    else:
+        raise ValueError(f"Unknown staking rule: {config['staking']}")
+
+    settled = result != 0
+    won = (result > 0).astype(float)
+    staked = float(stakes.sum())
+    profit = float((stakes * returns).sum())
+    clipped = np.clip(probability[settled], 1e-12, 1 - 1e-12)
+
+    months = np.asarray(data["game_date"])[bet].astype("datetime64[M]")
+    labels, month_index = np.unique(months, return_inverse=True)
+    month_profit = np.bincount(month_index, weights=stakes * returns, minlength=len(labels))
+    month_staked = np.bincount(month_index, weights=stakes, minlength=len(labels))
+
+    # Direction metrics over every non-push row, with "over" as the positive class
+    decided_rows = outcome != 0
+    true_over = (outcome > 0)[decided_rows]
+    said_over = backs_over[decided_rows]
+    true_positive = float(np.sum(true_over & said_over))
+    precision = true_positive / said_over.sum() if said_over.sum() else 0.0
+    recall = true_positive / true_over.sum() if true_over.sum() else 0.0
+
+    return {
+        "rows": int(len(lines)),
+        "bets": int(bet.sum()),
+        "wins": int((result > 0).sum()),
+        "losses": int((result < 0).sum()),
+        "pushes": int((result == 0).sum()),
+        "accuracy": float(won[settled].mean()) if settled.any() else 0.0,
+        "precision": float(precision),
+        "recall": float(recall),
+        "f1_score": float(2 * precision * recall / (precision + recall)) if precision + recall else 0.0,
+        "staked": staked,
+        "profit": profit,
+        # Percent, like the analytics endpoints
+        "roi": profit / staked * 100 if staked else 0.0,
+        "final_bankroll": float(bankroll[-1]) if len(bankroll) else start,
+        "max_drawdown": _drawdown(bankroll, start),
+        "brier_score": float(np.mean((probability[settled] - won[settled]) ** 2)) if settled.any() else None,
+        "log_loss": float(-np.mean(
+            won[settled] * np.log(clipped) + (1 - won[settled]) * np.log(1 - clipped)
+        )) if settled.any() else None,
+        "calibration": _calibration(probability[settled], won[settled], config["calibration_bins"]),
+        "monthly": [
+            {
+                "month": str(label),
+                "staked": float(month_staked[i]),
+                "profit": float(month_profit[i]),
+                "roi": float(month_profit[i] / month_staked[i] * 100) if month_staked[i] else 0.0
+            }
+            for i, label in enumerate(labels)
+        ]
+    }
+
+def run_backtest(data: Dict[str, np.ndarray], prop_type: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Score and evaluate one configuration out of sample: a stored model on the
+    games after its training cutoff, or walk-forward refits
+    """
+    config = dict(DEFAULT_CONFIG, **config)
+    X, lines = data["X"], np.asarray(data["prop_value"])
+    folds = int(config["refit_folds"])
+    if folds > 0:
+        # Expanding window: fold k is scored by a model fitted on everything before it
+        bounds = np.linspace(0, len(X), folds + 2).astype(int)
+        first = bounds[1]
+        predictions = np.empty(len(X) - first)
+        over = np.empty(len(X) - first)
+        under = np.empty(len(X) - first)
+        for lo, hi in zip(bounds[1:-1], bounds[2:]):
+            model = fit_player_model(np.asarray(X[:lo]), np.asarray(data["actual"][:lo]))
+            metadata = {"residual_std": residual_std(model, np.asarray(data["actual"][:lo]))}
+            rows = slice(lo - first, hi - first)
+            predictions[rows], over[rows], under[rows] = score_rows(model, metadata, X[lo:hi], lines[lo:hi])
+        data = {name: values[first:] for name, values in data.items()}
+        version = trained_through = None
+    else:
+        model, metadata, version = model_registry.load("player", prop_type, config["model_version"])
+        trained_through = metadata.get("trained_through")
+        if trained_through is None:
+            raise ValueError(f"{prop_type} model v{version} has no recorded training cutoff; backtest with refit_folds")
+        # Rows are in game date order and the model saw nothing after its cutoff
+        first = int(np.searchsorted(np.asarray(data["game_date"]), np.datetime64(trained_through, "s"), side="right"))
+        if first == len(X):
+            raise ValueError(f"No settled predictions after {prop_type} model v{version}'s training cutoff {trained_through}")
+        data = {name: values[first:] for name, values in data.items()}
+        predictions, over, under = score_rows(model, metadata, data["X"], np.asarray(data["prop_value"]))
+
+    report = evaluate(data, predictions, over, under, config)
+    report["model_version"] = version
+    report["trained_through"] = trained_through
+    report["config"] = {key: config[key] for key in DEFAULT_CONFIG}
+    return report
+
+def _run_stored(directory: str, prop_type: str, config: Dict[str, Any]) -> Dict[str, Any]:
+    """Process pool entry point: evaluate one configuration against the memory-mapped rows"""
+    return run_backtest(load_arrays(directory), prop_type, config)
+
+def run_backtests(
+    db: Session,
+    prop_type: str,
+    configs: List[Dict[str, Any]],
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    sample_rate: Optional[float] = None,
+    workers: int = None
+) -> List[Dict[str, Any]]:
+    """
+    Load the settled rows once, then evaluate every configuration, in parallel
+    across up to BACKTEST_WORKERS processes when there is more than one.
+    Each result carries the configuration it was run with, or its error.
+    """
+    workers = workers or settings.BACKTEST_WORKERS
+    data = load_backtest_data(db, prop_type, since, until, sample_rate)
+    if not len(data["actual"]):
+        return [{"config": config, "error": "No settled predictions to replay"} for config in configs]
+    logger.info(f"Backtesting {len(configs)} configurations of {prop_type} over {len(data['actual'])} rows")
+
+    if len(configs) == 1 or workers <= 1:
+        results = []
+        for config in configs:
+            try:
+                results.append(run_backtest(data, prop_type, config))
+            except Exception as e:
+                logger.error(f"Error backtesting {prop_type}: {str(e)}")
+                results.append({"config": config, "error": str(e)})
+        return results
+
+    with tempfile.TemporaryDirectory() as directory:
+        save_arrays(data, directory)
+        del data
+        # spawn, like the training pool, so workers never inherit the parent's database connections
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(configs)),
+            mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            futures = [pool.submit(_run_stored, directory, prop_type, config) for config in configs]
+            results = []
+            for config, future in zip(configs, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    logger.error(f"Error backtesting {prop_type}: {str(e)}")
+                    results.append({"config": config, "error": str(e)})
+    return results
@@ -0,0 +1,185 @@
+from typing import Dict, List, Optional, Any, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+import asyncio
+import logging
+import threading
+import time
+from ..core.config import settings
+from ..database import SessionLocal
+from ..models.entity_mapping import EntityMapping
+from .search_service import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+class EntityResolver:
+    """
+    Two-way lookup between ESPN and TheSportsDB IDs for teams, players and events.
+
+    Mappings are computed offline by `app.jobs.match_entities`, persisted in
+    the entity_mappings table and held in memory as plain dictionaries. The
+    tables are reloaded when the job has written new rows, checked cheaply
+    (row count and newest ID) every ENTITY_MAPPING_REFRESH_SECONDS: by `watch`
+    in the async API, else on the next lookup. A failed load is retried at
+    most every ENTITY_MAPPING_RETRY_SECONDS, so lookups in the meantime miss
+    instead of each opening a connection.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._espn: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._sportsdb: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self._check_at = 0.0
+        self._signature: Optional[Tuple[int, Optional[int]]] = None
+        self._watched = False
+
+    def _table_signature(self, db: Session) -> Tuple[int, Optional[int]]:
+        # The job replaces rows by delete and insert, so any write moves the count or the newest ID
+        count, newest = db.query(func.count(EntityMapping.id), func.max(EntityMapping.id)).one()
+        return int(count or 0), newest
+
+    def load(self, db: Session):
+        """Replace the in-memory tables with the persisted mappings"""
+        signature = self._table_signature(db)
+        espn, sportsdb = {}, {}
+        for row in db.query(EntityMapping).all():
+            mapping = {
+                "type": row.entity_type,
+                "espn_id": row.espn_id,
+                "sportsdb_id": row.sportsdb_id,
+                "name": row.name,
+                "league": row.league,
+                "match_score": row.match_score
+            }
+            espn[(row.entity_type, row.espn_id)] = mapping
+            sportsdb[(row.entity_type, row.sportsdb_id)] = mapping
+        with self._lock:
+            self._espn, self._sportsdb = espn, sportsdb
+            self._signature = signature
+            self._loaded = True
+        logger.info(f"Loaded {len(espn)} entity mappings")
+
+    def refresh(self) -> bool:
+        """Load the mappings, or reload them if the table has changed; False if the database failed"""
+        db = SessionLocal()
+        try:
+            if not self._loaded or self._table_signature(db) != self._signature:
+                self.load(db)
+            self._check_at = time.monotonic() + settings.ENTITY_MAPPING_REFRESH_SECONDS
+            return True
+        except Exception as e:
+            self._check_at = time.monotonic() + settings.ENTITY_MAPPING_RETRY_SECONDS
+            logger.error(f"Error loading entity mappings: {str(e)}")
+            return False
+        finally:
+            db.close()
+
+    def ensure_loaded(self):
+        if (self._loaded and self._watched) or time.monotonic() < self._check_at:
+            return
+        # Only one caller checks the table; the rest use the current mappings
+        if not self._load_lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() >= self._check_at:
+                self.refresh()
+        finally:
+            self._load_lock.release()
+
+    async def watch(self, interval: int = None):
+        """Periodically pick up mappings written by the matching job, off the request path"""
+        interval = interval or settings.ENTITY_MAPPING_REFRESH_SECONDS
+        self._watched = True
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                await asyncio.to_thread(self.refresh)
+        finally:
+            self._watched = False
+
+    def to_sportsdb(self, entity_type: str, espn_id: str) -> Optional[str]:
+        self.ensure_loaded()
+        mapping = self._espn.get((entity_type, str(espn_id)))
+        return mapping["sportsdb_id"] if mapping else None
+
+    def to_espn(self, entity_type: str, sportsdb_id: str) -> Optional[str]:
+        self.ensure_loaded()
+        mapping = self._sportsdb.get((entity_type, str(sportsdb_id)))
+        return mapping["espn_id"] if mapping else None
+
+    def get_by_espn(self, entity_type: str, espn_id: str) -> Optional[Dict[str, Any]]:
+        self.ensure_loaded()
+        return self._espn.get((entity_type, str(espn_id)))
+
+    def get_by_sportsdb(self, entity_type: str, sportsdb_id: str) -> Optional[Dict[str, Any]]:
+        self.ensure_loaded()
+        return self._sportsdb.get((entity_type, str(sportsdb_id)))
+
+    def save(self, db: Session, mappings: List[Dict[str, Any]]) -> int:
+        """Upsert mappings, dropping any rows that conflict on either ID, then reload"""
+        for mapping in mappings:
+            db.query(EntityMapping).filter(
+                EntityMapping.entity_type == mapping["type"],
+                (EntityMapping.espn_id == mapping["espn_id"]) |
+                (EntityMapping.sportsdb_id == mapping["sportsdb_id"])
+            ).delete(synchronize_session=False)
+            db.add(EntityMapping(
+                entity_type=mapping["type"],
+                espn_id=mapping["espn_id"],
+                sportsdb_id=mapping["sportsdb_id"],
+                name=mapping["name"],
+                league=mapping.get("league"),
+                match_score=mapping["match_score"]
+            ))
+        db.commit()
+        self.load(db)
+        return len(mappings)
+
+    def stats(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for entity_type, _ in self._espn:
+            counts[entity_type] = counts.get(entity_type, 0) + 1
+        return counts
+
+def match_entities(
+    entity_type: str,
+    espn_items: List[Dict[str, Any]],
+    sportsdb_items: List[Dict[str, Any]],
+    league: Optional[str] = None,
+    min_score: float = 0.6
+) -> List[Dict[str, Any]]:
+    """
+    Match two lists of {"id", "name", "aliases"} records one-to-one by name.
+
+    Exact normalized matches are taken first; the remaining ESPN records are
+    fuzzy-matched against unclaimed TheSportsDB records, best score first.
+    """
+    index = SearchIndex()
+    for item in sportsdb_items:
+        index.add(entity_type, item["id"], item["name"], item.get("aliases"))
+
+    candidates = []
+    for item in espn_items:
+        for query in [item["name"]] + list(item.get("aliases") or []):
+            for result in index.search(query, kind=entity_type, limit=3, min_score=min_score):
+                candidates.append((result["score"], str(item["id"]), result["id"], item["name"]))
+
+    mappings = []
+    claimed_espn, claimed_sportsdb = set(), set()
+    for score, espn_id, sportsdb_id, name in sorted(candidates, key=lambda c: -c[0]):
+        if espn_id in claimed_espn or sportsdb_id in claimed_sportsdb:
+            continue
+        claimed_espn.add(espn_id)
+        claimed_sportsdb.add(sportsdb_id)
+        mappings.append({
+            "type": entity_type,
+            "espn_id": espn_id,
+            "sportsdb_id": sportsdb_id,
+            "name": name,
+            "league": league,
+            "match_score": score
+        })
+    return mappings
+
+entity_resolver = EntityResolver()
@@ -0,0 +1,43 @@
+from typing import Dict, List, Optional, Any, Sequence
+import numpy as np
+
+# Bump when the order or meaning of PLAYER_FEATURES changes; packed vectors
+# from other versions are ignored by training and scoring.
+FEATURE_SCHEMA_VERSION = 1
+
+# Order of the vector built by AnalyticsService._prepare_features
+PLAYER_FEATURES = [
+    "recent_mean",
+    "recent_std",
+    "recent_min",
+    "recent_max",
+    "last_game",
+    "opponent_defense_rating",
+    "home_away_factor",
+    "rest_days",
+    "back_to_back"
+]
+
+FEATURE_DTYPE = np.dtype("<f4")
+
+def pack_features(values: Sequence[float]) -> bytes:
+    """Little-endian float32 bytes for a feature vector"""
+    return np.asarray(values, dtype=FEATURE_DTYPE).tobytes()
+
+def unpack_features(blob: bytes) -> np.ndarray:
+    """Read-only float32 view of a packed vector"""
+    return np.frombuffer(blob, dtype=FEATURE_DTYPE)
+
+def display_features(values: Sequence[float]) -> Dict[str, float]:
+    """Named features for the JSON column shown to users"""
+    return {name: float(value) for name, value in zip(PLAYER_FEATURES, values)}
+
+def feature_columns(features: Dict[str, Any]) -> List[str]:
+    """Column order for a JSON feature dict: the schema order when it matches, else sorted keys"""
+    return PLAYER_FEATURES if set(PLAYER_FEATURES) <= set(features) else sorted(features)
+
+def vector_from_json(features: Any, columns: Optional[List[str]] = None) -> Optional[List[float]]:
+    """Feature vector from a stored JSON value: a legacy list, or a dict read in `columns` order"""
+    if isinstance(features, dict):
+        return [features.get(column, 0.0) for column in columns or feature_columns(features)]
+    return features
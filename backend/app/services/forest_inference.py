@@ -0,0 +1,118 @@
+from typing import Any, Tuple
+import threading
+import weakref
+import numpy as np
+
+class FlatForest:
+    """
+    A fitted sklearn RandomForest/ExtraTrees ensemble flattened into contiguous
+    node arrays, so every tree is evaluated for a whole batch in one vectorized
+    pass instead of one sklearn call per tree.
+
+    Children are interleaved in one array (left at 2*i, right at 2*i + 1) and
+    leaves point back to themselves, so walking `depth` steps from the roots
+    is one gather per step and lands every (row, tree) pair on its leaf.
+    Inputs are cast to float32 and the per-tree values are summed in
+    estimator order, as sklearn does, so predictions are bit-for-bit identical
+    to `model.predict` / `predict_proba`.
+    """
+    def __init__(self, model: Any):
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        if any(tree.n_outputs != 1 for tree in trees):
+            raise ValueError("Only single-output forests are supported")
+        self.is_classifier = hasattr(model, "classes_")
+        self.n_trees = len(trees)
+        self.n_features = model.n_features_in_
+        self.depth = max(tree.max_depth for tree in trees)
+
+        offsets = np.cumsum([0] + [tree.node_count for tree in trees[:-1]])
+        children, feature, threshold, missing_right, value = [], [], [], [], []
+        for offset, tree in zip(offsets, trees):
+            index = np.arange(tree.node_count)
+            leaf = tree.children_left == -1
+            children.append(np.stack([
+                np.where(leaf, index, tree.children_left) + offset,
+                np.where(leaf, index, tree.children_right) + offset
+            ], axis=1).ravel())
+            feature.append(np.where(leaf, 0, tree.feature))
+            # x > inf is never true, so leaves always take their (self) left child
+            threshold.append(np.where(leaf, np.inf, tree.threshold))
+            missing_left = np.asarray(getattr(tree, "missing_go_to_left", np.zeros(tree.node_count)), dtype=bool)
+            missing_right.append(~missing_left & ~leaf)
+            if self.is_classifier:
+                # Same normalization as DecisionTreeClassifier.predict_proba
+                proba = tree.value[:, 0, :model.n_classes_].copy()
+                normalizer = proba.sum(axis=1, keepdims=True)
+                normalizer[normalizer == 0.0] = 1.0
+                value.append(proba / normalizer)
+            else:
+                value.append(tree.value[:, 0, 0])
+
+        self.roots = offsets.astype(np.int32)
+        self.children = np.concatenate(children).astype(np.int32)
+        self.feature = np.concatenate(feature).astype(np.int32)
+        self.threshold = np.concatenate(threshold)
+        self.missing_right = np.concatenate(missing_right)
+        self.value = np.concatenate(value)
+        self.node_count = len(self.threshold)
+
+        # Spread of the trees at the all-zeros input, used to normalize confidence
+        self.baseline_variance = 0.0
+        if not self.is_classifier:
+            self.baseline_variance = float(self.predict_with_variance(np.zeros((1, self.n_features)))[1][0])
+
+    def leaves(self, X) -> np.ndarray:
+        """Global leaf index for every (row, tree), shape (n_rows, n_trees)"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(
+                f"X has {X.shape[-1]} features, but the forest is expecting {self.n_features} features as input"
+            )
+        n_rows = X.shape[0]
+        flat = X.ravel()
+        has_nan = bool(np.isnan(flat).any())
+        # Tree-major order keeps each step's node lookups within one tree's block
+        row_start = np.tile(np.arange(n_rows, dtype=np.int64) * self.n_features, self.n_trees)
+        nodes = np.repeat(self.roots, n_rows)
+        for _ in range(self.depth):
+            x = flat.take(row_start + self.feature.take(nodes))
+            go_right = x > self.threshold.take(nodes)
+            if has_nan:
+                # NaN compares false; send it the way the split was trained to
+                go_right |= np.isnan(x) & self.missing_right.take(nodes)
+            nodes = self.children.take(2 * nodes + go_right)
+        return np.ascontiguousarray(nodes.reshape(self.n_trees, n_rows).T)
+
+    def tree_values(self, X) -> np.ndarray:
+        """Every tree's output: (n_rows, n_trees), or (n_rows, n_trees, n_classes) for classifiers"""
+        return self.value[self.leaves(X)]
+
+    def mean(self, values: np.ndarray) -> np.ndarray:
+        """Average over trees of a tree_values result"""
+        # cumsum adds strictly in tree order, matching sklearn's accumulation exactly
+        return np.cumsum(values, axis=1)[:, -1] / self.n_trees
+
+    def predict(self, X) -> np.ndarray:
+        """Same as model.predict for regressors and model.predict_proba for classifiers"""
+        return self.mean(self.tree_values(X))
+
+    def predict_with_variance(self, X) -> Tuple[np.ndarray, np.ndarray]:
+        """Mean prediction and variance across trees for each row, from a single pass"""
+        if self.is_classifier:
+            raise ValueError("Per-tree variance is only defined for regressors")
+        values = self.tree_values(X)
+        return self.mean(values), np.var(values, axis=1)
+
+_lock = threading.Lock()
+_compiled: "weakref.WeakKeyDictionary[Any, FlatForest]" = weakref.WeakKeyDictionary()
+
+def flat_forest(model: Any) -> FlatForest:
+    """Flattened form of a fitted forest, built once per model object"""
+    forest = _compiled.get(model)
+    if forest is None:
+        forest = FlatForest(model)
+        with _lock:
+            _compiled[model] = forest
+    return forest
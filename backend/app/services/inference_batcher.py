@@ -0,0 +1,106 @@
+from typing import Dict, Any, Sequence, Tuple
+from collections import deque
+import asyncio
+import logging
+import time
+import numpy as np
+from ..core.config import settings
+from .forest_inference import FlatForest
+from .llm_metrics import percentile
+
+logger = logging.getLogger(__name__)
+
+class InferenceBatcher:
+    """
+    Coalesces concurrent single-row predictions for the same model into one
+    batched pass over every tree.
+
+    The first row for a model opens a batch; it is flushed when it reaches
+    `max_rows` or `window_ms` after it opened, whichever comes first, and each
+    caller's future receives its own row of the result.
+    """
+    def __init__(self, max_rows: int = None, window_ms: float = None, window: int = 1000):
+        self.max_rows = max_rows or settings.INFERENCE_BATCH_MAX_ROWS
+        self.window_ms = window_ms if window_ms is not None else settings.INFERENCE_BATCH_WINDOW_MS
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._batch_sizes = deque(maxlen=window)
+        self._queue_latencies = deque(maxlen=window)
+        self._compute_latencies = deque(maxlen=window)
+        self.batches = 0
+        self.rows = 0
+
+    async def predict(self, forest: FlatForest, features: Sequence[float]) -> Tuple[float, float]:
+        """Mean prediction and per-tree variance for one row"""
+        mean, variance, _ = await self.predict_trees(forest, features)
+        return mean, variance
+
+    async def predict_trees(self, forest: FlatForest, features: Sequence[float]) -> Tuple[float, float, np.ndarray]:
+        """Mean, per-tree variance and every tree's prediction for one row"""
+        # Checked before joining a batch, so a malformed row fails only its own caller
+        if np.ndim(features) != 1 or len(features) != forest.n_features:
+            raise ValueError(f"Expected {forest.n_features} features, got {np.shape(features)}")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        # Keyed on the forest object, so a hot-swapped model starts its own batches
+        key = id(forest)
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = {"forest": forest, "items": [], "timer": None}
+            self._pending[key] = batch
+            batch["timer"] = loop.call_later(self.window_ms / 1000, self._flush, key)
+        batch["items"].append((features, future, time.perf_counter()))
+        if len(batch["items"]) >= self.max_rows:
+            self._flush(key)
+        return await future
+
+    def _flush(self, key: int):
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        batch["timer"].cancel()
+        items = batch["items"]
+        started = time.perf_counter()
+        try:
+            forest = batch["forest"]
+            values = forest.tree_values(np.array([features for features, _, _ in items]))
+            means, variances = forest.mean(values), np.var(values, axis=1)
+        except Exception as e:
+            logger.error(f"Error in batched inference: {str(e)}")
+            for _, future, _ in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finished = time.perf_counter()
+
+        for i, (_, future, queued_at) in enumerate(items):
+            self._queue_latencies.append(started - queued_at)
+            if not future.done():
+                future.set_result((float(means[i]), float(variances[i]), values[i]))
+        self._batch_sizes.append(len(items))
+        self._compute_latencies.append(finished - started)
+        self.batches += 1
+        self.rows += len(items)
+
+    def stats(self) -> Dict[str, Any]:
+        if not self.batches:
+            return {"batches": 0, "rows": 0, "max_rows": self.max_rows, "window_ms": self.window_ms}
+        sizes = list(self._batch_sizes)
+        queue_ms = [latency * 1000 for latency in self._queue_latencies]
+        compute_ms = [latency * 1000 for latency in self._compute_latencies]
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "max_rows": self.max_rows,
+            "window_ms": self.window_ms,
+            "avg_batch_size": sum(sizes) / len(sizes),
+            "batch_size_p50": percentile(sizes, 50),
+            "batch_size_p95": percentile(sizes, 95),
+            "batch_size_max": max(sizes),
+            "queue_latency_ms_p50": percentile(queue_ms, 50),
+            "queue_latency_ms_p95": percentile(queue_ms, 95),
+            "queue_latency_ms_p99": percentile(queue_ms, 99),
+            "compute_latency_ms_p50": percentile(compute_ms, 50),
+            "compute_latency_ms_p95": percentile(compute_ms, 95)
+        }
+
+inference_batcher = InferenceBatcher()
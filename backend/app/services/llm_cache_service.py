@@ -0,0 +1,247 @@
+from typing import Dict, List, Optional, Any, Awaitable, Callable, Tuple
+from collections import OrderedDict
+from concurrent.futures import Executor, Future
+from datetime import datetime, timezone
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from ..core.config import settings
+from ..database import SessionLocal
+from ..models.llm_cache import LLMCacheEntry
+
+logger = logging.getLogger(__name__)
+
+class LLMCache:
+    """
+    Response cache for chat completions.
+
+    Requests are keyed on a canonical (model, messages, params) tuple, both
+    exactly and after whitespace/case normalization. Concurrent identical
+    requests share one upstream call. Entries live in an in-memory LRU backed
+    by the llm_cache table so they survive restarts and are shared by workers.
+    Synchronous callers coalesce the same way through `submit`.
+    """
+    def __init__(self):
+        self.max_entries = settings.LLM_CACHE_MAX_ENTRIES
+        self.persist = settings.LLM_CACHE_PERSIST
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._threaded: Dict[str, Future] = {}
+        self._threaded_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _hash(payload: Dict[str, Any]) -> str:
+        encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def make_keys(self, model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> Tuple[str, str]:
+        """Return the exact and normalized cache keys for a request"""
+        exact = self._hash({"model": model, "messages": messages, "params": params})
+        normalized_messages = [
+            {"role": m["role"], "content": re.sub(r"\s+", " ", m["content"]).strip().lower()}
+            for m in messages
+        ]
+        normalized = self._hash({"model": model, "messages": normalized_messages, "params": params})
+        return exact, normalized
+
+    def ttl_until(self, kickoff: Optional[datetime]) -> int:
+        """TTL that expires at kickoff, clamped to the configured bounds"""
+        if kickoff is None:
+            return settings.LLM_CACHE_TTL_SECONDS
+        if kickoff.tzinfo is None:
+            kickoff = kickoff.replace(tzinfo=timezone.utc)
+        remaining = (kickoff - datetime.now(timezone.utc)).total_seconds()
+        return int(min(max(remaining, settings.LLM_CACHE_MIN_TTL_SECONDS), settings.LLM_CACHE_MAX_TTL_SECONDS))
+
+    def _memory_get(self, key: str) -> Optional[str]:
+        with self._memory_lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            expires_at, response = entry
+            if expires_at < time.time():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            return response
+
+    def _memory_set(self, key: str, response: str, expires_at: float):
+        with self._memory_lock:
+            self._memory[key] = (expires_at, response)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _store_get(self, keys: Tuple[str, ...]) -> Optional[Tuple[str, float]]:
+        db = SessionLocal()
+        try:
+            entry = db.query(LLMCacheEntry).filter(
+                LLMCacheEntry.key.in_(keys),
+                LLMCacheEntry.expires_at > datetime.now(timezone.utc)
+            ).first()
+            if entry:
+                return entry.response, entry.expires_at.timestamp()
+        except Exception as e:
+            logger.error(f"Error reading LLM cache: {str(e)}")
+        finally:
+            db.close()
+        return None
+
+    def _store_set(self, keys: Tuple[str, ...], model: str, response: str, expires_at: float):
+        db = SessionLocal()
+        try:
+            expires = datetime.fromtimestamp(expires_at, tz=timezone.utc)
+            for key in keys:
+                db.merge(LLMCacheEntry(key=key, model=model, response=response, expires_at=expires))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error writing LLM cache: {str(e)}")
+        finally:
+            db.close()
+
+    def _memory_lookup(self, keys: Tuple[str, ...]) -> Optional[str]:
+        for key in keys:
+            response = self._memory_get(key)
+            if response is not None:
+                return response
+        return None
+
+    def _promote(self, keys: Tuple[str, ...], stored: Optional[Tuple[str, float]]) -> Optional[str]:
+        if not stored:
+            return None
+        response, expires_at = stored
+        for key in keys:
+            self._memory_set(key, response, expires_at)
+        return response
+
+    def get(self, keys: Tuple[str, ...]) -> Optional[str]:
+        response = self._memory_lookup(keys)
+        if response is None and self.persist:
+            response = self._promote(keys, self._store_get(keys))
+        return response
+
+    def set(self, keys: Tuple[str, ...], model: str, response: str, ttl: int):
+        expires_at = time.time() + ttl
+        for key in keys:
+            self._memory_set(key, response, expires_at)
+        if self.persist:
+            self._store_set(keys, model, response, expires_at)
+
+    # Async variants: the database tier runs in a worker thread so it never blocks the event loop
+
+    async def aget(self, keys: Tuple[str, ...]) -> Optional[str]:
+        response = self._memory_lookup(keys)
+        if response is None and self.persist:
+            response = self._promote(keys, await asyncio.to_thread(self._store_get, keys))
+        return response
+
+    async def aset(self, keys: Tuple[str, ...], model: str, response: str, ttl: int):
+        expires_at = time.time() + ttl
+        for key in keys:
+            self._memory_set(key, response, expires_at)
+        if self.persist:
+            await asyncio.to_thread(self._store_set, keys, model, response, expires_at)
+
+    async def get_or_create(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        params: Dict[str, Any],
+        create: Callable[[], Awaitable[str]],
+        ttl: Optional[int] = None
+    ) -> str:
+        """
+        Return a cached response or call `create`, sharing the call with any
+        identical request already in flight. Failures are not cached.
+        """
+        keys = self.make_keys(model, messages, params)
+        cached = await self.aget(keys)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        exact, normalized = keys
+        in_flight = self._in_flight.get(normalized)
+        if in_flight is not None:
+            self.hits += 1
+            return await asyncio.shield(in_flight)
+
+        self.misses += 1
+        # The call runs as its own task so that no single caller going away
+        # (e.g. a disconnected SSE client) cancels it for the others; it
+        # still completes and fills the cache
+        task = asyncio.ensure_future(self._create(keys, model, create, ttl))
+        self._in_flight[normalized] = task
+        task.add_done_callback(lambda done: self._finish(normalized, done))
+        return await asyncio.shield(task)
+
+    async def _create(
+        self,
+        keys: Tuple[str, ...],
+        model: str,
+        create: Callable[[], Awaitable[str]],
+        ttl: Optional[int]
+    ) -> str:
+        response = await create()
+        await self.aset(keys, model, response, ttl or settings.LLM_CACHE_TTL_SECONDS)
+        return response
+
+    def _finish(self, normalized: str, task: asyncio.Task):
+        if self._in_flight.get(normalized) is task:
+            del self._in_flight[normalized]
+        # Mark the exception as retrieved when every caller had gone
+        if not task.cancelled():
+            task.exception()
+
+    def submit(
+        self,
+        keys: Tuple[str, ...],
+        executor: Executor,
+        create: Callable[[], str],
+        max_pending: int
+    ) -> Optional[Future]:
+        """
+        Run a blocking `create` on `executor`, or return the future of the
+        identical request already running there. Returns None when
+        `max_pending` calls are already queued or running, so a slow upstream
+        cannot build an unbounded backlog.
+        """
+        normalized = keys[1]
+        with self._threaded_lock:
+            future = self._threaded.get(normalized)
+            if future is not None:
+                self.hits += 1
+                return future
+            if len(self._threaded) >= max_pending:
+                return None
+            self.misses += 1
+            future = executor.submit(create)
+            self._threaded[normalized] = future
+
+        def finish(done: Future):
+            with self._threaded_lock:
+                if self._threaded.get(normalized) is done:
+                    del self._threaded[normalized]
+
+        future.add_done_callback(finish)
+        return future
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._memory),
+            "in_flight": len(self._in_flight) + len(self._threaded),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+llm_cache = LLMCache()
@@ -0,0 +1,16 @@
+from typing import Optional
+from openai import AsyncAzureOpenAI, AsyncOpenAI
+from ..core.config import settings
+
+def create_async_client(api_version: Optional[str] = None):
+    """
+    Async chat client for Azure OpenAI, or for any OpenAI-compatible server
+    (such as mock_llm_server.py) when LLM_BASE_URL is set.
+    """
+    if settings.LLM_BASE_URL:
+        return AsyncOpenAI(base_url=settings.LLM_BASE_URL, api_key=settings.AZURE_OPENAI_KEY or "local")
+    return AsyncAzureOpenAI(
+        api_key=settings.AZURE_OPENAI_KEY,
+        azure_endpoint=settings.AZURE_OPENAI_ENDPOINT,
+        api_version=api_version or settings.AZURE_OPENAI_VERSION
+    )
@@ -0,0 +1,399 @@
+from typing import Dict, List, Optional, Any, Callable, Iterator
+from datetime import datetime, timedelta, timezone
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from sqlalchemy import func
+from ..core.config import settings
+from ..database import SessionLocal
+from ..models.llm_job import LLMJob
+from .llm_cache_service import llm_cache
+from .llm_metrics import llm_metrics
+
+logger = logging.getLogger(__name__)
+
+ACTIVE = ("queued", "running")
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at its configured depth"""
+
+class UserLimitError(Exception):
+    """Raised when a user already has the maximum number of active jobs"""
+
+class LLMJobQueue:
+    """
+    Bounded pool of async workers for chat completions, usable from sync code.
+
+    The workers run on a private event loop in a daemon thread, so a WSGI
+    worker only spends the time needed to enqueue a job. Callers then poll
+    `get`, block briefly on `wait`, or tail tokens with `iter_tokens`.
+
+    Job state is also kept in the llm_jobs table, so that any WSGI process can
+    answer for a job another one is running: the owning process writes the
+    output so far every LLM_JOB_FLUSH_SECONDS, other processes poll it every
+    LLM_JOB_POLL_SECONDS, and cancellation from another process is a flag the
+    owner picks up at its next write. The queue depth and per-user limits are
+    counted there across processes; the count and the insert are not atomic,
+    so a burst can overshoot them by a few jobs.
+    """
+    def __init__(self, client_factory: Callable[[], Any]):
+        self.client_factory = client_factory
+        self.workers = settings.LLM_WORKER_CONCURRENCY
+        self.max_depth = settings.LLM_QUEUE_MAX_DEPTH
+        self.max_per_user = settings.LLM_MAX_JOBS_PER_USER
+        self.job_ttl = settings.LLM_JOB_TTL_SECONDS
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._expired_at = 0.0
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._started = threading.Event()
+
+    def start(self):
+        with self._lock:
+            if self._loop is not None:
+                return
+            self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._run_loop, name="llm-jobs", daemon=True).start()
+        self._started.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        self._client = self.client_factory()
+        for _ in range(self.workers):
+            self._loop.create_task(self._worker())
+        self._started.set()
+        self._loop.run_forever()
+
+    def submit(
+        self,
+        user_id: str,
+        model: str,
+        messages: List[Dict[str, str]],
+        params: Dict[str, Any],
+        ttl: Optional[int] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Enqueue a completion and return its job record. Cache hits complete
+        immediately; otherwise raises QueueFullError or UserLimitError when
+        the pool or the user's quota is exhausted.
+        """
+        self.start()
+        keys = llm_cache.make_keys(model, messages, params)
+        cached = llm_cache.get(keys)
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "user_id": user_id,
+            "status": "queued",
+            "result": None,
+            "error": None,
+            "tokens": [],
+            "created_at": time.time(),
+            "finished_at": None,
+            "metadata": metadata or {},
+            "condition": threading.Condition()
+        }
+        db = SessionLocal()
+        try:
+            with self._lock:
+                self._expire_jobs(db)
+                if cached is None:
+                    active = db.query(LLMJob).filter(LLMJob.status.in_(ACTIVE))
+                    if active.count() >= self.max_depth:
+                        raise QueueFullError("LLM queue is full")
+                    if active.filter(LLMJob.user_key == user_id).count() >= self.max_per_user:
+                        raise UserLimitError("Too many active jobs for this user")
+                else:
+                    self._finish(job, result=cached)
+                db.add(LLMJob(
+                    id=job["id"],
+                    user_key=user_id,
+                    status=job["status"],
+                    result=job["result"],
+                    details=job["metadata"],
+                    owner=self.owner,
+                    finished_at=self._timestamp(job["finished_at"])
+                ))
+                db.commit()
+                self._jobs[job["id"]] = job
+        finally:
+            db.close()
+        if cached is not None:
+            return self._public(job)
+
+        request = (job, model, messages, params, ttl or settings.LLM_CACHE_TTL_SECONDS, keys)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, request)
+        return self._public(job)
+
+    async def _worker(self):
+        while True:
+            job, model, messages, params, ttl, keys = await self._queue.get()
+            try:
+                with self._lock:
+                    if job["status"] != "queued":
+                        continue
+                    job["status"] = "running"
+                if await asyncio.to_thread(self._save, job):
+                    # Cancelled from another process while it was queued
+                    raise asyncio.CancelledError
+                with self._lock:
+                    job["task"] = asyncio.ensure_future(self._run(job, model, messages, params))
+                result = await job["task"]
+                await asyncio.to_thread(llm_cache.set, keys, model, result, ttl)
+                with self._lock:
+                    self._finish(job, result=result)
+            except asyncio.CancelledError:
+                with self._lock:
+                    self._finish(job, error="cancelled", status="cancelled")
+            except Exception as e:
+                logger.error(f"LLM job {job['id']} failed: {str(e)}")
+                with self._lock:
+                    self._finish(job, error=str(e))
+            finally:
+                job.pop("task", None)
+                if job["finished_at"] is not None:
+                    await asyncio.to_thread(self._save, job)
+                self._queue.task_done()
+
+    async def _run(self, job: Dict[str, Any], model: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+        started = time.perf_counter()
+        stream = await self._client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            **params
+        )
+        flush_at = time.monotonic() + settings.LLM_JOB_FLUSH_SECONDS
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if token:
+                    with job["condition"]:
+                        job["tokens"].append(token)
+                        job["condition"].notify_all()
+                    if time.monotonic() >= flush_at:
+                        flush_at = time.monotonic() + settings.LLM_JOB_FLUSH_SECONDS
+                        if await asyncio.to_thread(self._save, job):
+                            raise asyncio.CancelledError
+        finally:
+            await stream.close()
+        completion = "".join(job["tokens"])
+        llm_metrics.record(
+            job["metadata"].get("operation", "llm_job"),
+            time.perf_counter() - started,
+            prompt="".join(m["content"] for m in messages),
+            completion=completion
+        )
+        return completion
+
+    def cancel(self, job_id: str):
+        """Cancel a queued or running job; its partial output is discarded"""
+        job = self._jobs.get(job_id)
+        if not job:
+            # Owned by another process, which checks the flag at its next write
+            self._update(job_id, cancel_requested=True)
+            return
+        with self._lock:
+            if job["status"] == "queued":
+                self._finish(job, error="cancelled", status="cancelled")
+                task = None
+            else:
+                task = job.get("task")
+        if task is not None:
+            self._loop.call_soon_threadsafe(task.cancel)
+        elif job["finished_at"] is not None:
+            self._save(job)
+
+    def _finish(
+        self,
+        job: Dict[str, Any],
+        result: Optional[str] = None,
+        error: Optional[str] = None,
+        status: Optional[str] = None
+    ):
+        with job["condition"]:
+            job["status"] = status or ("failed" if error else "completed")
+            job["result"] = result
+            job["error"] = error
+            job["finished_at"] = time.time()
+            job["condition"].notify_all()
+
+    @staticmethod
+    def _timestamp(value: Optional[float]) -> Optional[datetime]:
+        return datetime.fromtimestamp(value, tz=timezone.utc) if value is not None else None
+
+    def _save(self, job: Dict[str, Any]) -> bool:
+        """Write a local job's state to the table; True if another process asked to cancel it"""
+        with job["condition"]:
+            finished = job["finished_at"] is not None
+            values = {
+                "status": job["status"],
+                "result": job["result"] if finished else "".join(job["tokens"]),
+                "error": job["error"],
+                "finished_at": self._timestamp(job["finished_at"])
+            }
+        return self._update(job["id"], **values)
+
+    def _update(self, job_id: str, **values) -> bool:
+        db = SessionLocal()
+        try:
+            row = db.get(LLMJob, job_id)
+            if row is None:
+                return False
+            for name, value in values.items():
+                setattr(row, name, value)
+            # Also a heartbeat, so jobs of a process that died can be expired
+            row.updated_at = datetime.now(timezone.utc)
+            db.commit()
+            return bool(row.cancel_requested)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Error saving LLM job {job_id}: {str(e)}")
+            return False
+        finally:
+            db.close()
+
+    def _load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """A job owned by another process, as stored"""
+        db = SessionLocal()
+        try:
+            row = db.get(LLMJob, job_id)
+            if row is None:
+                return None
+            return {
+                "job_id": row.id,
+                "status": row.status,
+                "result": row.result,
+                "error": row.error,
+                "metadata": row.details or {},
+                "finished": row.finished_at is not None
+            }
+        except Exception as e:
+            logger.error(f"Error loading LLM job {job_id}: {str(e)}")
+            return None
+        finally:
+            db.close()
+
+    def _expire_jobs(self, db):
+        now = time.time()
+        cutoff = now - self.job_ttl
+        for job_id in [j["id"] for j in self._jobs.values() if j["finished_at"] and j["finished_at"] < cutoff]:
+            del self._jobs[job_id]
+        if now - self._expired_at < self.job_ttl / 10:
+            return
+        self._expired_at = now
+        cutoff_at = self._timestamp(cutoff)
+        db.query(LLMJob).filter(LLMJob.finished_at < cutoff_at).delete(synchronize_session=False)
+        # Active jobs nobody has written to for a whole TTL belong to a process that has gone
+        db.query(LLMJob).filter(LLMJob.status.in_(ACTIVE), LLMJob.updated_at < cutoff_at).update({
+            "status": "failed",
+            "error": "Worker lost",
+            "finished_at": datetime.now(timezone.utc)
+        }, synchronize_session=False)
+        db.commit()
+
+    def _public(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "job_id": job["id"],
+            "status": job["status"],
+            "result": job["result"],
+            "error": job["error"],
+            "metadata": job["metadata"]
+        }
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        if job:
+            return self._public(job)
+        stored = self._load(job_id)
+        if stored:
+            stored.pop("finished")
+        return stored
+
+    def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """Block up to `timeout` seconds for a job to finish and return its state"""
+        job = self._jobs.get(job_id)
+        if not job:
+            deadline = time.monotonic() + timeout
+            stored = self._load(job_id)
+            while stored and not stored["finished"] and time.monotonic() < deadline:
+                time.sleep(settings.LLM_JOB_POLL_SECONDS)
+                stored = self._load(job_id)
+            if stored:
+                stored.pop("finished")
+            return stored
+        with job["condition"]:
+            job["condition"].wait_for(lambda: job["finished_at"] is not None, timeout=timeout)
+        return self._public(job)
+
+    def iter_tokens(self, job_id: str, heartbeat: float = 15.0) -> Iterator[Optional[str]]:
+        """
+        Yield tokens as the job produces them. Yields None as a keep-alive
+        when no token arrives within `heartbeat` seconds.
+        """
+        job = self._jobs.get(job_id)
+        if not job:
+            yield from self._iter_stored_tokens(job_id, heartbeat)
+            return
+        position = 0
+        while True:
+            with job["condition"]:
+                job["condition"].wait_for(
+                    lambda: len(job["tokens"]) > position or job["finished_at"] is not None,
+                    timeout=heartbeat
+                )
+                tokens = job["tokens"][position:]
+                finished = job["finished_at"] is not None
+            if tokens:
+                position += len(tokens)
+                yield "".join(tokens)
+            elif finished:
+                if position == 0 and job["result"]:
+                    yield job["result"]
+                return
+            else:
+                yield None
+
+    def _iter_stored_tokens(self, job_id: str, heartbeat: float) -> Iterator[Optional[str]]:
+        """Tail a job owned by another process by polling its stored output"""
+        position = 0
+        quiet_since = time.monotonic()
+        while True:
+            stored = self._load(job_id)
+            if stored is None:
+                return
+            output = stored["result"] or ""
+            if len(output) > position:
+                yield output[position:]
+                position = len(output)
+                quiet_since = time.monotonic()
+            elif stored["finished"]:
+                return
+            elif time.monotonic() - quiet_since >= heartbeat:
+                yield None
+                quiet_since = time.monotonic()
+            time.sleep(settings.LLM_JOB_POLL_SECONDS)
+
+    def stats(self) -> Dict[str, Any]:
+        db = SessionLocal()
+        try:
+            active = db.query(LLMJob).filter(LLMJob.status.in_(ACTIVE))
+            return {
+                "depth": active.count(),
+                "max_depth": self.max_depth,
+                "workers": self.workers,
+                "active_users": active.with_entities(func.count(func.distinct(LLMJob.user_key))).scalar() or 0,
+                "local_jobs": len(self._jobs)
+            }
+        finally:
+            db.close()
@@ -0,0 +1,85 @@
+from typing import Dict, Any, Optional
+from collections import deque
+import logging
+import threading
+from .prompt_builder import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+def percentile(values, q: float) -> float:
+    """Nearest-rank percentile of a non-empty sequence"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    return float(ordered[index])
+
+class LLMMetrics:
+    """
+    Per-operation token and latency accounting for LLM calls.
+    Keeps running totals plus a window of recent samples for percentiles.
+    """
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self._operations: Dict[str, Dict[str, Any]] = {}
+
+    def record(
+        self,
+        operation: str,
+        latency: float,
+        prompt_tokens: Optional[int] = None,
+        completion_tokens: Optional[int] = None,
+        prompt: str = "",
+        completion: str = ""
+    ):
+        """Record one call; token counts are estimated from text when the API didn't report usage"""
+        prompt_tokens = prompt_tokens if prompt_tokens is not None else estimate_tokens(prompt)
+        completion_tokens = completion_tokens if completion_tokens is not None else estimate_tokens(completion)
+        with self._lock:
+            op = self._operations.setdefault(operation, {
+                "calls": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "latencies": deque(maxlen=self.window),
+                "prompt_sizes": deque(maxlen=self.window)
+            })
+            op["calls"] += 1
+            op["prompt_tokens"] += prompt_tokens
+            op["completion_tokens"] += completion_tokens
+            op["latencies"].append(latency)
+            op["prompt_sizes"].append(prompt_tokens)
+        logger.info(
+            f"LLM {operation}: {prompt_tokens} prompt + {completion_tokens} completion tokens in {latency:.2f}s"
+        )
+
+    def record_response(self, operation: str, latency: float, response: Any, messages=None):
+        """Record a non-streaming chat completion response"""
+        usage = getattr(response, "usage", None)
+        content = response.choices[0].message.content if response.choices else ""
+        self.record(
+            operation,
+            latency,
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None),
+            prompt="".join(m["content"] for m in messages or []),
+            completion=content or ""
+        )
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            result = {}
+            for operation, op in self._operations.items():
+                latencies = op["latencies"]
+                result[operation] = {
+                    "calls": op["calls"],
+                    "prompt_tokens": op["prompt_tokens"],
+                    "completion_tokens": op["completion_tokens"],
+                    "avg_prompt_tokens": op["prompt_tokens"] / op["calls"],
+                    "avg_completion_tokens": op["completion_tokens"] / op["calls"],
+                    "max_recent_prompt_tokens": max(op["prompt_sizes"]),
+                    "latency_p50": percentile(latencies, 50),
+                    "latency_p95": percentile(latencies, 95),
+                    "latency_p99": percentile(latencies, 99)
+                }
+            return result
+
+llm_metrics = LLMMetrics()
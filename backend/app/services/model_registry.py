@@ -0,0 +1,289 @@
+from typing import Dict, List, Optional, Any, Callable, Tuple
+from datetime import datetime
+import asyncio
+import json
+import logging
+import os
+import pickle
+import re
+import tempfile
+import threading
+import joblib
+from ..core.config import settings
+from .forest_inference import flat_forest
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_PATTERN = re.compile(r"^v(\d+)\.joblib$")
+METADATA_PATTERN = re.compile(r"^v(\d+)\.json$")
+# Pre-registry artifacts written by PredictionService.train_model
+LEGACY_PATTERN = re.compile(r"^(.+)_model\.joblib$")
+
+def model_memory_bytes(model: Any) -> int:
+    """Approximate in-memory size, measured as the pickled size of the model"""
+    try:
+        return len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return 0
+
+class ModelRegistry:
+    """
+    Process-wide store of trained models, keyed by (kind, name), e.g.
+    ("game", "football") or ("player", "Points").
+
+    Artifacts are versioned on disk as {root}/{kind}/{name}/v{N}.joblib with a
+    JSON metadata file beside each. The newest version of every model is loaded
+    once (at startup, or on first use) and served from memory. Publishing or
+    refreshing swaps the entry in one assignment, so readers see either the
+    old model or the new one, never a partial state.
+    """
+    def __init__(self, root: str = None, keep_versions: int = None):
+        self.root = root or settings.MODEL_STORE_DIR
+        self.keep_versions = keep_versions or settings.MODEL_KEEP_VERSIONS
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[str, str], threading.RLock] = {}
+        self._models: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def _dir(self, kind: str, name: str) -> str:
+        return os.path.join(self.root, kind, name)
+
+    def _versions(self, kind: str, name: str) -> List[int]:
+        directory = self._dir(kind, name)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            int(match.group(1))
+            for match in (ARTIFACT_PATTERN.match(f) for f in os.listdir(directory))
+            if match
+        )
+
+    def _key_lock(self, kind: str, name: str) -> threading.RLock:
+        with self._lock:
+            return self._key_locks.setdefault((kind, name), threading.RLock())
+
+    def _install(self, kind: str, name: str, version: int, model: Any, metadata: Dict[str, Any]):
+        if hasattr(model, "estimators_"):
+            # Flatten tree ensembles now rather than on the first request
+            try:
+                flat_forest(model)
+            except Exception as e:
+                logger.warning(f"Could not flatten {kind} model {name}: {str(e)}")
+        entry = {
+            "model": model,
+            "version": version,
+            "metadata": metadata,
+            "loaded_at": datetime.utcnow(),
+            "memory_bytes": model_memory_bytes(model)
+        }
+        with self._lock:
+            current = self._models.get((kind, name))
+            if current and current["version"] > version:
+                return
+            self._models[(kind, name)] = entry
+        logger.info(f"Serving {kind} model {name} v{version}")
+
+    def _read_version(self, kind: str, name: str, version: int) -> Tuple[Any, Dict[str, Any]]:
+        path = os.path.join(self._dir(kind, name), f"v{version}.joblib")
+        metadata_path = os.path.join(self._dir(kind, name), f"v{version}.json")
+        model = joblib.load(path)
+        metadata = {}
+        if os.path.exists(metadata_path):
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+        return model, metadata
+
+    def _load_version(self, kind: str, name: str, version: int):
+        model, metadata = self._read_version(kind, name, version)
+        self._install(kind, name, version, model, metadata)
+
+    def load(self, kind: str, name: str, version: Optional[int] = None) -> Tuple[Any, Dict[str, Any], int]:
+        """
+        Read a stored version (the newest when `version` is None) without serving
+        it, e.g. to evaluate an older artifact. Raises FileNotFoundError if absent.
+        """
+        versions = self._versions(kind, name)
+        if version is None:
+            if not versions:
+                raise FileNotFoundError(f"No stored {kind} model for {name}")
+            version = versions[-1]
+        elif version not in versions:
+            raise FileNotFoundError(f"No stored {kind} model {name} v{version}")
+        model, metadata = self._read_version(kind, name, version)
+        return model, metadata, version
+
+    def _load_legacy(self, kind: str, name: str) -> bool:
+        path = os.path.join(self.root, f"{name}_model.joblib")
+        if kind != "game" or not os.path.exists(path):
+            return False
+        self._install(kind, name, 0, joblib.load(path), {"source": path})
+        return True
+
+    def refresh(self, kind: str, name: str) -> Optional[int]:
+        """Load the newest on-disk version if it is newer than the one in memory"""
+        versions = self._versions(kind, name)
+        current = self.version(kind, name)
+        if versions and (current is None or versions[-1] > current):
+            try:
+                self._load_version(kind, name, versions[-1])
+            except Exception as e:
+                logger.error(f"Error loading {kind} model {name} v{versions[-1]}: {str(e)}")
+        elif not versions and current is None:
+            self._load_legacy(kind, name)
+        return self.version(kind, name)
+
+    def load_all(self):
+        """Warm load the newest version of every model in the store"""
+        if not os.path.isdir(self.root):
+            return
+        for entry in sorted(os.listdir(self.root)):
+            path = os.path.join(self.root, entry)
+            if os.path.isdir(path):
+                for name in sorted(os.listdir(path)):
+                    if os.path.isdir(os.path.join(path, name)):
+                        self.refresh(entry, name)
+            else:
+                legacy = LEGACY_PATTERN.match(entry)
+                if legacy and not self._versions("game", legacy.group(1)):
+                    self.refresh("game", legacy.group(1))
+        logger.info(f"Loaded {len(self._models)} models from {self.root}")
+
+    async def watch(self, interval: int = None):
+        """Periodically pick up versions published by the offline training job"""
+        interval = interval or settings.MODEL_REFRESH_SECONDS
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.load_all)
+            except Exception as e:
+                logger.error(f"Error refreshing models: {str(e)}")
+
+    def get(self, kind: str, name: str, refresh: bool = True) -> Optional[Any]:
+        """Served model; on a miss the store is checked for one unless `refresh` is False"""
+        entry = self._models.get((kind, name))
+        if entry is None and refresh:
+            self.refresh(kind, name)
+            entry = self._models.get((kind, name))
+        return entry["model"] if entry else None
+
+    def version(self, kind: str, name: str) -> Optional[int]:
+        entry = self._models.get((kind, name))
+        return entry["version"] if entry else None
+
+    def metadata(self, kind: str, name: str) -> Dict[str, Any]:
+        """Metadata of the version currently served, or {} when nothing is"""
+        entry = self._models.get((kind, name))
+        return entry["metadata"] if entry else {}
+
+    def get_or_create(self, kind: str, name: str, create: Callable[[], Tuple[Any, Dict[str, Any]]]) -> Any:
+        """
+        Return the served model, or build one with `create` (returning model and
+        metadata) and publish it. Concurrent callers for the same key wait for
+        a single build instead of each training their own.
+        """
+        model = self.get(kind, name)
+        if model is not None:
+            return model
+        with self._key_lock(kind, name):
+            model = self.get(kind, name)
+            if model is None:
+                model, metadata = create()
+                self.publish(kind, name, model, metadata)
+        return model
+
+    def latest_metadata(self, kind: str, name: str) -> Optional[Dict[str, Any]]:
+        """Metadata of the newest on-disk version, which may have been published by another process"""
+        versions = self._versions(kind, name)
+        if not versions:
+            return None
+        path = os.path.join(self._dir(kind, name), f"v{versions[-1]}.json")
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def publish(
+        self,
+        kind: str,
+        name: str,
+        model: Any,
+        metadata: Optional[Dict[str, Any]] = None,
+        serve: bool = True
+    ) -> int:
+        """Write a new version to disk and, unless `serve` is False, start serving it in this process"""
+        directory = self._dir(kind, name)
+        os.makedirs(directory, exist_ok=True)
+        metadata = dict(metadata or {}, published_at=datetime.utcnow().isoformat())
+        with self._key_lock(kind, name):
+            # Both files are written in full under temporary names, so other
+            # processes never read a partial one
+            metadata_tmp = self._write_temp(directory, lambda f: f.write(json.dumps(metadata, default=str).encode("utf-8")))
+            try:
+                model_tmp = self._write_temp(directory, lambda f: joblib.dump(model, f))
+                try:
+                    version = self._claim_version(directory, metadata_tmp)
+                    os.replace(model_tmp, os.path.join(directory, f"v{version}.joblib"))
+                finally:
+                    if os.path.exists(model_tmp):
+                        os.unlink(model_tmp)
+            finally:
+                os.unlink(metadata_tmp)
+            if serve:
+                self._install(kind, name, version, model, metadata)
+            self._prune(kind, name)
+        return version
+
+    def _claim_version(self, directory: str, metadata_tmp: str) -> int:
+        """
+        Allocate the next version number across processes by hard-linking the
+        metadata into place: the link fails if the name exists, so exactly one
+        publisher gets each number and the others retry with the next. The
+        metadata is therefore in place before the artifact appears.
+        """
+        while True:
+            taken = [
+                int(match.group(1))
+                for match in (ARTIFACT_PATTERN.match(f) or METADATA_PATTERN.match(f) for f in os.listdir(directory))
+                if match
+            ]
+            version = max(taken, default=0) + 1
+            try:
+                os.link(metadata_tmp, os.path.join(directory, f"v{version}.json"))
+                return version
+            except FileExistsError:
+                continue
+
+    @staticmethod
+    def _write_temp(directory: str, write: Callable[[Any], Any]) -> str:
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        return tmp_path
+
+    def _prune(self, kind: str, name: str):
+        for version in self._versions(kind, name)[:-self.keep_versions]:
+            for suffix in (".joblib", ".json"):
+                path = os.path.join(self._dir(kind, name), f"v{version}{suffix}")
+                if os.path.exists(path):
+                    os.unlink(path)
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = sorted(self._models.items())
+        return [
+            {
+                "kind": kind,
+                "name": name,
+                "version": entry["version"],
+                "available_versions": self._versions(kind, name),
+                "loaded_at": entry["loaded_at"],
+                "memory_bytes": entry["memory_bytes"],
+                "metadata": entry["metadata"]
+            }
+            for (kind, name), entry in entries
+        ]
+
+model_registry = ModelRegistry()
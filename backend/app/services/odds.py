@@ -0,0 +1,167 @@
+from typing import Tuple
+import numpy as np
+
+# Vectorized odds arithmetic. Every function takes scalars or array-likes and
+# returns float64 arrays; prices that cannot be converted (American odds
+# inside (-100, 100), decimal odds <= 1, probabilities outside (0, 1)) come
+# back as NaN rather than raising, so one bad line does not fail a batch.
+
+FORMATS = ("american", "decimal", "fractional")
+
+def _array(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+def american_to_decimal(american) -> np.ndarray:
+    american = _array(american)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        decimal = np.where(american > 0, 1 + american / 100, 1 + 100 / np.abs(american))
+    return np.where(np.abs(american) >= 100, decimal, np.nan)
+
+def decimal_to_american(decimal) -> np.ndarray:
+    """Even money (2.0) is quoted as -100, matching probability_to_american at 0.5"""
+    decimal = _array(decimal)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        american = np.where(decimal > 2, 100 * (decimal - 1), -100 / (decimal - 1))
+    return np.where(decimal > 1, american, np.nan)
+
+def fractional_to_decimal(fractional) -> np.ndarray:
+    """Parse fractional prices such as "5/2" or "11/10"; a bare number is taken as n/1"""
+    parts = np.char.partition(np.asarray(fractional, dtype=str), "/")
+    numerator = parts[..., 0].astype(np.float64)
+    denominator = np.where(parts[..., 2] == "", "1", parts[..., 2]).astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        decimal = 1 + numerator / denominator
+    return np.where((numerator > 0) & (denominator > 0), decimal, np.nan)
+
+def decimal_to_fractional(decimal, max_denominator: int = 100) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Nearest fraction (numerator, denominator) to decimal - 1 with a denominator
+    of at most max_denominator, preferring the smallest denominator on ties.
+    Unconvertible prices give (0, 0).
+    """
+    profit = _array(decimal) - 1
+    valid = np.isfinite(profit) & (profit > 0)
+    profit = np.where(valid, profit, 1.0)
+    best_numerator = np.zeros(profit.shape, dtype=np.int64)
+    best_denominator = np.ones(profit.shape, dtype=np.int64)
+    best_error = np.full(profit.shape, np.inf)
+    for denominator in range(1, max_denominator + 1):
+        numerator = np.maximum(np.rint(profit * denominator), 1)
+        error = np.abs(numerator / denominator - profit)
+        better = error < best_error - 1e-12
+        best_numerator = np.where(better, numerator, best_numerator).astype(np.int64)
+        best_denominator = np.where(better, denominator, best_denominator)
+        best_error = np.where(better, error, best_error)
+    divisor = np.gcd(best_numerator, best_denominator)
+    return (
+        np.where(valid, best_numerator // divisor, 0),
+        np.where(valid, best_denominator // divisor, 0)
+    )
+
+def format_fractional(decimal, max_denominator: int = 100) -> np.ndarray:
+    numerator, denominator = decimal_to_fractional(decimal, max_denominator)
+    text = np.char.add(np.char.add(numerator.astype(str), "/"), denominator.astype(str))
+    return np.where(denominator > 0, text, None)
+
+def to_decimal(prices, fmt: str = "american") -> np.ndarray:
+    """Decimal odds from prices quoted in any of FORMATS"""
+    if fmt == "american":
+        return american_to_decimal(prices)
+    if fmt == "decimal":
+        decimal = _array(prices)
+        return np.where(decimal > 1, decimal, np.nan)
+    if fmt == "fractional":
+        return fractional_to_decimal(prices)
+    raise ValueError(f"Unknown odds format: {fmt}")
+
+def from_decimal(decimal, fmt: str = "american") -> np.ndarray:
+    """Decimal odds re-quoted in any of FORMATS (fractional as "n/d" strings)"""
+    if fmt == "american":
+        return decimal_to_american(decimal)
+    if fmt == "decimal":
+        return _array(decimal)
+    if fmt == "fractional":
+        return format_fractional(decimal)
+    raise ValueError(f"Unknown odds format: {fmt}")
+
+def implied_probability(decimal) -> np.ndarray:
+    """Break-even win probability of a decimal price, vig included"""
+    decimal = _array(decimal)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(decimal > 1, 1 / decimal, np.nan)
+
+def fair_odds(probability) -> np.ndarray:
+    """Decimal odds with no margin for a win probability"""
+    probability = _array(probability)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where((probability > 0) & (probability < 1), 1 / probability, np.nan)
+
+def probability_to_american(probability) -> np.ndarray:
+    return decimal_to_american(fair_odds(probability))
+
+def overround(probabilities, axis: int = -1) -> np.ndarray:
+    """Bookmaker margin of a market: implied probabilities summed across outcomes, minus one"""
+    return _array(probabilities).sum(axis=axis) - 1
+
+def remove_vig(probabilities, method: str = "multiplicative", axis: int = -1) -> np.ndarray:
+    """
+    Fair probabilities from the implied probabilities of every outcome in a
+    market (outcomes along `axis`).
+
+    multiplicative scales each outcome by the same factor. power raises each
+    to a common exponent k with sum(p ** k) == 1, which takes more margin out
+    of longshots than favorites.
+    """
+    probabilities = _array(probabilities)
+    total = probabilities.sum(axis=axis, keepdims=True)
+    if method == "multiplicative":
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return probabilities / total
+    if method == "power":
+        # Newton's method on f(k) = sum(p ** k) - 1, which is monotone in k for p in (0, 1)
+        logs = np.log(np.clip(probabilities, 1e-12, 1))
+        k = np.ones(total.shape)
+        for _ in range(50):
+            powered = np.exp(k * logs)
+            f = powered.sum(axis=axis, keepdims=True) - 1
+            slope = (powered * logs).sum(axis=axis, keepdims=True)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                step = np.where(slope != 0, f / slope, 0.0)
+            k = k - step
+            if np.nanmax(np.abs(step), initial=0.0) < 1e-12:
+                break
+        return np.exp(k * logs)
+    raise ValueError(f"Unknown vig removal method: {method}")
+
+def expected_value(probability, decimal, stake=1.0) -> np.ndarray:
+    """Expected profit of staking `stake` at a decimal price with the given win probability"""
+    return _array(stake) * (_array(probability) * _array(decimal) - 1)
+
+def two_way_prices(over_probability) -> Tuple[np.ndarray, np.ndarray]:
+    """Fair American prices for both sides of an over/under from the over probability"""
+    over_probability = _array(over_probability)
+    return probability_to_american(over_probability), probability_to_american(1 - over_probability)
+
+def price_two_way(over, under, fmt: str = "american", over_probability=None, method: str = "multiplicative"):
+    """
+    Market summary for a batch of over/under lines quoted in `fmt`: implied
+    and no-vig probabilities, margin, fair prices and, when the over
+    probability is given, the expected value of a unit stake on each side.
+    """
+    decimal = np.stack([to_decimal(over, fmt), to_decimal(under, fmt)], axis=-1)
+    implied = implied_probability(decimal)
+    fair = remove_vig(implied, method=method)
+    priced = {
+        "over_implied": implied[..., 0],
+        "under_implied": implied[..., 1],
+        "overround": overround(implied),
+        "fair_over_probability": fair[..., 0],
+        "fair_under_probability": fair[..., 1],
+        "fair_over": from_decimal(fair_odds(fair[..., 0]), fmt),
+        "fair_under": from_decimal(fair_odds(fair[..., 1]), fmt)
+    }
+    if over_probability is not None:
+        over_probability = _array(over_probability)
+        priced["ev_over"] = expected_value(over_probability, decimal[..., 0])
+        priced["ev_under"] = expected_value(1 - over_probability, decimal[..., 1])
+    return priced
@@ -1,10 +1,23 @@
-from typing import List, Dict, Any, Optional
-import openai
+from typing import List, Dict, Any, Optional, AsyncIterator
+from datetime import datetime
+import asyncio
+import json
+import logging
+import time
 from ..core.config import settings
+from .llm_cache_service import llm_cache
+from .llm_client import create_async_client
+from .llm_metrics import llm_metrics
+from .prompt_builder import compact_stats
+
+logger = logging.getLogger(__name__)
+
+# Completions that overrun their deadline keep running here to fill the cache
+_background_completions = set()
 
 class OpenAIService:
     def __init__(self):
-        openai.api_key = settings.OPENAI_API_KEY
+        self.client = create_async_client()
         self.model = settings.OPENAI_MODEL
         self.temperature = settings.OPENAI_TEMPERATURE
         self.max_tokens = settings.OPENAI_MAX_TOKENS
@@ -15,30 +28,33 @@ class OpenAIService:
         team1: str,
         team2: str,
         match_type: str,
-        historical_data: Optional[Dict[str, Any]] = None
+        historical_data: Optional[Dict[str, Any]] = None,
+        kickoff: Optional[datetime] = None,
+        deadline: Optional[float] = None
     ) -> Dict[str, Any]:
         """
         Get a prediction for a sports match using GPT-4.
+        Cached responses expire at kickoff. If `deadline` seconds pass first,
+        a template response is returned while the completion finishes in the background.
         """
         # Construct the prompt
         prompt = self._construct_prediction_prompt(
             sport, team1, team2, match_type, historical_data
         )
+        fallback = {
+            "status": "pending",
+            "fallback": True,
+            "sport": sport,
+            "teams": [team1, team2],
+            "match_type": match_type,
+            "summary": f"Detailed analysis of {team1} vs {team2} is still being generated. Please retry shortly."
+        }
 
         try:
-            response = await openai.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self._get_system_prompt()},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-                response_format={"type": "json_object"}
+            return await self._complete_within(
+                "match_prediction", prompt, llm_cache.ttl_until(kickoff), deadline, fallback
             )
             
-            return response.choices[0].message.content
-            
         except Exception as e:
             print(f"Error calling OpenAI API: {str(e)}")
             return {
@@ -51,29 +67,32 @@ class OpenAIService:
         player_name: str,
         team: str,
         sport: str,
-        stats: Optional[Dict[str, Any]] = None
+        stats: Optional[Dict[str, Any]] = None,
+        kickoff: Optional[datetime] = None,
+        deadline: Optional[float] = None
     ) -> Dict[str, Any]:
         """
         Get detailed player analysis using GPT-4.
+        Cached responses expire at kickoff. If `deadline` seconds pass first,
+        a template response is returned while the completion finishes in the background.
         """
         prompt = self._construct_player_analysis_prompt(
             player_name, team, sport, stats
         )
+        fallback = {
+            "status": "pending",
+            "fallback": True,
+            "sport": sport,
+            "player": player_name,
+            "team": team,
+            "summary": f"Detailed analysis of {player_name} ({team}) is still being generated. Please retry shortly."
+        }
 
         try:
-            response = await openai.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": self._get_system_prompt()},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-                response_format={"type": "json_object"}
+            return await self._complete_within(
+                "player_analysis", prompt, llm_cache.ttl_until(kickoff), deadline, fallback
             )
             
-            return response.choices[0].message.content
-            
         except Exception as e:
             print(f"Error calling OpenAI API: {str(e)}")
             return {
@@ -81,6 +100,151 @@ class OpenAIService:
                 "details": str(e)
             }
 
+    def _get_params(self) -> Dict[str, Any]:
+        return {
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "response_format": {"type": "json_object"}
+        }
+
+    def _get_messages(self, prompt: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": self._strip_indent(self._get_system_prompt())},
+            {"role": "user", "content": self._strip_indent(prompt)}
+        ]
+
+    @staticmethod
+    def _strip_indent(text: str) -> str:
+        # Source indentation inside triple-quoted prompts costs tokens and adds nothing
+        return "\n".join(line.strip() for line in text.strip().splitlines())
+
+    async def _complete(self, operation: str, prompt: str, ttl: Optional[int] = None) -> str:
+        """
+        Run a chat completion through the shared response cache.
+        """
+        messages = self._get_messages(prompt)
+        params = self._get_params()
+
+        async def create() -> str:
+            started = time.perf_counter()
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                **params
+            )
+            llm_metrics.record_response(operation, time.perf_counter() - started, response, messages)
+            return response.choices[0].message.content
+
+        return await llm_cache.get_or_create(self.model, messages, params, create, ttl)
+
+    async def _complete_within(
+        self,
+        operation: str,
+        prompt: str,
+        ttl: int,
+        deadline: Optional[float],
+        fallback: Dict[str, Any]
+    ) -> str:
+        """
+        Run `_complete` with a latency budget. On timeout the completion is
+        left running so its result still lands in the cache.
+        """
+        if deadline is None:
+            return await self._complete(operation, prompt, ttl=ttl)
+
+        task = asyncio.ensure_future(self._complete(operation, prompt, ttl=ttl))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=deadline)
+        except asyncio.TimeoutError:
+            logger.warning(f"OpenAI completion exceeded {deadline}s, returning fallback")
+            _background_completions.add(task)
+            task.add_done_callback(self._discard_background)
+            return json.dumps(fallback)
+
+    @staticmethod
+    def _discard_background(task: asyncio.Task):
+        _background_completions.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Background OpenAI completion failed: {str(task.exception())}")
+
+    async def stream_prediction(
+        self,
+        sport: str,
+        team1: str,
+        team2: str,
+        match_type: str,
+        historical_data: Optional[Dict[str, Any]] = None,
+        kickoff: Optional[datetime] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a match prediction token by token.
+        """
+        prompt = self._construct_prediction_prompt(
+            sport, team1, team2, match_type, historical_data
+        )
+        async for token in self._stream("match_prediction_stream", prompt, ttl=llm_cache.ttl_until(kickoff)):
+            yield token
+
+    async def stream_player_analysis(
+        self,
+        player_name: str,
+        team: str,
+        sport: str,
+        stats: Optional[Dict[str, Any]] = None,
+        kickoff: Optional[datetime] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a player analysis token by token.
+        """
+        prompt = self._construct_player_analysis_prompt(
+            player_name, team, sport, stats
+        )
+        async for token in self._stream("player_analysis_stream", prompt, ttl=llm_cache.ttl_until(kickoff)):
+            yield token
+
+    async def _stream(self, operation: str, prompt: str, ttl: Optional[int] = None) -> AsyncIterator[str]:
+        """
+        Yield completion tokens as they arrive. A cached response is yielded
+        as a single chunk; a completed stream is written to the cache. If the
+        consumer stops early the upstream request is closed and nothing is cached.
+        """
+        messages = self._get_messages(prompt)
+        params = self._get_params()
+        keys = llm_cache.make_keys(self.model, messages, params)
+
+        cached = await llm_cache.aget(keys)
+        if cached is not None:
+            yield cached
+            return
+
+        started = time.perf_counter()
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            stream=True,
+            **params
+        )
+        tokens = []
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if token:
+                    tokens.append(token)
+                    yield token
+        finally:
+            await stream.close()
+
+        completion = "".join(tokens)
+        llm_metrics.record(
+            operation,
+            time.perf_counter() - started,
+            prompt="".join(m["content"] for m in messages),
+            completion=completion
+        )
+        await llm_cache.aset(keys, self.model, completion, ttl or settings.LLM_CACHE_TTL_SECONDS)
+
     def _get_system_prompt(self) -> str:
         """
         Get the system prompt for the AI.
@@ -109,7 +273,7 @@ class OpenAIService:
         
         if historical_data:
             prompt += "Historical data:\n"
-            prompt += str(historical_data) + "\n\n"
+            prompt += compact_stats(historical_data) + "\n\n"
         
         prompt += """Please provide a detailed prediction including:
         1. Win probability for each team
@@ -136,7 +300,7 @@ class OpenAIService:
         
         if stats:
             prompt += "Player statistics:\n"
-            prompt += str(stats) + "\n\n"
+            prompt += compact_stats(stats) + "\n\n"
         
         prompt += """Please provide a detailed analysis including:
         1. Performance assessment
@@ -0,0 +1,75 @@
+from typing import Dict, Optional
+import numpy as np
+from ..core.config import settings
+
+class OverUnderSimulator:
+    """
+    Monte Carlo estimate of P(over) / P(under) for any number of lines per prop.
+
+    Each draw picks one tree of the forest at random (the per-tree prediction
+    distribution for that row) and adds Gaussian noise with the model's
+    residual standard deviation. Without tree values the draws are centered
+    on the point prediction.
+
+    Every prop shares the same tree picks and standard normals (common random
+    numbers): each prop's own distribution is unaffected, only `draws` random
+    numbers are generated per call, and a prop prices the same whichever batch
+    it arrives in. Draws are sorted once per prop, so each line costs a binary
+    search, and probabilities are monotone along an alt-line ladder.
+    """
+    def __init__(self, draws: int = None, seed: int = None):
+        self.draws = draws or settings.SIMULATION_DRAWS
+        self.seed = seed if seed is not None else settings.SIMULATION_SEED
+
+    def sample(
+        self,
+        centers: np.ndarray,
+        noise: np.ndarray,
+        tree_values: Optional[np.ndarray] = None,
+        seed: int = None
+    ) -> np.ndarray:
+        """Simulated outcomes, shape (n_props, draws)"""
+        centers = np.asarray(centers, dtype=np.float64)
+        noise = np.nan_to_num(np.asarray(noise, dtype=np.float64), nan=0.0)
+        rng = np.random.default_rng(self.seed if seed is None else seed)
+        if tree_values is not None and tree_values.shape[1] > 0:
+            picks = rng.integers(0, tree_values.shape[1], size=self.draws)
+            draws = np.asarray(tree_values, dtype=np.float64)[:, picks]
+        else:
+            draws = np.repeat(centers[:, None], self.draws, axis=1)
+        draws += noise[:, None] * rng.standard_normal(self.draws)[None, :]
+        return draws
+
+    def probabilities(self, draws: np.ndarray, lines: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        P(over), P(under) and P(push) for lines of shape (n_props, n_lines);
+        NaN lines (padding for ragged ladders) give NaN.
+        """
+        lines = np.asarray(lines, dtype=np.float64)
+        if lines.ndim == 1:
+            lines = lines[:, None]
+        ordered = np.sort(draws, axis=1)
+        below = np.empty(lines.shape)
+        at_or_below = np.empty(lines.shape)
+        for i in range(len(ordered)):
+            below[i] = np.searchsorted(ordered[i], lines[i], side="left")
+            at_or_below[i] = np.searchsorted(ordered[i], lines[i], side="right")
+        n = ordered.shape[1]
+        over = (n - at_or_below) / n
+        under = below / n
+        missing = np.isnan(lines)
+        over[missing] = np.nan
+        under[missing] = np.nan
+        return {"over": over, "under": under, "push": 1 - over - under}
+
+    def price(
+        self,
+        centers: np.ndarray,
+        noise: np.ndarray,
+        lines: np.ndarray,
+        tree_values: Optional[np.ndarray] = None,
+        seed: int = None
+    ) -> Dict[str, np.ndarray]:
+        return self.probabilities(self.sample(centers, noise, tree_values, seed), lines)
+
+over_under_simulator = OverUnderSimulator()
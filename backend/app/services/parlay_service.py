@@ -0,0 +1,234 @@
+from typing import Dict, List, Optional, Any, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import logging
+import multiprocessing
+import threading
+import numpy as np
+import pandas as pd
+from scipy.special import ndtri
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..models.predictions import Prediction
+from .model_registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+# How two legs of the same game relate; legs in different games are independent
+RELATIONS = ("player", "team", "opponent")
+
+class PropCorrelations:
+    """
+    Correlation between the standardized residuals (actual - predicted) of two
+    prop types, for each relation between the legs, learned from settled
+    predictions. Estimates are shrunk towards zero by how few pairs back them.
+    """
+    def __init__(self, prop_types: List[str], correlations: np.ndarray, pairs: np.ndarray):
+        self.prop_types = list(prop_types)
+        self.index = {prop_type: i for i, prop_type in enumerate(self.prop_types)}
+        # (relation, type, type), with a trailing all-zero row/column for unseen prop types
+        self.correlations = correlations
+        self.pairs = pairs
+
+    def lookup(self, type_index: np.ndarray, relation: np.ndarray) -> np.ndarray:
+        """Correlation for every leg pair: type_index (n, m), relation (n, m, m) -> (n, m, m)"""
+        return self.correlations[relation, type_index[:, :, None], type_index[:, None, :]]
+
+    def type_index(self, prop_type: str) -> int:
+        return self.index.get(prop_type, len(self.prop_types))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            relation: {
+                f"{a}|{b}": round(float(self.correlations[r, i, j]), 4)
+                for i, a in enumerate(self.prop_types)
+                for j, b in enumerate(self.prop_types)
+                if i <= j and self.pairs[r, i, j]
+            }
+            for r, relation in enumerate(RELATIONS)
+        }
+
+def fit_correlations(db: Session, prior_pairs: int = None) -> PropCorrelations:
+    """Estimate PropCorrelations from every settled prediction"""
+    prior_pairs = settings.PARLAY_CORRELATION_PRIOR_PAIRS if prior_pairs is None else prior_pairs
+    day = func.date(Prediction.game_date)
+    # One residual per player, game and prop type, however many users predicted it
+    rows = db.query(
+        Prediction.player_name,
+        Prediction.team,
+        Prediction.opponent,
+        day.label("day"),
+        Prediction.prop_type,
+        func.avg(Prediction.actual_result - Prediction.prediction).label("residual")
+    ).filter(
+        Prediction.actual_result.isnot(None),
+        Prediction.prediction.isnot(None)
+    ).group_by(
+        Prediction.player_name, Prediction.team, Prediction.opponent, day, Prediction.prop_type
+    ).all()
+    df = pd.DataFrame(rows, columns=["player_name", "team", "opponent", "day", "prop_type", "residual"])
+    prop_types = sorted(df["prop_type"].dropna().unique())
+    k = len(prop_types)
+    sums = np.zeros((len(RELATIONS), k + 1, k + 1))
+    pairs = np.zeros((len(RELATIONS), k + 1, k + 1), dtype=np.int64)
+    if df.empty:
+        return PropCorrelations(prop_types, sums, pairs)
+
+    grouped = df.groupby("prop_type")["residual"]
+    df["z"] = ((df["residual"] - grouped.transform("mean")) / grouped.transform("std")).fillna(0.0)
+    df["type"] = df["prop_type"].map({prop_type: i for i, prop_type in enumerate(prop_types)})
+    df["game"] = df["day"].astype(str) + "|" + np.minimum(df["team"], df["opponent"]) + "|" + np.maximum(df["team"], df["opponent"])
+    df["row"] = np.arange(len(df))
+
+    legs = df[["game", "row", "player_name", "team", "type", "z"]]
+    joined = legs.merge(legs, on="game", suffixes=("_a", "_b"))
+    joined = joined[joined["row_a"] != joined["row_b"]]
+    relation = np.where(
+        joined["player_name_a"].to_numpy() == joined["player_name_b"].to_numpy(), 0,
+        np.where(joined["team_a"].to_numpy() == joined["team_b"].to_numpy(), 1, 2)
+    )
+    index = (relation, joined["type_a"].to_numpy(), joined["type_b"].to_numpy())
+    np.add.at(sums, index, joined["z_a"].to_numpy() * joined["z_b"].to_numpy())
+    np.add.at(pairs, index, 1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correlations = np.where(pairs > 0, sums / pairs, 0.0)
+    correlations = np.clip(correlations * pairs / (pairs + prior_pairs), -0.95, 0.95)
+    return PropCorrelations(prop_types, correlations, pairs)
+
+def _nearest_correlation(matrices: np.ndarray) -> np.ndarray:
+    """Clip negative eigenvalues and restore the unit diagonal, so every matrix has a Cholesky factor"""
+    values, vectors = np.linalg.eigh(matrices)
+    repaired = (vectors * np.maximum(values, 1e-6)[:, None, :]) @ np.swapaxes(vectors, 1, 2)
+    scale = 1 / np.sqrt(np.diagonal(repaired, axis1=1, axis2=2))
+    return repaired * scale[:, :, None] * scale[:, None, :]
+
+def price_parlays(
+    win_probability: np.ndarray,
+    correlation: np.ndarray,
+    draws: int,
+    seed: int,
+    max_cells: int = 4_000_000
+) -> np.ndarray:
+    """
+    Probability that every leg of each parlay wins, by Monte Carlo over a
+    Gaussian copula.
+
+    win_probability is (n, m), with padding legs set to 1; correlation is
+    (n, m, m) between the legs' wins. Legs with no correlation to any other
+    are priced exactly as a product. The standard normals are shared by every
+    parlay (row j of the draw matrix for leg j), so a parlay's price does not
+    depend on the batch it is quoted in.
+    """
+    win_probability = np.asarray(win_probability, dtype=np.float64)
+    n, m = win_probability.shape
+    joint = np.prod(win_probability, axis=1)
+    off_diagonal = correlation - np.eye(m)[None, :, :]
+    correlated = np.flatnonzero(np.abs(off_diagonal).max(axis=(1, 2)) > 0) if m > 1 else np.array([], dtype=int)
+    if not len(correlated):
+        return joint
+
+    normals = np.random.default_rng(seed).standard_normal((m, draws))
+    # Leg j wins when its latent normal exceeds the (1 - p_j) quantile
+    thresholds = ndtri(1 - np.clip(win_probability[correlated], 0.0, 1.0))
+    factors = np.linalg.cholesky(_nearest_correlation(correlation[correlated]))
+    step = max(1, max_cells // (draws * m))
+    for start in range(0, len(correlated), step):
+        latent = np.einsum("pij,js->pis", factors[start:start + step], normals)
+        wins = np.all(latent > thresholds[start:start + step, :, None], axis=1)
+        joint[correlated[start:start + step]] = wins.mean(axis=1)
+    return joint
+
+class ParlayPricer:
+    """
+    Prices batches of parlays from the legs' win probabilities and the learned
+    prop correlations. Batches of at least PARLAY_PARALLEL_MIN_QUOTES parlays
+    are split across a pool of PARLAY_WORKERS processes.
+    """
+    def __init__(self, draws: int = None, seed: int = None, max_workers: int = None):
+        self.draws = draws or settings.PARLAY_DRAWS
+        self.seed = seed if seed is not None else settings.SIMULATION_SEED
+        self.max_workers = max_workers or settings.PARLAY_WORKERS
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def correlations(self) -> Optional[PropCorrelations]:
+        return model_registry.get("correlation", "props")
+
+    def correlation_matrix(self, legs: List[List[Dict[str, Any]]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Win probabilities (n, m) and win correlations (n, m, m) for parlays of
+        legs with win_probability, prop_type, side, player_name, team and game;
+        shorter parlays are padded with certain, independent legs.
+        """
+        n, m = len(legs), max(len(parlay) for parlay in legs)
+        win_probability = np.ones((n, m))
+        type_index = np.zeros((n, m), dtype=np.int64)
+        sign = np.ones((n, m))
+        game = np.full((n, m), -1, dtype=np.int64)
+        player = np.full((n, m), -1, dtype=np.int64)
+        team = np.full((n, m), -1, dtype=np.int64)
+        codes: Dict[Any, int] = {}
+        correlations = self.correlations()
+        for i, parlay in enumerate(legs):
+            for j, leg in enumerate(parlay):
+                win_probability[i, j] = leg["win_probability"]
+                sign[i, j] = 1.0 if leg["side"] == "over" else -1.0
+                game[i, j] = codes.setdefault(("game", leg["game"]), len(codes))
+                player[i, j] = codes.setdefault(("player", leg["player_name"], leg["team"]), len(codes))
+                team[i, j] = codes.setdefault(("team", leg["team"]), len(codes))
+                if correlations is not None:
+                    type_index[i, j] = correlations.type_index(leg["prop_type"])
+
+        correlation = np.zeros((n, m, m))
+        if correlations is not None:
+            relation = np.where(
+                player[:, :, None] == player[:, None, :], 0,
+                np.where(team[:, :, None] == team[:, None, :], 1, 2)
+            )
+            same_game = (game[:, :, None] == game[:, None, :]) & (game[:, :, None] >= 0)
+            # Residual correlation between the outcomes, flipped for legs backing the under
+            correlation = np.where(
+                same_game,
+                correlations.lookup(type_index, relation) * sign[:, :, None] * sign[:, None, :],
+                0.0
+            )
+        correlation[:, np.arange(m), np.arange(m)] = 1.0
+        return win_probability, correlation
+
+    async def price(self, legs: List[List[Dict[str, Any]]]) -> Dict[str, np.ndarray]:
+        """Joint and independent win probability of each parlay"""
+        win_probability, correlation = self.correlation_matrix(legs)
+        n = len(legs)
+        if n >= settings.PARLAY_PARALLEL_MIN_QUOTES and self.max_workers > 1:
+            loop = asyncio.get_running_loop()
+            pool = self._pool()
+            bounds = np.linspace(0, n, self.max_workers + 1).astype(int)
+            parts = await asyncio.gather(*(
+                loop.run_in_executor(
+                    pool, price_parlays, win_probability[lo:hi], correlation[lo:hi], self.draws, self.seed
+                )
+                for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo
+            ))
+            joint = np.concatenate(parts)
+        else:
+            joint = price_parlays(win_probability, correlation, self.draws, self.seed)
+        return {"joint": joint, "independent": np.prod(win_probability, axis=1)}
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=True)
+
+parlay_pricer = ParlayPricer()
@@ -1,76 +1,98 @@
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestClassifier
 from typing import Dict, List, Optional, Any
-import joblib
 import os
+import time
+import asyncio
 import openai
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta, timezone
 import logging
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, defer
+from app.core.config import settings
 from app.models.predictions import Prediction
 from app.services.analytics_service import AnalyticsService
 from app.services.data_service import DataService
+from app.services.llm_cache_service import llm_cache
+from app.services.llm_metrics import llm_metrics
+from app.services.rollup_service import performance_rollups
+from app.services.analytics_cache_service import analytics_cache
+from app.services.model_registry import model_registry
+from app.services.training_pipeline import training_pipeline
+from app.services.feature_vectors import FEATURE_SCHEMA_VERSION, pack_features, display_features
+from app.services.odds import american_to_decimal, expected_value, probability_to_american
+from app.services.parlay_service import parlay_pricer
+from app.services.backtesting import run_backtests
+from app.services.rating_service import rating_service
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Completions that overrun their deadline keep running here to fill the cache
+reasoning_executor = ThreadPoolExecutor(max_workers=settings.LLM_BACKGROUND_WORKERS, thread_name_prefix="ai-reasoning")
+
 class PredictionService:
     def __init__(self, db: Session):
         self.db = db
         self.analytics_service = AnalyticsService(db)
         self.data_service = DataService(db)
-        self.models = {}
-        self.model_path = "models"
-        os.makedirs(self.model_path, exist_ok=True)
         
-        # Initialize OpenAI client with environment variable
-        self.openai_api_key = os.getenv("OPENAI_API_KEY")
+        # Initialize OpenAI client with environment variable (any key works against LLM_BASE_URL)
+        self.openai_api_key = os.getenv("OPENAI_API_KEY") or (settings.LLM_BASE_URL and "local")
         if self.openai_api_key:
-            openai.api_key = self.openai_api_key
+            self.openai_client = openai.OpenAI(api_key=self.openai_api_key, base_url=settings.LLM_BASE_URL)
             logger.info("OpenAI API key loaded successfully")
         else:
             logger.warning("OpenAI API key not found in environment variables")
 
     def train_model(self, sport: str, training_data: pd.DataFrame):
         """
-        Train a model for a specific sport
+        Train a model for a specific sport in the background training pool and publish it
         """
         # TODO: Implement proper feature engineering
         X = training_data.drop(['result'], axis=1)
         y = training_data['result']
         
-        model = RandomForestClassifier(n_estimators=100, random_state=42)
-        model.fit(X, y)
-        
-        # Save the model
-        model_path = os.path.join(self.model_path, f"{sport}_model.joblib")
-        joblib.dump(model, model_path)
-        self.models[sport] = model
+        training_pipeline.submit_game(sport, X.to_numpy(), y.to_numpy(), list(X.columns))
         
-        return {"message": f"Model trained successfully for {sport}"}
+        return {"message": f"Training scheduled for {sport}"}
 
     def predict_game(self, sport: str, game_features: Dict) -> Dict:
         """
         Make a prediction for a specific game
         """
-        if sport not in self.models:
-            # Load model if not in memory
-            model_path = os.path.join(self.model_path, f"{sport}_model.joblib")
-            if os.path.exists(model_path):
-                self.models[sport] = joblib.load(model_path)
-            else:
-                return {"error": f"No model available for {sport}"}
-
-        # Convert features to numpy array
-        features = np.array([list(game_features.values())])
+        model = model_registry.get("game", sport)
+        if model is None:
+            return {"error": f"No model available for {sport}"}
+
+        # Team ratings come from the rating engine, never from the caller
+        game_features = {
+            key: value for key, value in game_features.items()
+            if key not in ("home_team_rating", "away_team_rating")
+        }
+        home_team, away_team = game_features.pop("home_team", None), game_features.pop("away_team", None)
+        if not home_team or not away_team:
+            return {"error": "home_team and away_team are required"}
+        ratings = rating_service.game_ratings(self.db, sport, home_team, away_team)
+        game_features["home_team_rating"] = ratings["home_team_rating"]
+        game_features["away_team_rating"] = ratings["away_team_rating"]
+
+        # Convert features to numpy array, in the order the model was trained on
+        columns = model_registry.metadata("game", sport).get("columns") or list(game_features)
+        missing = [column for column in columns if column not in game_features]
+        if missing:
+            return {"error": f"Missing game features: {', '.join(missing)}"}
+        features = np.array([[game_features[column] for column in columns]])
         
         # Make prediction
-        prediction = self.models[sport].predict_proba(features)[0]
+        prediction = model.predict_proba(features)[0]
         
         # Get AI reasoning for the prediction
-        reasoning = self.get_ai_reasoning(sport, game_features, prediction)
+        reasoning = self.get_ai_reasoning(
+            sport, game_features, prediction,
+            deadline=settings.LLM_DEADLINE_PREDICT_GAME_SECONDS
+        )
         
         return {
             "sport": sport,
@@ -82,16 +104,26 @@ class PredictionService:
             "reasoning": reasoning
         }
 
-    def get_ai_reasoning(self, sport: str, features: Dict, prediction: np.ndarray) -> str:
+    def get_ai_reasoning(
+        self,
+        sport: str,
+        features: Dict,
+        prediction: np.ndarray,
+        deadline: Optional[float] = None
+    ) -> str:
         """
-        Get AI reasoning for the prediction using OpenAI's API
+        Get AI reasoning for the prediction using OpenAI's API.
+        If the model hasn't answered within `deadline` seconds, a template
+        explanation is returned and the completion finishes in the background
+        to fill the cache. Identical requests share one completion, and once
+        LLM_BACKGROUND_MAX_PENDING completions are outstanding the template is
+        returned without queueing another.
         """
         if not self.openai_api_key:
             return "AI reasoning unavailable: API key not configured"
 
-        try:
-            # Prepare the prompt for OpenAI
-            prompt = f"""
+        # Prepare the prompt for OpenAI
+        prompt = f"""
             Analyze this {sport} match prediction:
             
             Home Team Rating: {features['home_team_rating']}
@@ -112,36 +144,86 @@ class PredictionService:
             
             Format the response in a clear, professional manner suitable for a sports betting platform.
             """
+        messages = [
+            {"role": "system", "content": "You are an expert sports analyst providing detailed match predictions and analysis."},
+            {"role": "user", "content": prompt}
+        ]
+        params = {"max_tokens": 500, "temperature": 0.7}
+        keys = llm_cache.make_keys("gpt-4", messages, params)
+
+        cached = llm_cache.get(keys)
+        if cached is not None:
+            return cached
 
+        def complete() -> str:
             # Call OpenAI API
-            response = openai.ChatCompletion.create(
+            started = time.perf_counter()
+            response = self.openai_client.chat.completions.create(
                 model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are an expert sports analyst providing detailed match predictions and analysis."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.7
+                messages=messages,
+                **params
             )
+            llm_metrics.record_response("game_reasoning", time.perf_counter() - started, response, messages)
+            content = response.choices[0].message.content
+            llm_cache.set(keys, "gpt-4", content, settings.LLM_CACHE_TTL_SECONDS)
+            return content
 
-            return response.choices[0].message.content
-
+        future = llm_cache.submit(keys, reasoning_executor, complete, settings.LLM_BACKGROUND_MAX_PENDING)
+        if future is None:
+            logger.warning(f"AI reasoning backlog is full, using template for {sport}")
+            return self._template_reasoning(sport, features, prediction)
+        try:
+            return future.result(timeout=deadline)
+        except FutureTimeoutError:
+            logger.warning(f"AI reasoning for {sport} exceeded {deadline}s, using template")
+            return self._template_reasoning(sport, features, prediction)
         except Exception as e:
             logger.error(f"Error getting AI reasoning: {str(e)}")
             return "AI reasoning unavailable at this time."
 
+    def _template_reasoning(self, sport: str, features: Dict, prediction: np.ndarray) -> str:
+        """
+        Deterministic explanation built from the numeric prediction alone.
+        """
+        home_prob, away_prob = float(prediction[1]), float(prediction[0])
+        favourite = "home side" if home_prob >= away_prob else "away side"
+        rating_edge = features['home_team_rating'] - features['away_team_rating']
+        form_edge = features['home_team_form'] - features['away_team_form']
+
+        def edge(value: float) -> str:
+            if abs(value) < 0.05:
+                return "level"
+            return "favours the home side" if value > 0 else "favours the away side"
+
+        return (
+            f"Summary: the model makes the {favourite} favourite in this {sport} match.\n"
+            f"- Home win probability: {home_prob:.2%}\n"
+            f"- Away win probability: {away_prob:.2%}\n"
+            f"- Confidence: {max(home_prob, away_prob):.2%}\n"
+            f"- Team rating ({features['home_team_rating']} vs {features['away_team_rating']}): {edge(rating_edge)}\n"
+            f"- Recent form ({features['home_team_form']} vs {features['away_team_form']}): {edge(form_edge)}\n"
+            "A detailed AI analysis is being prepared and will be available shortly."
+        )
+
     def get_model_performance(self, sport: str) -> Dict:
         """
-        Get performance metrics for a specific model
+        Get out-of-sample performance metrics for a specific model: the newest
+        stored version replayed on the settled predictions after its training
+        cutoff, within the last BACKTEST_DEFAULT_DAYS. Nothing is refit here;
+        walk-forward refits are left to `app.jobs.backtest`.
         """
-        # TODO: Implement model performance tracking
-        return {
-            "sport": sport,
-            "accuracy": 0.0,
-            "precision": 0.0,
-            "recall": 0.0,
-            "f1_score": 0.0
-        }
+        since = datetime.utcnow() - timedelta(days=settings.BACKTEST_DEFAULT_DAYS)
+        report = run_backtests(self.db, sport, [{}], since=since)[0]
+        if "error" in report:
+            logger.error(f"Error evaluating {sport} model: {report['error']}")
+            return {
+                "sport": sport,
+                "accuracy": 0.0,
+                "precision": 0.0,
+                "recall": 0.0,
+                "f1_score": 0.0
+            }
+        return dict(report, sport=sport)
 
     async def generate_player_prediction(
         self,
@@ -191,16 +273,176 @@ class PredictionService:
             prediction=prediction_result["prediction"],
             confidence=prediction_result["confidence"],
             odds=prediction_result["odds"],
-            features=prediction_result["features"],
+            features=display_features(prediction_result["features"]),
+            feature_vector=pack_features(prediction_result["features"]),
+            feature_schema_version=FEATURE_SCHEMA_VERSION,
             recent_performance=recent_performance
         )
 
         self.db.add(prediction)
+        self.db.flush()
+        performance_rollups.record_created(self.db, prediction)
+        analytics_cache.bump(self.db, sport=prop_type, user_id=user_id)
         self.db.commit()
         self.db.refresh(prediction)
 
         return prediction
 
+    async def _slate_rows(self, props: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """predict_slate input for each prop, fetching each distinct player and matchup once"""
+        recent_keys = list({(p["player_name"], p["team"], p["prop_type"]) for p in props})
+        matchup_keys = list({(p["team"], p["opponent"], p["prop_type"]) for p in props})
+        recent_results = await asyncio.gather(*(
+            self.data_service.get_player_recent_performance(player_name=player, team=team, prop_type=prop_type)
+            for player, team, prop_type in recent_keys
+        ))
+        matchup_results = await asyncio.gather(*(
+            self.data_service.get_matchup_data(team=team, opponent=opponent, prop_type=prop_type)
+            for team, opponent, prop_type in matchup_keys
+        ))
+        recent = dict(zip(recent_keys, recent_results))
+        matchups = dict(zip(matchup_keys, matchup_results))
+
+        return [
+            {
+                "recent_performance": recent[(p["player_name"], p["team"], p["prop_type"])],
+                "matchup_data": matchups[(p["team"], p["opponent"], p["prop_type"])],
+                "prop_type": p["prop_type"],
+                "prop_value": p["prop_value"],
+                "lines": p.get("lines")
+            }
+            for p in props
+        ]
+
+    async def price_ladder(self, props: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Price each prop's main line and alternate `lines` from one simulation per
+        prop, without storing anything.
+        """
+        rows = await self._slate_rows([
+            dict(prop, lines=[prop["prop_value"]] + list(prop.get("lines") or [])) for prop in props
+        ])
+        results = await self.analytics_service.predict_slate(rows)
+        return [
+            {
+                "player_name": prop["player_name"],
+                "team": prop["team"],
+                "opponent": prop["opponent"],
+                "prop_type": prop["prop_type"],
+                "prediction": result["prediction"],
+                "confidence": result["confidence"],
+                "ladder": result["ladder"]
+            }
+            for prop, result in zip(props, results)
+        ]
+
+    async def quote_parlays(self, parlays: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Price parlays of over/under legs (player_name, team, opponent, game_date,
+        prop_type, line, side), each with an optional offered American `odds`.
+        Every distinct leg is predicted once; pushes are refunded, so a leg's win
+        probability excludes them. A parlay may hold only one leg per player prop
+        and game (checked by the router), since legs on the same prop are
+        priced as independent.
+        """
+        leg_keys = sorted({
+            (leg["player_name"], leg["team"], leg["opponent"], leg["prop_type"], leg["line"])
+            for parlay in parlays for leg in parlay["legs"]
+        })
+        rows = await self._slate_rows([
+            {"player_name": player, "team": team, "opponent": opponent, "prop_type": prop_type, "prop_value": line}
+            for player, team, opponent, prop_type, line in leg_keys
+        ])
+        results = dict(zip(leg_keys, await self.analytics_service.predict_slate(rows)))
+
+        legs = []
+        for parlay in parlays:
+            priced_legs = []
+            # Canonical leg order, so the same parlay always meets the same random draws
+            for leg in sorted(parlay["legs"], key=lambda l: (l["player_name"], l["prop_type"], l["line"], l["side"])):
+                key = (leg["player_name"], leg["team"], leg["opponent"], leg["prop_type"], leg["line"])
+                over, under = results[key]["over_probability"], results[key]["under_probability"]
+                decided = over + under
+                win = (over if leg["side"] == "over" else under) / decided if decided > 0 else 0.5
+                priced_legs.append({
+                    "win_probability": win,
+                    "prop_type": leg["prop_type"],
+                    "side": leg["side"],
+                    "player_name": leg["player_name"],
+                    "team": leg["team"],
+                    "game": (leg["game_date"].date(), min(leg["team"], leg["opponent"]), max(leg["team"], leg["opponent"]))
+                })
+            legs.append(priced_legs)
+
+        priced = await parlay_pricer.price(legs)
+        fair = np.round(probability_to_american(priced["joint"]), 2)
+        offered = np.array([p.get("odds") if p.get("odds") is not None else np.nan for p in parlays], dtype=np.float64)
+        ev = expected_value(priced["joint"], american_to_decimal(offered))
+        return [
+            {
+                "probability": float(priced["joint"][i]),
+                "independent_probability": float(priced["independent"][i]),
+                "fair_odds": float(fair[i]) if np.isfinite(fair[i]) else None,
+                "expected_value": float(ev[i]) if np.isfinite(ev[i]) else None,
+                "leg_probabilities": [leg["win_probability"] for leg in legs[i]]
+            }
+            for i in range(len(parlays))
+        ]
+
+    async def generate_slate_predictions(
+        self,
+        game_date: datetime,
+        props: List[Dict[str, Any]],
+        user_id: int
+    ) -> List[Prediction]:
+        """
+        Price a whole slate of props (player_name, team, opponent, prop_type,
+        prop_value) and store every prediction in one transaction.
+        """
+        rows = await self._slate_rows(props)
+        results = await self.analytics_service.predict_slate(rows)
+
+        # Stamped here rather than by the server default so the rollups need no re-read
+        created_at = datetime.now(timezone.utc)
+        predictions = [
+            Prediction(
+                user_id=user_id,
+                player_name=prop["player_name"],
+                team=prop["team"],
+                opponent=prop["opponent"],
+                game_date=game_date,
+                prop_type=prop["prop_type"],
+                prop_value=prop["prop_value"],
+                prediction=result["prediction"],
+                confidence=result["confidence"],
+                odds=result["odds"],
+                features=display_features(result["features"]),
+                feature_vector=pack_features(result["features"]),
+                feature_schema_version=FEATURE_SCHEMA_VERSION,
+                recent_performance=row["recent_performance"],
+                created_at=created_at
+            )
+            for prop, row, result in zip(props, rows, results)
+        ]
+
+        self.db.add_all(predictions)
+        self.db.flush()
+        performance_rollups.record_created_many(self.db, predictions)
+        for prop_type in {p["prop_type"] for p in props}:
+            analytics_cache.bump(self.db, sport=prop_type)
+        analytics_cache.bump(self.db, user_id=user_id)
+        ids = [prediction.id for prediction in predictions]
+        self.db.commit()
+
+        # One query to reload the committed rows instead of a refresh per object
+        loaded = {
+            prediction.id: prediction
+            for prediction in self.db.query(Prediction).options(defer(Prediction.feature_vector)).filter(
+                Prediction.id.in_(ids)
+            )
+        }
+        return [loaded[i] for i in ids]
+
     async def get_user_predictions(
         self,
         user_id: int,
@@ -211,7 +453,10 @@ class PredictionService:
         """
         Get predictions for a specific user with optional filters.
         """
-        query = self.db.query(Prediction).filter(Prediction.user_id == user_id)
+        # The packed vector is model input only; don't ship it with listings
+        query = self.db.query(Prediction).options(defer(Prediction.feature_vector)).filter(
+            Prediction.user_id == user_id
+        )
 
         if start_date:
             query = query.filter(Prediction.game_date >= start_date)
@@ -234,11 +479,17 @@ class PredictionService:
         if not prediction:
             raise ValueError("Prediction not found")
 
+        # Re-grading: take the previous result out of the rollups first
+        if prediction.prediction_correct is not None:
+            performance_rollups.record_settlement(self.db, prediction, sign=-1)
+
         prediction.actual_result = actual_result
         prediction.prediction_correct = (
             (prediction.prediction > prediction.prop_value and actual_result > prediction.prop_value) or
             (prediction.prediction < prediction.prop_value and actual_result < prediction.prop_value)
         )
+        performance_rollups.record_settlement(self.db, prediction)
+        analytics_cache.bump(self.db, sport=prediction.prop_type, user_id=prediction.user_id)
 
         self.db.commit()
         self.db.refresh(prediction)
@@ -300,8 +551,8 @@ if __name__ == "__main__":
     
     # Make a prediction
     game_features = {
-        'home_team_rating': 0.8,
-        'away_team_rating': 0.7,
+        'home_team': 'Arsenal',
+        'away_team': 'Chelsea',
         'home_team_form': 0.75,
         'away_team_form': 0.65
     }
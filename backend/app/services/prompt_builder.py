@@ -0,0 +1,87 @@
+from typing import Dict, List, Optional, Any
+
+# Defaults keep a stats block to a few hundred tokens
+DEFAULT_MAX_FIELDS = 40
+DEFAULT_MAX_ROWS = 10
+DEFAULT_MAX_VALUE_CHARS = 60
+DEFAULT_MAX_CHARS = 2000
+
+def format_value(value: Any, max_chars: int = DEFAULT_MAX_VALUE_CHARS) -> str:
+    """Render a scalar compactly: short floats, no quotes, truncated text"""
+    if value is None:
+        return "-"
+    if isinstance(value, bool):
+        return "Y" if value else "N"
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    if isinstance(value, (list, tuple)) and all(not isinstance(v, (dict, list, tuple)) for v in value):
+        text = ",".join(format_value(v, max_chars) for v in value)
+    else:
+        text = " ".join(str(value).split())
+    return text if len(text) <= max_chars else text[:max_chars - 1] + "…"
+
+def _flatten(data: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    flat = {}
+    for key in sorted(data, key=str):
+        value = data[key]
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}."))
+        else:
+            flat[name] = value
+    return flat
+
+def _table(name: str, rows: List[Dict[str, Any]], max_rows: int, max_value_chars: int) -> List[str]:
+    columns = sorted({key for row in rows for key in _flatten(row)}, key=str)
+    lines = [f"{name}[{len(rows)}]: " + "|".join(columns)]
+    for row in rows[:max_rows]:
+        flat = _flatten(row)
+        lines.append("  " + "|".join(format_value(flat.get(c), max_value_chars) for c in columns))
+    if len(rows) > max_rows:
+        lines.append(f"  …(+{len(rows) - max_rows} rows)")
+    return lines
+
+def compact_stats(
+    data: Optional[Dict[str, Any]],
+    max_fields: int = DEFAULT_MAX_FIELDS,
+    max_rows: int = DEFAULT_MAX_ROWS,
+    max_value_chars: int = DEFAULT_MAX_VALUE_CHARS,
+    max_chars: int = DEFAULT_MAX_CHARS,
+    field_budgets: Optional[Dict[str, int]] = None
+) -> str:
+    """
+    Serialize stats into a compact, deterministic text block for a prompt.
+
+    Nested dicts become dotted `key=value` lines in sorted order, lists of
+    dicts become a header row plus pipe-separated rows, and every level is
+    truncated to its budget. `field_budgets` overrides the character budget
+    for individual top-level fields.
+    """
+    if not data:
+        return ""
+    field_budgets = field_budgets or {}
+    lines = []
+    scalars = {}
+    for key in sorted(data, key=str):
+        value = data[key]
+        if isinstance(value, list) and value and all(isinstance(v, dict) for v in value):
+            lines.extend(_table(str(key), value, max_rows, field_budgets.get(key, max_value_chars)))
+        elif isinstance(value, dict):
+            for name, nested in _flatten(value, f"{key}.").items():
+                scalars[name] = (nested, field_budgets.get(key, max_value_chars))
+        else:
+            scalars[str(key)] = (value, field_budgets.get(key, max_value_chars))
+
+    names = sorted(scalars)
+    scalar_lines = [f"{name}={format_value(*scalars[name])}" for name in names[:max_fields]]
+    if len(names) > max_fields:
+        scalar_lines.append(f"…(+{len(names) - max_fields} fields)")
+
+    text = "\n".join(scalar_lines + lines)
+    if len(text) > max_chars:
+        text = text[:max_chars - 1] + "…"
+    return text
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) when the API doesn't report usage"""
+    return max(1, len(text) // 4) if text else 0
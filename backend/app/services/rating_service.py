@@ -0,0 +1,264 @@
+from typing import Dict, List, Optional, Any, Tuple
+from datetime import datetime, timezone
+import copy
+import logging
+import threading
+import time
+import numpy as np
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..models.match_result import MatchResult
+from .model_registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+Q = np.log(10) / 400
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def _g(rd: np.ndarray) -> np.ndarray:
+    return 1 / np.sqrt(1 + 3 * Q ** 2 * rd ** 2 / np.pi ** 2)
+
+def match_day(played_at: Optional[datetime]) -> float:
+    """Days since the epoch, the time unit of rating deviation growth"""
+    if played_at is None:
+        return np.nan
+    if played_at.tzinfo is None:
+        played_at = played_at.replace(tzinfo=timezone.utc)
+    return (played_at - EPOCH).total_seconds() / 86400
+
+def match_score(home_score: float, away_score: float) -> float:
+    """Home team's Glicko score: 1 win, 0.5 draw, 0 loss"""
+    return 1.0 if home_score > away_score else 0.5 if home_score == away_score else 0.0
+
+class TeamRatings:
+    """
+    Glicko ratings for one sport, held as arrays indexed by team.
+
+    Every match is its own rating period: both teams' deviations first grow
+    with the days since they last played, then both are updated against each
+    other, so recording a match is O(1). `rebuild` replays a full history in
+    rounds of matches that share no team, updating each round with one
+    vectorized pass; every team still sees its matches in order, so the result
+    equals applying them one by one.
+    """
+    def __init__(self, sport: str, capacity: int = 64):
+        self.sport = sport
+        self.index: Dict[str, int] = {}
+        self.teams: List[str] = []
+        self.rating = np.full(capacity, float(settings.RATING_INITIAL))
+        self.rd = np.full(capacity, float(settings.RATING_INITIAL_RD))
+        self.games = np.zeros(capacity, dtype=np.int64)
+        self.last_played = np.full(capacity, np.nan)
+        self.last_match_id = 0
+        self.matches = 0
+
+    def team(self, name: str, create: bool = False) -> Optional[int]:
+        index = self.index.get(name)
+        if index is None and create:
+            index = len(self.teams)
+            if index == len(self.rating):
+                self._grow()
+            self.index[name] = index
+            self.teams.append(name)
+        return index
+
+    def _grow(self):
+        extra = len(self.rating)
+        self.rating = np.concatenate([self.rating, np.full(extra, float(settings.RATING_INITIAL))])
+        self.rd = np.concatenate([self.rd, np.full(extra, float(settings.RATING_INITIAL_RD))])
+        self.games = np.concatenate([self.games, np.zeros(extra, dtype=np.int64)])
+        self.last_played = np.concatenate([self.last_played, np.full(extra, np.nan)])
+
+    def _inflate(self, teams: np.ndarray, day: np.ndarray) -> np.ndarray:
+        """Deviation after growing with the time off since each team's last match"""
+        idle = np.nan_to_num(np.maximum(day - self.last_played[teams], 0.0), nan=0.0)
+        return np.minimum(
+            np.sqrt(self.rd[teams] ** 2 + settings.RATING_RD_GROWTH ** 2 * idle),
+            settings.RATING_INITIAL_RD
+        )
+
+    def update(self, home: np.ndarray, away: np.ndarray, score: np.ndarray, day: np.ndarray):
+        """Apply matches between distinct teams at once; no team may appear twice"""
+        rd_home, rd_away = self._inflate(home, day), self._inflate(away, day)
+        diff = self.rating[home] + settings.RATING_HOME_ADVANTAGE - self.rating[away]
+        g_home, g_away = _g(rd_home), _g(rd_away)
+        expected_home = 1 / (1 + 10 ** (-g_away * diff / 400))
+        expected_away = 1 / (1 + 10 ** (g_home * diff / 400))
+
+        precision_home = 1 / rd_home ** 2 + Q ** 2 * g_away ** 2 * expected_home * (1 - expected_home)
+        precision_away = 1 / rd_away ** 2 + Q ** 2 * g_home ** 2 * expected_away * (1 - expected_away)
+        self.rating[home] += Q / precision_home * g_away * (score - expected_home)
+        self.rating[away] += Q / precision_away * g_home * ((1 - score) - expected_away)
+        self.rd[home] = np.maximum(np.sqrt(1 / precision_home), settings.RATING_MIN_RD)
+        self.rd[away] = np.maximum(np.sqrt(1 / precision_away), settings.RATING_MIN_RD)
+        self.games[home] += 1
+        self.games[away] += 1
+        self.last_played[home] = np.fmax(self.last_played[home], day)
+        self.last_played[away] = np.fmax(self.last_played[away], day)
+        self.matches += len(home)
+
+    def record(
+        self,
+        home_team: str,
+        away_team: str,
+        home_score: float,
+        away_score: float,
+        played_at: Optional[datetime] = None,
+        match_id: Optional[int] = None
+    ):
+        """Apply one finished match"""
+        home, away = self.team(home_team, create=True), self.team(away_team, create=True)
+        self.update(
+            np.array([home]), np.array([away]),
+            np.array([match_score(home_score, away_score)]), np.array([match_day(played_at)])
+        )
+        if match_id is not None:
+            self.last_match_id = max(self.last_match_id, match_id)
+
+    @classmethod
+    def rebuild(cls, sport: str, matches: List[Tuple]) -> "TeamRatings":
+        """Ratings from a chronological history of (id, home, away, home_score, away_score, played_at)"""
+        ratings = cls(sport)
+        if not matches:
+            return ratings
+        home = np.array([ratings.team(m[1], create=True) for m in matches])
+        away = np.array([ratings.team(m[2], create=True) for m in matches])
+        score = np.array([match_score(m[3], m[4]) for m in matches])
+        day = np.array([match_day(m[5]) for m in matches])
+
+        # A match's round is one past the latest round either team has played in
+        last_round = np.full(len(ratings.teams), -1, dtype=np.int64)
+        rounds = np.empty(len(matches), dtype=np.int64)
+        for i, (h, a) in enumerate(zip(home.tolist(), away.tolist())):
+            rounds[i] = max(last_round[h], last_round[a]) + 1
+            last_round[h] = last_round[a] = rounds[i]
+
+        order = np.argsort(rounds, kind="stable")
+        boundaries = np.flatnonzero(np.diff(rounds[order])) + 1
+        for batch in np.split(order, boundaries):
+            ratings.update(home[batch], away[batch], score[batch], day[batch])
+        ratings.last_match_id = max(m[0] for m in matches)
+        return ratings
+
+    def lookup(self, team: str) -> Optional[Dict[str, Any]]:
+        index = self.team(team)
+        if index is None:
+            return None
+        return {
+            "team": team,
+            "rating": float(self.rating[index]),
+            "rd": float(self.rd[index]),
+            "games": int(self.games[index])
+        }
+
+    def expected(self, home_team: str, away_team: str) -> float:
+        """Home team's expected score, with home advantage; unknown teams have the initial rating"""
+        home, away = self.team(home_team), self.team(away_team)
+        rating_home = self.rating[home] if home is not None else settings.RATING_INITIAL
+        rating_away = self.rating[away] if away is not None else settings.RATING_INITIAL
+        rd_away = self.rd[away] if away is not None else settings.RATING_INITIAL_RD
+        rd_home = self.rd[home] if home is not None else settings.RATING_INITIAL_RD
+        # Glicko expectation against an uncertain opponent, combining both deviations
+        g = _g(np.sqrt(rd_home ** 2 + rd_away ** 2))
+        return float(1 / (1 + 10 ** (-g * (rating_home + settings.RATING_HOME_ADVANTAGE - rating_away) / 400)))
+
+    def table(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        n = len(self.teams)
+        order = np.argsort(-self.rating[:n], kind="stable")[:limit]
+        return [self.lookup(self.teams[i]) for i in order]
+
+class RatingService:
+    """
+    Team ratings per sport, kept in memory and current with the match_results
+    table: on first use a sport starts from its newest checkpoint in the model
+    store, then applies newer matches incrementally (at most every
+    RATING_REFRESH_SECONDS). A checkpoint is published every
+    RATING_CHECKPOINT_MATCHES applied matches and after each rebuild.
+
+    Matches are applied in insertion order; a rebuild re-sorts the full
+    history by played_at if results arrived late.
+    """
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ratings: Dict[str, TeamRatings] = {}
+        self._checked: Dict[str, float] = {}
+        self._since_checkpoint: Dict[str, int] = {}
+
+    def get(self, db: Session, sport: str, refresh: bool = False) -> TeamRatings:
+        with self._lock:
+            ratings = self._ratings.get(sport)
+            if ratings is None:
+                checkpoint = model_registry.get("ratings", sport)
+                ratings = copy.deepcopy(checkpoint) if checkpoint is not None else TeamRatings(sport)
+                self._ratings[sport] = ratings
+                refresh = True
+            if refresh or time.monotonic() - self._checked.get(sport, 0) >= settings.RATING_REFRESH_SECONDS:
+                self._catch_up(db, ratings)
+            return ratings
+
+    def _catch_up(self, db: Session, ratings: TeamRatings):
+        matches = db.query(
+            MatchResult.id, MatchResult.home_team, MatchResult.away_team,
+            MatchResult.home_score, MatchResult.away_score, MatchResult.played_at
+        ).filter(
+            MatchResult.sport == ratings.sport,
+            MatchResult.id > ratings.last_match_id
+        ).order_by(MatchResult.id).all()
+        for match_id, home, away, home_score, away_score, played_at in matches:
+            ratings.record(home, away, home_score, away_score, played_at, match_id)
+        self._checked[ratings.sport] = time.monotonic()
+        pending = self._since_checkpoint.get(ratings.sport, 0) + len(matches)
+        self._since_checkpoint[ratings.sport] = pending
+        if pending >= settings.RATING_CHECKPOINT_MATCHES:
+            self.checkpoint(ratings.sport)
+
+    def record_results(self, db: Session, sport: str, results: List[Dict[str, Any]]) -> TeamRatings:
+        """Store finished matches and apply them"""
+        db.add_all([MatchResult(sport=sport, **result) for result in results])
+        db.commit()
+        return self.get(db, sport, refresh=True)
+
+    def checkpoint(self, sport: str) -> Optional[int]:
+        with self._lock:
+            ratings = self._ratings.get(sport)
+            if ratings is None:
+                return None
+            try:
+                version = model_registry.publish("ratings", sport, ratings, {
+                    "sport": sport,
+                    "teams": len(ratings.teams),
+                    "matches": ratings.matches,
+                    "last_match_id": ratings.last_match_id
+                }, serve=False)
+            except Exception as e:
+                logger.error(f"Error checkpointing {sport} ratings: {str(e)}")
+                return None
+            self._since_checkpoint[sport] = 0
+            return version
+
+    def rebuild(self, db: Session, sport: str) -> TeamRatings:
+        """Recompute a sport's ratings from its full match history and checkpoint them"""
+        matches = db.query(
+            MatchResult.id, MatchResult.home_team, MatchResult.away_team,
+            MatchResult.home_score, MatchResult.away_score, MatchResult.played_at
+        ).filter(MatchResult.sport == sport).order_by(MatchResult.played_at, MatchResult.id).all()
+        ratings = TeamRatings.rebuild(sport, matches)
+        with self._lock:
+            self._ratings[sport] = ratings
+            self._checked[sport] = time.monotonic()
+            self.checkpoint(sport)
+        logger.info(f"Rebuilt {sport} ratings for {len(ratings.teams)} teams from {len(matches)} matches")
+        return ratings
+
+    def game_ratings(self, db: Session, sport: str, home_team: str, away_team: str) -> Dict[str, float]:
+        """Server-side rating features for a game"""
+        ratings = self.get(db, sport)
+        with self._lock:
+            home, away = ratings.lookup(home_team), ratings.lookup(away_team)
+            return {
+                "home_team_rating": home["rating"] if home else float(settings.RATING_INITIAL),
+                "away_team_rating": away["rating"] if away else float(settings.RATING_INITIAL),
+                "home_win_expectancy": ratings.expected(home_team, away_team)
+            }
+
+rating_service = RatingService()
@@ -0,0 +1,246 @@
+from typing import Dict, List, Optional, Any, Tuple
+from datetime import datetime, date, timezone
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case, extract, and_, or_, insert, select, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+import logging
+import numpy as np
+from ..models.predictions import Prediction
+from ..models.performance_rollup import UserDailyRollup, SportHourlyRollup
+from .odds import american_to_decimal, implied_probability
+
+logger = logging.getLogger(__name__)
+
+# Predictions are keyed by prop_type, which is what the API exposes as "sport".
+# Every prediction is a one-unit stake on the side it backs: "over" when the
+# predicted value is above the line, otherwise "under".
+UNIT_STAKE = 1.0
+
+PICKED_SIDE = case((Prediction.prediction > Prediction.prop_value, "over"), else_="under")
+OUTCOME = case(
+    (Prediction.actual_result > Prediction.prop_value, "over"),
+    (Prediction.actual_result < Prediction.prop_value, "under"),
+    else_="push"
+)
+
+# Odds are stored as American prices per side; convert the backed side to
+# decimal the same way odds.american_to_decimal does (NULL when unconvertible)
+_picked_american = case(
+    (Prediction.prediction > Prediction.prop_value, Prediction.odds["over"].as_float()),
+    else_=Prediction.odds["under"].as_float()
+)
+PICKED_ODDS = case(
+    (_picked_american >= 100, 1 + _picked_american / 100.0),
+    (_picked_american <= -100, 1 + 100.0 / func.abs(_picked_american)),
+    else_=None
+)
+
+SETTLED = Prediction.prediction_correct.isnot(None)
+WON = Prediction.prediction_correct.is_(True)
+WIN_RATE = func.avg(case((WON, 1.0), else_=0.0))
+
+SETTLED_FIELDS = ("settled", "correct", "priced", "odds_sum", "returns")
+OUTCOME_FIELDS = ("over", "under", "push", "favorite", "value_bets")
+
+def decimal_odds(american: Optional[float]) -> Optional[float]:
+    if american is None:
+        return None
+    decimal = float(american_to_decimal(american))
+    return decimal if np.isfinite(decimal) else None
+
+def bucket(created_at: Optional[datetime]) -> Tuple[date, int]:
+    """UTC (day, hour) a prediction is counted under; naive datetimes are taken as UTC"""
+    created_at = created_at or datetime.now(timezone.utc)
+    if created_at.tzinfo:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date(), created_at.hour
+
+def settlement_counts(prediction: Prediction) -> Dict[str, float]:
+    """A settled prediction's contribution to the rollup counters, mirroring the SQL expressions above"""
+    side = "over" if prediction.prediction > prediction.prop_value else "under"
+    if prediction.actual_result > prediction.prop_value:
+        outcome = "over"
+    elif prediction.actual_result < prediction.prop_value:
+        outcome = "under"
+    else:
+        outcome = "push"
+    odds = decimal_odds((prediction.odds or {}).get(side))
+    won = bool(prediction.prediction_correct)
+    return {
+        "settled": 1,
+        "correct": int(won),
+        "priced": int(odds is not None),
+        "odds_sum": odds or 0.0,
+        "returns": odds if won and odds else 0.0,
+        "over": int(outcome == "over"),
+        "under": int(outcome == "under"),
+        "push": int(outcome == "push"),
+        "favorite": int(side == outcome),
+        "value_bets": int(odds is not None and prediction.confidence is not None and prediction.confidence > implied_probability(odds))
+    }
+
+class PerformanceRollups:
+    """
+    Pre-aggregated prediction counters in (user, sport, day) and (sport, day, hour)
+    buckets, kept current as predictions are created and settled.
+
+    Writes go through the caller's session so they commit atomically with the
+    prediction itself. `rebuild` recomputes everything from the predictions table.
+    """
+
+    def _upsert(self, db: Session, model, constraint: str, keys: Dict[str, Any], counts: Dict[str, float]):
+        table = model.__table__
+        stmt = pg_insert(table).values(**keys, **counts)
+        update = {name: table.c[name] + stmt.excluded[name] for name in counts if name != "max_winning_odds"}
+        if "max_winning_odds" in counts:
+            update["max_winning_odds"] = func.greatest(table.c.max_winning_odds, stmt.excluded.max_winning_odds)
+        update["updated_at"] = func.now()
+        db.execute(stmt.on_conflict_do_update(constraint=constraint, set_=update))
+
+    def record_created(self, db: Session, prediction: Prediction):
+        day, hour = bucket(prediction.created_at)
+        self._upsert(db, UserDailyRollup, "uq_user_daily_rollups", {
+            "user_id": prediction.user_id, "sport": prediction.prop_type, "day": day
+        }, {"predictions": 1})
+        self._upsert(db, SportHourlyRollup, "uq_sport_hourly_rollups", {
+            "sport": prediction.prop_type, "day": day, "hour": hour
+        }, {"predictions": 1})
+
+    def record_created_many(self, db: Session, predictions: List[Prediction]):
+        """record_created for a batch, as one multi-row upsert per rollup table"""
+        daily: Dict[Tuple, int] = {}
+        hourly: Dict[Tuple, int] = {}
+        for prediction in predictions:
+            day, hour = bucket(prediction.created_at)
+            daily_key = (prediction.user_id, prediction.prop_type, day)
+            hourly_key = (prediction.prop_type, day, hour)
+            daily[daily_key] = daily.get(daily_key, 0) + 1
+            hourly[hourly_key] = hourly.get(hourly_key, 0) + 1
+        if not daily:
+            return
+        for model, constraint, rows in (
+            (UserDailyRollup, "uq_user_daily_rollups", [
+                {"user_id": user_id, "sport": sport, "day": day, "predictions": count}
+                for (user_id, sport, day), count in daily.items()
+            ]),
+            (SportHourlyRollup, "uq_sport_hourly_rollups", [
+                {"sport": sport, "day": day, "hour": hour, "predictions": count}
+                for (sport, day, hour), count in hourly.items()
+            ])
+        ):
+            stmt = pg_insert(model.__table__).values(rows)
+            db.execute(stmt.on_conflict_do_update(constraint=constraint, set_={
+                "predictions": model.__table__.c.predictions + stmt.excluded.predictions,
+                "updated_at": func.now()
+            }))
+
+    def record_settlement(self, db: Session, prediction: Prediction, sign: int = 1):
+        """
+        Add a settled prediction to its buckets, or remove it with sign=-1 before
+        it is re-graded. max_winning_odds only ever grows; a rebuild tightens it.
+        """
+        counts = settlement_counts(prediction)
+        day, hour = bucket(prediction.created_at)
+        self._upsert(db, UserDailyRollup, "uq_user_daily_rollups", {
+            "user_id": prediction.user_id, "sport": prediction.prop_type, "day": day
+        }, {name: sign * counts[name] for name in SETTLED_FIELDS})
+
+        hourly = {name: sign * counts[name] for name in SETTLED_FIELDS + OUTCOME_FIELDS}
+        if sign > 0 and counts["correct"] and counts["priced"]:
+            hourly["max_winning_odds"] = counts["returns"]
+        self._upsert(db, SportHourlyRollup, "uq_sport_hourly_rollups", {
+            "sport": prediction.prop_type, "day": day, "hour": hour
+        }, hourly)
+
+    def _hourly_since(self, since: Optional[datetime]) -> List:
+        if not since:
+            return []
+        day, hour = bucket(since)
+        return [or_(
+            SportHourlyRollup.day > day,
+            and_(SportHourlyRollup.day == day, SportHourlyRollup.hour >= hour)
+        )]
+
+    def sport_totals(self, db: Session, sport: str, since: Optional[datetime] = None):
+        """Summed counters for a sport from `since` (hour granularity) onwards"""
+        columns = [
+            func.coalesce(func.sum(getattr(SportHourlyRollup, name)), 0).label(name)
+            for name in ("predictions",) + SETTLED_FIELDS + OUTCOME_FIELDS
+        ]
+        return db.query(
+            *columns,
+            func.max(SportHourlyRollup.max_winning_odds).label("max_winning_odds")
+        ).filter(SportHourlyRollup.sport == sport, *self._hourly_since(since)).one()
+
+    def best_hour(self, db: Session, sport: str, since: Optional[datetime] = None):
+        """Hour of day (UTC) with the highest win rate, or None"""
+        win_rate = func.sum(SportHourlyRollup.correct) * 1.0 / func.sum(SportHourlyRollup.settled)
+        return db.query(
+            SportHourlyRollup.hour.label("hour"),
+            win_rate.label("win_rate")
+        ).filter(
+            SportHourlyRollup.sport == sport, *self._hourly_since(since)
+        ).group_by(SportHourlyRollup.hour).having(
+            func.sum(SportHourlyRollup.settled) > 0
+        ).order_by(win_rate.desc()).first()
+
+    def user_sports(self, db: Session, user_id: int, since: Optional[datetime] = None) -> List:
+        """Summed counters per sport for a user from the day of `since` onwards"""
+        filters = [UserDailyRollup.user_id == user_id]
+        if since:
+            filters.append(UserDailyRollup.day >= bucket(since)[0])
+        return db.query(
+            UserDailyRollup.sport.label("sport"),
+            *[func.sum(getattr(UserDailyRollup, name)).label(name) for name in ("predictions",) + SETTLED_FIELDS]
+        ).filter(*filters).group_by(UserDailyRollup.sport).all()
+
+    def rebuild(self, db: Session) -> Dict[str, int]:
+        """Recompute both rollup tables from the predictions table in the caller's transaction"""
+        created = func.timezone("UTC", Prediction.created_at)
+        day = func.date(created)
+        hour = extract("hour", created)
+
+        def count_if(*criteria):
+            return func.count(Prediction.id).filter(*criteria)
+
+        def sum_if(expr, *criteria):
+            return func.coalesce(func.sum(expr).filter(*criteria), 0)
+
+        settled_columns = [
+            count_if(SETTLED),
+            count_if(WON),
+            count_if(SETTLED, PICKED_ODDS.isnot(None)),
+            sum_if(PICKED_ODDS, SETTLED),
+            sum_if(PICKED_ODDS, WON)
+        ]
+
+        db.execute(delete(UserDailyRollup))
+        db.execute(delete(SportHourlyRollup))
+
+        db.execute(insert(UserDailyRollup).from_select(
+            ["user_id", "sport", "day", "predictions", *SETTLED_FIELDS],
+            select(
+                Prediction.user_id, Prediction.prop_type, day, func.count(Prediction.id), *settled_columns
+            ).group_by(Prediction.user_id, Prediction.prop_type, day)
+        ))
+        db.execute(insert(SportHourlyRollup).from_select(
+            ["sport", "day", "hour", "predictions", *SETTLED_FIELDS, *OUTCOME_FIELDS, "max_winning_odds"],
+            select(
+                Prediction.prop_type, day, hour, func.count(Prediction.id), *settled_columns,
+                count_if(SETTLED, OUTCOME == "over"),
+                count_if(SETTLED, OUTCOME == "under"),
+                count_if(SETTLED, OUTCOME == "push"),
+                count_if(SETTLED, PICKED_SIDE == OUTCOME),
+                count_if(SETTLED, Prediction.confidence > 1 / PICKED_ODDS),
+                func.max(PICKED_ODDS).filter(WON)
+            ).group_by(Prediction.prop_type, day, hour)
+        ))
+
+        counts = {
+            "user_daily": db.query(func.count(UserDailyRollup.id)).scalar(),
+            "sport_hourly": db.query(func.count(SportHourlyRollup.id)).scalar()
+        }
+        logger.info(f"Rebuilt performance rollups: {counts}")
+        return counts
+
+performance_rollups = PerformanceRollups()
@@ -0,0 +1,199 @@
+from typing import Dict, List, Optional, Any, Set, Tuple
+import logging
+import re
+import threading
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+MAX_PREFIX_LENGTH = 12
+
+class SearchIndex:
+    """
+    In-process search index over teams and players.
+
+    Names and aliases are normalized (case, diacritics, punctuation) and
+    indexed by token prefix for autocomplete and by trigram for fuzzy matches.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entities: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._names: Dict[Tuple[str, str], List[str]] = {}
+        self._exact: Dict[str, Set[Tuple[str, str]]] = {}
+        self._prefixes: Dict[str, Set[Tuple[str, str]]] = {}
+        self._trigrams: Dict[str, Set[Tuple[str, str]]] = {}
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Lowercase, strip diacritics and collapse punctuation to single spaces"""
+        text = unicodedata.normalize("NFKD", text or "")
+        text = "".join(c for c in text if not unicodedata.combining(c))
+        text = re.sub(r"[^a-z0-9]+", " ", text.lower())
+        return text.strip()
+
+    @staticmethod
+    def _trigrams_of(name: str) -> Set[str]:
+        padded = f"  {name} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def _index_keys(self, name: str) -> Tuple[Set[str], Set[str]]:
+        prefixes = set()
+        for token in [name] + name.split():
+            for i in range(1, min(len(token), MAX_PREFIX_LENGTH) + 1):
+                prefixes.add(token[:i])
+        trigrams = set()
+        for token in self._variants(name):
+            trigrams |= self._trigrams_of(token)
+        return prefixes, trigrams
+
+    @staticmethod
+    def _variants(name: str) -> List[str]:
+        tokens = name.split()
+        return [name] + tokens if len(tokens) > 1 else [name]
+
+    def _unindex(self, key: Tuple[str, str]):
+        for name in self._names.pop(key, []):
+            prefixes, trigrams = self._index_keys(name)
+            for table, entries in ((self._exact, {name}), (self._prefixes, prefixes), (self._trigrams, trigrams)):
+                for entry in entries:
+                    bucket = table.get(entry)
+                    if bucket is not None:
+                        bucket.discard(key)
+                        if not bucket:
+                            del table[entry]
+        self._entities.pop(key, None)
+
+    def add(
+        self,
+        kind: str,
+        entity_id: str,
+        name: str,
+        aliases: Optional[List[str]] = None,
+        data: Optional[Dict[str, Any]] = None
+    ):
+        """Add or replace a single team or player"""
+        key = (kind, str(entity_id))
+        names = []
+        for value in [name] + list(aliases or []):
+            normalized = self.normalize(value)
+            if normalized and normalized not in names:
+                names.append(normalized)
+        if not names:
+            return
+
+        with self._lock:
+            self._unindex(key)
+            self._entities[key] = {
+                "type": kind,
+                "id": str(entity_id),
+                "name": name,
+                "data": data or {}
+            }
+            self._names[key] = names
+            for normalized in names:
+                prefixes, trigrams = self._index_keys(normalized)
+                self._exact.setdefault(normalized, set()).add(key)
+                for prefix in prefixes:
+                    self._prefixes.setdefault(prefix, set()).add(key)
+                for trigram in trigrams:
+                    self._trigrams.setdefault(trigram, set()).add(key)
+
+    def remove(self, kind: str, entity_id: str):
+        with self._lock:
+            self._unindex((kind, str(entity_id)))
+
+    def add_teams(self, teams: List[Dict[str, Any]]):
+        """Index teams in the shape returned by SportsDataService"""
+        for team in teams:
+            aliases = [a.strip() for a in (team.get("alternate") or "").split(",") if a.strip()]
+            self.add("team", team["id"], team["name"], aliases, team)
+
+    def add_players(self, players: List[Dict[str, Any]]):
+        """Index players in the shape returned by SportsDataService"""
+        for player in players:
+            self.add("player", player["id"], player["name"], data=player)
+
+    def get(self, kind: str, entity_id: str) -> Optional[Dict[str, Any]]:
+        entity = self._entities.get((kind, str(entity_id)))
+        return entity["data"] if entity else None
+
+    def autocomplete(self, prefix: str, kind: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """Prefix lookup for type-ahead; exact name matches rank first, then shorter names"""
+        query = self.normalize(prefix)[:MAX_PREFIX_LENGTH]
+        if not query:
+            return []
+        keys = self._prefixes.get(query, set())
+        exact = self._exact.get(self.normalize(prefix), set())
+        ranked = sorted(
+            (key for key in keys if kind is None or key[0] == kind),
+            key=lambda key: (key not in exact, len(self._entities[key]["name"]), self._entities[key]["name"])
+        )
+        return [self._result(key, 1.0 if key in exact else 0.9) for key in ranked[:limit]]
+
+    def search(
+        self,
+        query: str,
+        kind: Optional[str] = None,
+        limit: int = 10,
+        min_score: float = 0.3
+    ) -> List[Dict[str, Any]]:
+        """Fuzzy search ranked by exact match, prefix match, then trigram similarity"""
+        normalized = self.normalize(query)
+        if not normalized:
+            return []
+
+        scores: Dict[Tuple[str, str], float] = {}
+        for key in self._exact.get(normalized, ()):
+            scores[key] = 1.0
+        for key in self._prefixes.get(normalized[:MAX_PREFIX_LENGTH], ()):
+            scores.setdefault(key, 0.9)
+
+        query_trigrams = self._trigrams_of(normalized)
+        candidates: Set[Tuple[str, str]] = set()
+        for trigram in query_trigrams:
+            candidates.update(self._trigrams.get(trigram, ()))
+        for key in candidates:
+            if key in scores:
+                continue
+            best = max(
+                len(query_trigrams & self._trigrams_of(variant)) / len(query_trigrams | self._trigrams_of(variant))
+                for name in self._names[key]
+                for variant in self._variants(name)
+            )
+            if best >= min_score:
+                scores[key] = round(best * 0.8, 4)
+
+        ranked = sorted(
+            (item for item in scores.items() if kind is None or item[0][0] == kind),
+            key=lambda item: (-item[1], self._entities[item[0]]["name"])
+        )
+        return [self._result(key, score) for key, score in ranked[:limit]]
+
+    def resolve(self, name: str, kind: str) -> Optional[Dict[str, Any]]:
+        """
+        Data of the one entity whose normalized name or alias is exactly `name`,
+        without an upstream call; prefix and fuzzy matches never resolve
+        """
+        keys = [key for key in self._exact.get(self.normalize(name), ()) if key[0] == kind]
+        if len(keys) != 1:
+            return None
+        return self._entities[keys[0]]["data"]
+
+    def _result(self, key: Tuple[str, str], score: float) -> Dict[str, Any]:
+        entity = self._entities[key]
+        return {
+            "type": entity["type"],
+            "id": entity["id"],
+            "name": entity["name"],
+            "score": score
+        }
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "teams": sum(1 for kind, _ in self._entities if kind == "team"),
+            "players": sum(1 for kind, _ in self._entities if kind == "player"),
+            "prefixes": len(self._prefixes),
+            "trigrams": len(self._trigrams)
+        }
+
+search_index = SearchIndex()
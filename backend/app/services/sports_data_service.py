@@ -2,13 +2,18 @@ import aiohttp
 import asyncio
 from typing import Dict, List, Optional, Any
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 import logging
 from ..core.config import settings
+from .weather_service import weather_service
+from .search_service import search_index
 import httpx
 
 logger = logging.getLogger(__name__)
 
+# Fields searchteams.php returns that league listings leave out
+TEAM_DETAIL_FIELDS = ("league", "description", "formed_year", "country")
+
 class SportsDataService:
     def __init__(self):
         # API endpoints for different sports data providers
@@ -85,22 +90,9 @@ class SportsDataService:
             logger.error(f"Error fetching team stats: {str(e)}")
             return None
 
-    async def fetch_weather_data(self, location: str) -> Dict:
+    async def fetch_weather_data(self, location: str, when: Optional[datetime] = None) -> Dict:
         """Fetch weather data for outdoor sports"""
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"https://api.weather-provider.com/forecast/{location}",
-                    headers={"Authorization": f"Bearer {settings.WEATHER_API_KEY}"}
-                ) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    else:
-                        logger.error(f"Error fetching weather data: {response.status}")
-                        return None
-        except Exception as e:
-            logger.error(f"Error fetching weather data: {str(e)}")
-            return None
+        return await weather_service.get_forecast(location, when)
 
     async def get_game_features(self, sport: str, game_id: str) -> Dict:
         """Gather all relevant features for a game prediction"""
@@ -120,7 +112,10 @@ class SportsDataService:
 
         # For outdoor sports, get weather data
         if sport in ['football', 'baseball', 'cricket']:
-            weather = await self.fetch_weather_data(game_info['location'])
+            weather = await self.fetch_weather_data(
+                game_info['location'],
+                self._parse_kickoff(game_info.get('utcDate'))
+            )
             features['weather_conditions'] = weather
 
         # Combine all data
@@ -133,6 +128,16 @@ class SportsDataService:
 
         return features
 
+    def _parse_kickoff(self, value: Optional[str]) -> Optional[datetime]:
+        if not value:
+            return None
+        try:
+            kickoff = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+        # Naive UTC, converting any other offset rather than dropping it
+        return kickoff.astimezone(timezone.utc).replace(tzinfo=None) if kickoff.tzinfo else kickoff
+
     async def fetch_game_info(self, sport: str, game_id: str) -> Dict:
         """Fetch basic game information"""
         try:
@@ -160,6 +165,11 @@ class SportsDataService:
 
     async def get_team_stats(self, team_name: str) -> Optional[Dict[str, Any]]:
         """Get team statistics from TheSportsDB v2"""
+        indexed = search_index.resolve(team_name, "team")
+        # League listings index teams without their details; only a full record can skip the lookup
+        if indexed and all(field in indexed for field in TEAM_DETAIL_FIELDS):
+            return indexed
+
         try:
             async with httpx.AsyncClient() as client:
                 # Search for team using v2 endpoint
@@ -175,7 +185,7 @@ class SportsDataService:
                     return None
 
                 team = data["teams"][0]
-                return {
+                stats = {
                     "id": team["idTeam"],
                     "name": team["strTeam"],
                     "league": team["strLeague"],
@@ -196,6 +206,8 @@ class SportsDataService:
                     "stadium_capacity": team.get("intStadiumCapacity", ""),
                     "alternate": team.get("strAlternate", "")
                 }
+                search_index.add_teams([stats])
+                return stats
         except Exception as e:
             logger.error(f"Error fetching team stats: {str(e)}")
             return None
@@ -214,7 +226,7 @@ class SportsDataService:
                 if not data.get("teams"):
                     return []
 
-                return [{
+                teams = [{
                     "id": team["idTeam"],
                     "name": team["strTeam"],
                     "stadium": team["strStadium"],
@@ -231,6 +243,12 @@ class SportsDataService:
                     "stadium_capacity": team.get("intStadiumCapacity", ""),
                     "alternate": team.get("strAlternate", "")
                 } for team in data["teams"]]
+                # Keep full records from searchteams.php rather than downgrading them
+                search_index.add_teams([
+                    team for team in teams
+                    if not all(field in (search_index.get("team", team["id"]) or {}) for field in TEAM_DETAIL_FIELDS)
+                ])
+                return teams
         except Exception as e:
             logger.error(f"Error fetching league teams: {str(e)}")
             return []
@@ -275,7 +293,7 @@ class SportsDataService:
                 if not players_data:
                     return []
 
-                return [{
+                players = [{
                     "id": player["idPlayer"],
                     "name": player["strPlayer"],
                     "nationality": player.get("strNationality", ""),
@@ -316,6 +334,8 @@ class SportsDataService:
                     "team19": player.get("strTeam19", ""),
                     "team20": player.get("strTeam20", "")
                 } for player in players_data]
+                search_index.add_players(players)
+                return players
         except Exception as e:
             logger.error(f"Error fetching team players: {str(e)}")
             return []
@@ -403,7 +423,7 @@ class SportsDataService:
                 if not data.get("events"):
                     return []
 
-                return [{
+                matches = [{
                     "id": match["idEvent"],
                     "date": match["dateEvent"],
                     "time": match["strTime"],
@@ -419,6 +439,8 @@ class SportsDataService:
                     "postponed": match.get("strPostponed", ""),
                     "locked": match.get("strLocked", "")
                 } for match in data["events"]]
+                weather_service.schedule_prefetch(matches)
+                return matches
         except Exception as e:
             logger.error(f"Error fetching upcoming matches: {str(e)}")
             return []
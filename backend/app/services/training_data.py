@@ -0,0 +1,106 @@
+from typing import List, Optional, Tuple
+from datetime import datetime
+from sqlalchemy.orm import Session
+from sqlalchemy import func, case, and_, or_
+import numpy as np
+import logging
+from ..models.predictions import Prediction
+from .feature_vectors import FEATURE_SCHEMA_VERSION, FEATURE_DTYPE, PLAYER_FEATURES, feature_columns, vector_from_json
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 5000
+SAMPLE_BUCKETS = 10000
+
+# JSON features are only fetched (and parsed) for rows without a packed vector
+LEGACY_FEATURES = case((Prediction.feature_vector.is_(None), Prediction.features))
+
+def training_filters(
+    prop_type: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    sample_rate: Optional[float] = None,
+    seed: int = 0
+) -> List:
+    """
+    Filters for settled predictions of a prop type that have a current-schema
+    packed vector or legacy JSON features, optionally within a game-date window.
+    Sampling hashes the row ID, so it is deterministic for a given seed and the
+    same filter can be used to count and to stream.
+    """
+    filters = [
+        Prediction.prop_type == prop_type,
+        Prediction.actual_result.isnot(None),
+        or_(
+            and_(Prediction.feature_vector.isnot(None), Prediction.feature_schema_version == FEATURE_SCHEMA_VERSION),
+            and_(Prediction.feature_vector.is_(None), Prediction.features.isnot(None))
+        )
+    ]
+    if since:
+        filters.append(Prediction.game_date >= since)
+    if until:
+        filters.append(Prediction.game_date < until)
+    if sample_rate is not None and sample_rate < 1:
+        filters.append(
+            func.mod(Prediction.id * 2654435761 + seed, SAMPLE_BUCKETS) < int(sample_rate * SAMPLE_BUCKETS)
+        )
+    return filters
+
+def load_training_data(
+    db: Session,
+    prop_type: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    sample_rate: Optional[float] = None,
+    seed: int = 0,
+    max_rows: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Stream settled predictions into preallocated (X, y) arrays.
+
+    Only the packed vector, legacy JSON features and actual_result are
+    selected, through a server-side cursor in `chunk_size` batches, so peak
+    memory is the final matrices plus one chunk of rows. Packed vectors are
+    copied straight from their bytes with no JSON parsing. X is float32,
+    which is what the sklearn tree ensembles train on, so fitting does not
+    copy it again. Rows whose width differs from the current schema (or, for
+    legacy-only data, from the first row) are skipped.
+    """
+    filters = training_filters(prop_type, since, until, sample_rate, seed)
+    total = db.query(func.count(Prediction.id)).filter(*filters).scalar() or 0
+    if max_rows is not None:
+        total = min(total, max_rows)
+    if total == 0:
+        return np.empty((0, 0), dtype=np.float32), np.empty(0, dtype=np.float64)
+
+    rows = db.query(Prediction.feature_vector, LEGACY_FEATURES, Prediction.actual_result).filter(
+        *filters
+    ).order_by(Prediction.id).execution_options(stream_results=True).yield_per(chunk_size)
+
+    X: Optional[np.ndarray] = None
+    y = np.empty(total, dtype=np.float64)
+    filled = skipped = 0
+    for packed, features, actual_result in rows:
+        if filled >= total:
+            break
+        if packed is not None:
+            vector = np.frombuffer(packed, dtype=FEATURE_DTYPE)
+        else:
+            vector = vector_from_json(features, feature_columns(features) if isinstance(features, dict) else None)
+        if X is None:
+            width = len(PLAYER_FEATURES) if packed is not None else len(vector)
+            X = np.empty((total, width), dtype=np.float32)
+        if vector is None or len(vector) != X.shape[1]:
+            skipped += 1
+            continue
+        X[filled] = vector
+        y[filled] = actual_result
+        filled += 1
+
+    if skipped:
+        logger.warning(f"Skipped {skipped} {prop_type} training rows with mismatched feature width")
+    if X is None:
+        return np.empty((0, 0), dtype=np.float32), np.empty(0, dtype=np.float64)
+    # Slicing keeps views; rows can only go missing if some were skipped or deleted mid-stream
+    return X[:filled], y[:filled]
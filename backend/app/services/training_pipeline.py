@@ -0,0 +1,230 @@
+from typing import Dict, List, Optional, Any, Set, Tuple
+from concurrent.futures import ProcessPoolExecutor, Future, wait
+import logging
+import multiprocessing
+import asyncio
+import threading
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..database import SessionLocal
+from ..models.predictions import Prediction
+from .feature_vectors import FEATURE_SCHEMA_VERSION
+from .model_registry import model_registry
+from .training_data import load_training_data, training_filters
+
+logger = logging.getLogger(__name__)
+
+# Bounds the prop types remembered between background checks
+MAX_WANTED_MODELS = 256
+
+def fit_player_model(X: np.ndarray, y: np.ndarray) -> RandomForestRegressor:
+    # Out-of-bag predictions give an honest residual spread for the over/under simulator
+    model = RandomForestRegressor(
+        n_estimators=100,
+        max_depth=10,
+        oob_score=True,
+        random_state=42
+    )
+    model.fit(X, y)
+    return model
+
+def residual_std(model: RandomForestRegressor, y: np.ndarray) -> Optional[float]:
+    """Standard deviation of the out-of-bag residuals, ignoring rows no tree left out"""
+    residuals = y - getattr(model, "oob_prediction_", np.full(len(y), np.nan))
+    residuals = residuals[np.isfinite(residuals)]
+    return float(np.std(residuals)) if len(residuals) > 1 else None
+
+def fit_game_model(X: np.ndarray, y: np.ndarray) -> RandomForestClassifier:
+    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    model.fit(X, y)
+    return model
+
+# Worker entry points; these run in the training processes and publish to the
+# model store on disk, and the parent swaps the new version in when they finish.
+
+def train_player_model(prop_type: str, settled: Optional[int] = None) -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        X, y = load_training_data(db, prop_type)
+        # Taken after loading, so rows settled meanwhile can only move the cutoff later
+        trained_through = db.query(func.max(Prediction.game_date)).filter(*training_filters(prop_type)).scalar()
+    finally:
+        db.close()
+    if len(y) < settings.MODEL_MIN_TRAINING_ROWS:
+        return {"kind": "player", "name": prop_type, "rows": len(y), "settled": settled, "version": None}
+    model = fit_player_model(X, y)
+    version = model_registry.publish("player", prop_type, model, {
+        "prop_type": prop_type,
+        "rows": len(y),
+        "residual_std": residual_std(model, y),
+        "settled": settled if settled is not None else len(y),
+        # Latest game date trained on; backtests of this version only replay later games
+        "trained_through": trained_through.replace(tzinfo=None).isoformat() if trained_through else None,
+        "feature_schema_version": FEATURE_SCHEMA_VERSION
+    }, serve=False)
+    return {"kind": "player", "name": prop_type, "rows": len(y), "version": version}
+
+def train_game_model(sport: str, X: np.ndarray, y: np.ndarray, columns: List[str]) -> Dict[str, Any]:
+    version = model_registry.publish("game", sport, fit_game_model(X, y), {
+        "sport": sport,
+        "rows": len(y),
+        "columns": columns
+    }, serve=False)
+    return {"kind": "game", "name": sport, "rows": len(y), "version": version}
+
+class TrainingPipeline:
+    """
+    Trains models in a pool of worker processes, off the request threads.
+
+    Player models (per prop_type) are retrained when the number of settled
+    predictions has grown by MODEL_RETRAIN_MIN_NEW_ROWS since the last
+    published version. Each model has at most one training run in flight.
+    """
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or settings.TRAINING_WORKERS
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending: Dict[Tuple[str, str], Future] = {}
+        # Prop types requests found unserved, for the background check
+        self._wanted: Set[str] = set()
+        # Settled count at which training a prop type last published nothing
+        self._unpublished: Dict[str, Optional[int]] = {}
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn, so workers open their own database connections instead of sharing forked ones
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _submit(self, kind: str, name: str, fn, *args) -> Future:
+        pool = self._pool()
+        with self._lock:
+            pending = self._pending.get((kind, name))
+            if pending and not pending.done():
+                return pending
+            future = pool.submit(fn, *args)
+            self._pending[(kind, name)] = future
+        future.add_done_callback(lambda f: self._finished(kind, name, f))
+        return future
+
+    def _finished(self, kind: str, name: str, future: Future):
+        with self._lock:
+            if self._pending.get((kind, name)) is future:
+                del self._pending[(kind, name)]
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error:
+            logger.error(f"Error training {kind} model {name}: {str(error)}")
+            return
+        result = future.result()
+        if kind == "player" and not result.get("version"):
+            self._unpublished[name] = result.get("settled")
+        if result.get("version"):
+            model_registry.refresh(kind, name)
+            self._unpublished.pop(name, None)
+            logger.info(f"Trained {kind} model {name} v{result['version']} on {result['rows']} rows")
+
+    def submit_player(self, prop_type: str, settled: Optional[int] = None) -> Future:
+        return self._submit("player", prop_type, train_player_model, prop_type, settled)
+
+    def submit_game(self, sport: str, X: np.ndarray, y: np.ndarray, columns: List[str]) -> Future:
+        return self._submit("game", sport, train_game_model, sport, X, y, columns)
+
+    def stale_player_models(self, db: Session, force: bool = False) -> List[Dict[str, Any]]:
+        """Prop types with enough settled predictions and no model, or enough new ones since the last"""
+        counts = db.query(Prediction.prop_type, func.count(Prediction.id)).filter(
+            Prediction.actual_result.isnot(None)
+        ).group_by(Prediction.prop_type).all()
+
+        stale = []
+        for prop_type, settled in counts:
+            if settled < settings.MODEL_MIN_TRAINING_ROWS:
+                continue
+            metadata = model_registry.latest_metadata("player", prop_type)
+            trained = metadata.get("settled", 0) if metadata is not None else None
+            if force or trained is None or settled - trained >= settings.MODEL_RETRAIN_MIN_NEW_ROWS:
+                stale.append({"prop_type": prop_type, "settled": settled, "trained": trained})
+        return stale
+
+    def player_model(self, prop_type: str) -> Optional[Any]:
+        """
+        The served player model, or None. Only reads memory: a miss is noted
+        for `check_wanted_models`, which loads or trains the model in the
+        background.
+        """
+        model = model_registry.get("player", prop_type, refresh=False)
+        if model is None:
+            with self._lock:
+                if len(self._wanted) < MAX_WANTED_MODELS:
+                    self._wanted.add(prop_type)
+        return model
+
+    def check_wanted_models(self):
+        """Load from the store, or queue training for, the prop types requests missed with enough settled rows"""
+        with self._lock:
+            wanted, self._wanted = self._wanted, set()
+        if not wanted:
+            return
+        db = SessionLocal()
+        try:
+            trainable = {s["prop_type"]: s["settled"] for s in self.stale_player_models(db, force=True)}
+        except Exception as e:
+            logger.error(f"Error counting settled predictions: {str(e)}")
+            return
+        finally:
+            db.close()
+        # Unknown prop types are dropped here, so they never reach the store or the pool
+        for prop_type in wanted:
+            settled = trainable.get(prop_type)
+            if settled is None or model_registry.get("player", prop_type, refresh=False) is not None:
+                continue
+            if model_registry.refresh("player", prop_type) is not None:
+                continue
+            if prop_type in self._unpublished and self._unpublished[prop_type] == settled:
+                continue
+            self.submit_player(prop_type, settled)
+
+    async def watch(self, interval: int = None):
+        """Periodically serve or train the player models requests missed, off the request path"""
+        interval = interval or settings.TRAINING_CHECK_SECONDS
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.check_wanted_models)
+            except Exception as e:
+                logger.error(f"Error checking wanted player models: {str(e)}")
+
+    def run(self, force: bool = False) -> List[Dict[str, Any]]:
+        """Retrain every stale player model in parallel and wait for them"""
+        db = SessionLocal()
+        try:
+            stale = self.stale_player_models(db, force)
+        finally:
+            db.close()
+        logger.info(f"Retraining {len(stale)} player models: {[s['prop_type'] for s in stale]}")
+
+        futures = [self.submit_player(s["prop_type"], s["settled"]) for s in stale]
+        wait(futures)
+        results = []
+        for entry, future in zip(stale, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append({"kind": "player", "name": entry["prop_type"], "error": str(e)})
+        return results
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+training_pipeline = TrainingPipeline()
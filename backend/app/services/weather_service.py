@@ -0,0 +1,166 @@
+import aiohttp
+import asyncio
+from typing import Dict, List, Optional, Any, Tuple
+from datetime import datetime, timedelta, timezone
+import logging
+import time
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class WeatherService:
+    """
+    Venue forecast lookups. The provider returns one forecast per venue
+    covering the coming hours, so it is cached once per location and serves
+    every kickoff there; batch results are still keyed by (location, hour).
+    Times are UTC.
+    """
+    def __init__(self):
+        self.base_url = "https://api.weather-provider.com/forecast"
+        self.ttl = settings.WEATHER_CACHE_TTL_SECONDS
+        self.max_concurrency = settings.WEATHER_MAX_CONCURRENCY
+        self._cache: Dict[str, Tuple[float, Dict]] = {}
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._prefetch_tasks = set()
+
+    def _normalize_location(self, location: str) -> str:
+        return " ".join(location.lower().split())
+
+    def _hour_bucket(self, when: Optional[datetime] = None) -> datetime:
+        when = when or datetime.utcnow()
+        if when.tzinfo is not None:
+            when = when.astimezone(timezone.utc)
+        return when.replace(minute=0, second=0, microsecond=0, tzinfo=None)
+
+    def _get_cached(self, location: str) -> Optional[Dict]:
+        entry = self._cache.get(location)
+        if not entry:
+            return None
+        expires_at, forecast = entry
+        if expires_at < time.monotonic():
+            del self._cache[location]
+            return None
+        return forecast
+
+    def _store(self, location: str, forecast: Dict):
+        self._cache[location] = (time.monotonic() + self.ttl, forecast)
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers={"Authorization": f"Bearer {settings.WEATHER_API_KEY}"},
+                timeout=aiohttp.ClientTimeout(total=10)
+            )
+        return self._session
+
+    async def _fetch(self, location: str) -> Optional[Dict]:
+        """Fetch a venue forecast, sharing the request with concurrent callers"""
+        if location in self._in_flight:
+            return await asyncio.shield(self._in_flight[location])
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[location] = future
+        forecast = None
+        try:
+            session = await self._get_session()
+            async with session.get(f"{self.base_url}/{location}") as response:
+                if response.status == 200:
+                    forecast = await response.json()
+                else:
+                    logger.error(f"Error fetching weather data: {response.status}")
+        except Exception as e:
+            logger.error(f"Error fetching weather data: {str(e)}")
+        finally:
+            future.set_result(forecast)
+            del self._in_flight[location]
+        return forecast
+
+    async def get_forecast(self, location: str, when: Optional[datetime] = None) -> Optional[Dict]:
+        """Get the venue forecast covering `when`"""
+        if not location:
+            return None
+        location = self._normalize_location(location)
+
+        forecast = self._get_cached(location)
+        if forecast is not None:
+            return forecast
+
+        forecast = await self._fetch(location)
+        if forecast is not None:
+            self._store(location, forecast)
+        return forecast
+
+    async def get_forecasts(
+        self,
+        requests: List[Tuple[str, Optional[datetime]]]
+    ) -> Dict[Tuple[str, datetime], Optional[Dict]]:
+        """
+        Batch forecast lookups for a slate of (location, kickoff) pairs.
+        Each venue is fetched at most once, with bounded concurrency.
+        """
+        by_location: Dict[str, List[datetime]] = {}
+        results: Dict[Tuple[str, datetime], Optional[Dict]] = {}
+        for location, when in requests:
+            if not location:
+                continue
+            location = self._normalize_location(location)
+            hour = self._hour_bucket(when)
+            forecast = self._get_cached(location)
+            if forecast is not None:
+                results[(location, hour)] = forecast
+            else:
+                by_location.setdefault(location, []).append(hour)
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch_venue(location: str, hours: List[datetime]):
+            async with semaphore:
+                forecast = await self._fetch(location)
+            if forecast is not None:
+                self._store(location, forecast)
+            for hour in hours:
+                results[(location, hour)] = forecast
+
+        await asyncio.gather(*(
+            fetch_venue(location, hours) for location, hours in by_location.items()
+        ))
+        return results
+
+    def _fixture_kickoff(self, fixture: Dict[str, Any]) -> Optional[datetime]:
+        date = fixture.get("date")
+        if not date:
+            return None
+        try:
+            kickoff = datetime.fromisoformat(f"{date}T{fixture.get('time') or '00:00:00'}")
+        except ValueError:
+            return None
+        # TheSportsDB times are UTC unless they carry an offset
+        return kickoff.astimezone(timezone.utc).replace(tzinfo=None) if kickoff.tzinfo else kickoff
+
+    async def prefetch_fixtures(self, fixtures: List[Dict[str, Any]]) -> int:
+        """Warm the cache for upcoming fixtures; returns the number of venues requested"""
+        horizon = datetime.utcnow() + timedelta(hours=settings.WEATHER_PREFETCH_HOURS)
+        requests = []
+        for fixture in fixtures:
+            kickoff = self._fixture_kickoff(fixture)
+            if fixture.get("venue") and kickoff and kickoff <= horizon:
+                requests.append((fixture["venue"], kickoff))
+        if requests:
+            await self.get_forecasts(requests)
+        return len({self._normalize_location(location) for location, _ in requests})
+
+    def schedule_prefetch(self, fixtures: List[Dict[str, Any]]):
+        """Prefetch fixture forecasts in the background without blocking the caller"""
+        try:
+            task = asyncio.get_running_loop().create_task(self.prefetch_fixtures(fixtures))
+        except RuntimeError:
+            return
+        self._prefetch_tasks.add(task)
+        task.add_done_callback(self._prefetch_tasks.discard)
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+weather_service = WeatherService()
@@ -0,0 +1,119 @@
+"""
+Drive the AI endpoints at a target request rate and report latency percentiles.
+
+Run against a backend that is pointed at mock_llm_server.py, e.g.:
+    python benchmark_ai.py --endpoint match --qps 50 --duration 30
+    python benchmark_ai.py --endpoint flask-player --base-url http://localhost:8080 --qps 20
+
+--unique controls how many distinct requests are cycled through, and so the
+cache hit rate once the first round has completed.
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Dict, List, Any, Tuple
+import httpx
+
+TEAMS = [
+    "Arsenal", "Chelsea", "Liverpool", "Tottenham", "Everton", "Newcastle",
+    "Brighton", "Fulham", "Wolves", "Brentford", "Aston Villa", "West Ham"
+]
+PLAYERS = ["Saka", "Palmer", "Salah", "Son", "Isak", "Watkins", "Bowen", "Mitoma"]
+
+def build_request(endpoint: str, index: int) -> Dict[str, Any]:
+    team1 = TEAMS[index % len(TEAMS)]
+    team2 = TEAMS[(index // len(TEAMS) + index + 1) % len(TEAMS)]
+    player = PLAYERS[index % len(PLAYERS)]
+    if endpoint == "match":
+        return {"method": "GET", "url": f"/predictions/match/soccer/{team1}/{team2}"}
+    if endpoint == "player":
+        return {"method": "GET", "url": f"/predictions/player/soccer/{player}", "params": {"team": team1}}
+    if endpoint == "player-stream":
+        return {"method": "GET", "url": f"/predictions/player/soccer/{player}/stream", "params": {"team": team1}}
+    if endpoint == "flask-player":
+        return {
+            "method": "POST",
+            "url": "/api/predictions/predict/player",
+            "json": {
+                "player_name": player,
+                "team": team1,
+                "category": "goals",
+                "prediction_type": "over",
+                "target_value": 0.5
+            }
+        }
+    raise ValueError(f"Unknown endpoint: {endpoint}")
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+async def send(client: httpx.AsyncClient, request: Dict[str, Any], results: List[Dict[str, Any]]):
+    started = time.perf_counter()
+    first_byte = None
+    try:
+        async with client.stream(
+            request["method"], request["url"], params=request.get("params"), json=request.get("json")
+        ) as response:
+            async for _ in response.aiter_bytes():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - started
+            status = response.status_code
+    except Exception as e:
+        status = type(e).__name__
+    elapsed = time.perf_counter() - started
+    results.append({"status": status, "latency": elapsed, "ttfb": first_byte if first_byte is not None else elapsed})
+
+async def run(args) -> Tuple[List[Dict[str, Any]], float]:
+    results: List[Dict[str, Any]] = []
+    tasks = []
+    interval = 1.0 / args.qps
+    total = int(args.qps * args.duration)
+    limits = httpx.Limits(max_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        for i in range(total):
+            # Open-loop schedule: requests go out on time whether or not earlier ones finished
+            delay = started + i * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            request = build_request(args.endpoint, random.randrange(args.unique))
+            tasks.append(asyncio.ensure_future(send(client, request, results)))
+        await asyncio.gather(*tasks)
+        wall = time.perf_counter() - started
+    return results, wall
+
+def report(results: List[Dict[str, Any]], wall: float):
+    statuses: Dict[Any, int] = {}
+    for result in results:
+        statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+    ok = [r for r in results if r["status"] == 200]
+    print(f"requests: {len(results)} in {wall:.1f}s ({len(results) / wall:.1f} req/s)")
+    print(f"status codes: {statuses}")
+    if not ok:
+        return
+    for name in ("latency", "ttfb"):
+        values = [r[name] * 1000 for r in ok]
+        print(
+            f"{name:8s} ms  p50={percentile(values, 50):.1f}  p90={percentile(values, 90):.1f}  "
+            f"p95={percentile(values, 95):.1f}  p99={percentile(values, 99):.1f}  max={max(values):.1f}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--endpoint", default="match", choices=["match", "player", "player-stream", "flask-player"])
+    parser.add_argument("--qps", type=float, default=10)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--unique", type=int, default=1000, help="distinct requests to cycle through")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--max-connections", type=int, default=1000)
+    args = parser.parse_args()
+
+    results, wall = asyncio.run(run(args))
+    report(results, wall)
+
+if __name__ == "__main__":
+    main()
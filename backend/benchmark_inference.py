@@ -0,0 +1,71 @@
+"""
+Compare sklearn forest inference with the flattened FlatForest path used by
+AnalyticsService, on a synthetic player-prop model shaped like production
+(100 trees, depth 10, 9 features). Checks that the outputs are identical
+and reports per-call latency for single rows and batches.
+
+    python benchmark_inference.py --rows 20000 --repeat 200
+"""
+import argparse
+import time
+import numpy as np
+from sklearn.ensemble import RandomForestRegressor
+from app.services.feature_vectors import PLAYER_FEATURES
+from app.services.forest_inference import FlatForest
+
+def timed(fn, repeat: int) -> float:
+    """Median seconds per call"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return float(np.median(samples))
+
+def per_tree_path(model, row):
+    """What AnalyticsService did before: one predict per tree plus one for the model"""
+    predictions = [tree.predict(row)[0] for tree in model.estimators_]
+    return model.predict(row)[0], np.var(predictions)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="training rows")
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--depth", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 16, 256, 4096])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    n_features = len(PLAYER_FEATURES)
+    X = rng.normal(size=(args.rows, n_features))
+    y = X @ rng.normal(size=n_features) + rng.normal(scale=0.5, size=args.rows)
+    model = RandomForestRegressor(n_estimators=args.trees, max_depth=args.depth, random_state=42).fit(X, y)
+
+    started = time.perf_counter()
+    forest = FlatForest(model)
+    print(f"flatten: {(time.perf_counter() - started) * 1000:.1f} ms, {forest.node_count} nodes")
+
+    X_test = rng.normal(size=(max(args.batch), n_features))
+    mean, variance = forest.predict_with_variance(X_test)
+    per_tree = np.stack([tree.predict(X_test) for tree in model.estimators_], axis=1)
+    assert np.array_equal(mean, model.predict(X_test)), "mean differs from sklearn"
+    assert np.array_equal(variance, np.var(per_tree, axis=1)), "variance differs from per-tree sklearn"
+    print(f"outputs identical to sklearn on {len(X_test)} rows")
+
+    row = X_test[:1]
+    old = timed(lambda: per_tree_path(model, row), max(args.repeat // 10, 5))
+    new = timed(lambda: forest.predict_with_variance(row), args.repeat)
+    print(f"single row, mean+variance: per-tree sklearn {old * 1000:.2f} ms, flat {new * 1000:.3f} ms ({old / new:.0f}x)")
+
+    for size in args.batch:
+        batch = X_test[:size]
+        old = timed(lambda: model.predict(batch), max(args.repeat // 10, 5))
+        new = timed(lambda: forest.predict_with_variance(batch), max(args.repeat // 10, 5))
+        print(
+            f"batch {size:5d}: sklearn predict {old * 1000:8.2f} ms, flat mean+variance {new * 1000:8.2f} ms "
+            f"({old / new:.1f}x, {new / size * 1e6:.1f} us/row)"
+        )
+
+if __name__ == "__main__":
+    main()
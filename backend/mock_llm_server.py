@@ -0,0 +1,148 @@
+"""
+Local OpenAI-compatible stand-in for load testing the AI endpoints without
+spending real money.
+
+Start it and point the backend at it:
+    uvicorn mock_llm_server:app --port 8100
+    LLM_BASE_URL=http://localhost:8100/v1 uvicorn app.main:app
+
+Behaviour is configured with environment variables, or at runtime with
+POST /_config using the same names in lower case:
+    MOCK_LLM_LATENCY       fixed:0.8 | uniform:0.5,2 | lognormal:1.0,0.5 (seconds)
+    MOCK_LLM_TTFT          time to first token when streaming (seconds)
+    MOCK_LLM_TOKENS        completion length in tokens (capped by max_tokens)
+    MOCK_LLM_ERROR_RATE    fraction of requests answered with a 500
+    MOCK_LLM_RATE_LIMIT    fraction of requests answered with a 429
+"""
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Dict, Any
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+
+app = FastAPI(title="Mock LLM", description="OpenAI-compatible mock for load testing")
+
+config: Dict[str, Any] = {
+    "latency": os.getenv("MOCK_LLM_LATENCY", "lognormal:1.0,0.5"),
+    "ttft": float(os.getenv("MOCK_LLM_TTFT", "0.3")),
+    "tokens": int(os.getenv("MOCK_LLM_TOKENS", "400")),
+    "error_rate": float(os.getenv("MOCK_LLM_ERROR_RATE", "0")),
+    "rate_limit": float(os.getenv("MOCK_LLM_RATE_LIMIT", "0")),
+}
+stats = {"requests": 0, "errors": 0, "rate_limited": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+WORDS = (
+    "form home away defense offense injury rating pace possession momentum "
+    "confidence edge matchup trend average streak minutes usage efficiency"
+).split()
+
+def sample_latency() -> float:
+    kind, _, args = config["latency"].partition(":")
+    values = [float(v) for v in args.split(",")] if args else []
+    if kind == "fixed":
+        return values[0]
+    if kind == "uniform":
+        return random.uniform(values[0], values[1])
+    if kind == "lognormal":
+        mean, sigma = values
+        return random.lognormvariate(0, sigma) * mean
+    raise ValueError(f"Unknown latency distribution: {config['latency']}")
+
+def completion_tokens(body: Dict[str, Any]) -> list:
+    count = min(config["tokens"], body.get("max_tokens") or config["tokens"])
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        text = json.dumps({"analysis": " ".join(random.choice(WORDS) for _ in range(max(count - 4, 1)))})
+        return [text[i:i + 4] for i in range(0, len(text), 4)]
+    return [random.choice(WORDS) + " " for _ in range(count)]
+
+def prompt_tokens(body: Dict[str, Any]) -> int:
+    return sum(len(m.get("content") or "") for m in body.get("messages", [])) // 4
+
+def injected_failure():
+    roll = random.random()
+    if roll < config["rate_limit"]:
+        stats["rate_limited"] += 1
+        return JSONResponse(
+            {"error": {"message": "Rate limit exceeded", "type": "rate_limit_error"}},
+            status_code=429,
+            headers={"Retry-After": "1"}
+        )
+    if roll < config["rate_limit"] + config["error_rate"]:
+        stats["errors"] += 1
+        return JSONResponse({"error": {"message": "Injected failure", "type": "server_error"}}, status_code=500)
+    return None
+
+async def stream_chunks(body: Dict[str, Any], tokens: list, latency: float):
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    await asyncio.sleep(min(config["ttft"], latency))
+    per_token = max(latency - config["ttft"], 0) / max(len(tokens), 1)
+    for token in tokens:
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": body.get("model", "mock"),
+            "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+        await asyncio.sleep(per_token)
+    final = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": body.get("model", "mock"),
+        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+    }
+    yield f"data: {json.dumps(final)}\n\n"
+    yield "data: [DONE]\n\n"
+
+@app.post("/v1/chat/completions")
+@app.post("/openai/deployments/{deployment}/chat/completions")
+async def chat_completions(request: Request, deployment: str = None):
+    body = await request.json()
+    stats["requests"] += 1
+    failure = injected_failure()
+    if failure:
+        return failure
+
+    latency = sample_latency()
+    tokens = completion_tokens(body)
+    stats["prompt_tokens"] += prompt_tokens(body)
+    stats["completion_tokens"] += len(tokens)
+
+    if body.get("stream"):
+        return StreamingResponse(stream_chunks(body, tokens, latency), media_type="text/event-stream")
+
+    await asyncio.sleep(latency)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "mock"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": "".join(tokens)},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens(body),
+            "completion_tokens": len(tokens),
+            "total_tokens": prompt_tokens(body) + len(tokens)
+        }
+    }
+
+@app.post("/_config")
+async def update_config(updates: Dict[str, Any]):
+    for key, value in updates.items():
+        if key in config:
+            config[key] = type(config[key])(value)
+    return config
+
+@app.get("/_stats")
+async def get_stats():
+    return {"config": config, "stats": stats}